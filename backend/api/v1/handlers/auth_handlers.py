@@ -1,10 +1,12 @@
 # api/v1/handlers/auth_handlers.py
 from datetime import timedelta
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Security, status
 from fastapi.security import OAuth2PasswordRequestForm
+from core.principal_cache import principal_cache
 from core.security import (
+    get_current_user,
     create_access_token,
-    verify_password,
+    verify_and_update_password,
     Token,
     ACCESS_TOKEN_EXPIRE_MINUTES,
 )
@@ -15,15 +17,31 @@ router = APIRouter()
 @router.post("/login", response_model=Token, include_in_schema=False)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     user = await UserService.get_user_by_username(form_data.username)
-    if not user or not verify_password(form_data.password, user.password):
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await verify_and_update_password(form_data.password, user.password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    if new_hash:
+        # Stored hash used an outdated cost factor.
+        await UserService.update_password_hash(user, new_hash)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.username}, expires_delta=access_token_expires
     )
-    return {"access_token": access_token, "token_type": "bearer"}
\ No newline at end of file
+    return {"access_token": access_token, "token_type": "bearer"}
+
+
+@router.get(
+    "/principal-cache",
+    summary="Principal cache statistics",
+    description="Hit and miss counters of the authenticated user cache.",
+    dependencies=[Security(get_current_user, scopes=["users:read"])]
+)
+async def principal_cache_stats():
+    return principal_cache.stats()
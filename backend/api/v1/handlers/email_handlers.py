@@ -1,5 +1,9 @@
+import uuid
 from fastapi import APIRouter, HTTPException, status
 from services.email_services import EmailService
+from services.outbox_services import OutboxService
+from services.recipient_validation import recipient_validator
+from schemas.email_schema import BatchSendRequest, BatchSendReport, RecipientValidationReport
 from typing import List
 
 router = APIRouter()
@@ -9,5 +13,60 @@ router = APIRouter()
 async def send_email(to_emails: List[str], subject: str):
     try:
         return await EmailService.send_simple_message(to_emails, subject)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post("/send-batch", response_model=BatchSendReport)
+async def send_batch(request: BatchSendRequest):
+    try:
+        return await EmailService.send_batch_message(
+            recipients=request.recipients,
+            subject=request.subject,
+            template=request.template,
+            local_template=request.local_template,
+            context=request.context,
+            history_batch_id=uuid.uuid4().hex
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post(
+    "/validate-recipients",
+    response_model=RecipientValidationReport,
+    summary="Validate recipients",
+    description="Normalize and deduplicate addresses and check each distinct domain for a mail server (cached per domain)."
+)
+async def validate_recipients(to_emails: List[str]):
+    return await recipient_validator.validate(to_emails)
+
+
+@router.get("/provider-status", summary="Mailgun integration status", description="Circuit breaker state, retry and concurrency counters.")
+async def provider_status():
+    return EmailService.get_provider_status()
+
+
+@router.post("/outbox", summary="Queue emails", description="Record one outbox row per recipient; workers deliver them in batches.")
+async def enqueue_emails(request: BatchSendRequest):
+    try:
+        return await OutboxService.enqueue(
+            recipients=request.recipients,
+            subject=request.subject,
+            template=request.template,
+            local_template=request.local_template,
+            context=request.context
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get("/outbox/{batch_id}", summary="Batch status", description="Number of outbox rows per status for a queued or sent batch.")
+async def outbox_batch_status(batch_id: str):
+    return await OutboxService.get_batch_status(batch_id)
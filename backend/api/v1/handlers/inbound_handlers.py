@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Header, HTTPException, Request, status
+from pydantic import ValidationError
+from services.inbound_services import InboundRejected, InboundService, InboundTooLarge
+
+router = APIRouter()
+
+
+@router.post(
+    path="/mailgun",
+    summary="Mailgun inbound route",
+    description="Target for a Mailgun route forwarding to a MIME URL. The message is parsed while it streams in."
+)
+async def mailgun_inbound(request: Request):
+    try:
+        message = await InboundService.ingest_mailgun(request.headers.get("content-type", ""), request.stream())
+        return {"id": str(message.id), "message_id": message.message_id}
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except InboundTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except InboundRejected as e:
+        # 406 tells Mailgun not to retry.
+        raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail=str(e))
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post(
+    path="/raw",
+    summary="Raw MIME inbound",
+    description="Ingest a raw RFC 822 message sent as the request body."
+)
+async def raw_inbound(
+    request: Request,
+    recipient: str = None,
+    x_inbound_token: str = Header(None)
+):
+    try:
+        InboundService.verify_token(x_inbound_token)
+        message = await InboundService.ingest_raw(request.stream(), recipient)
+        return {"id": str(message.id), "message_id": message.message_id}
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    except InboundTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except InboundRejected as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    except (ValueError, ValidationError) as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -0,0 +1,129 @@
+from fastapi import APIRouter, HTTPException, Query, Security, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from core.security import get_current_user
+from models.email_model import EmailStatus
+from models.user_model import User
+from schemas.inbox_schema import EmailMessageDetail, InboxPage, SearchPage
+from services.inbox_services import InboxService
+from services.mail_push import mail_push_hub
+from services.search_services import SearchService
+
+router = APIRouter()
+
+
+@router.get(
+    path="/messages",
+    response_model=InboxPage,
+    summary="List mailbox messages",
+    description="List the current user's messages newest first. Pass next_cursor back as cursor to get the next page."
+)
+async def list_messages(
+    status_filter: EmailStatus = Query(EmailStatus.RECIEVED, alias="status"),
+    cursor: str = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user: User = Security(get_current_user, scopes=["email:read"])
+):
+    try:
+        return await InboxService.list_messages(str(current_user.id), status_filter, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get(
+    path="/search",
+    response_model=SearchPage,
+    summary="Search messages",
+    description="Full-text search over subject, sender and body of the current user's messages, best match first. "
+                "Supports \"phrases\" and -excluded terms. Pass next_cursor back as cursor to get the next page."
+)
+async def search_messages(
+    q: str = Query(..., min_length=1, max_length=256),
+    to_email: str = None,
+    cursor: str = None,
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Security(get_current_user, scopes=["email:read"])
+):
+    try:
+        return await SearchService.search(
+            str(current_user.id), q, to_email.lower() if to_email else None, cursor, limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get(
+    path="/stream",
+    summary="New-mail push",
+    description="Server-Sent Events stream of new messages for the current user, optionally for one mailbox. "
+                "On a resync event (missed events), list the inbox again."
+)
+async def stream_messages(
+    to_email: str = None,
+    current_user: User = Security(get_current_user, scopes=["email:read"])
+):
+    return StreamingResponse(
+        mail_push_hub.stream(str(current_user.id), to_email.lower() if to_email else None),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get(
+    path="/messages/{message_id}",
+    response_model=EmailMessageDetail,
+    summary="Get a message",
+    description="Get a full message of the current user's mailbox (without the raw MIME source)."
+)
+async def get_message(
+    message_id: str,
+    current_user: User = Security(get_current_user, scopes=["email:read"])
+):
+    message = await InboxService.get_message(str(current_user.id), message_id)
+    if message is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
+    return message
+
+
+@router.get(
+    path="/messages/{message_id}/raw",
+    response_class=PlainTextResponse,
+    summary="Get a message's MIME source",
+    description="Raw RFC 822 source of a message, when it was small enough to be kept."
+)
+async def get_raw_message(
+    message_id: str,
+    current_user: User = Security(get_current_user, scopes=["email:read"])
+):
+    raw = await InboxService.get_raw_message(str(current_user.id), message_id)
+    if raw is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Raw message not found")
+    return PlainTextResponse(raw, media_type="message/rfc822")
+
+
+@router.patch(
+    path="/messages/{message_id}/read",
+    summary="Mark a message read or unread",
+    description="Set the read flag of a message of the current user's mailbox."
+)
+async def set_message_read(
+    message_id: str,
+    read: bool = True,
+    current_user: User = Security(get_current_user, scopes=["email:write"])
+):
+    if not await InboxService.set_read(str(current_user.id), message_id, read):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
+    return {"id": message_id, "read": read}
+
+
+@router.delete(
+    path="/messages/{message_id}",
+    summary="Delete a message",
+    description="Delete a message of the current user's mailbox with its attachments."
+)
+async def delete_message(
+    message_id: str,
+    current_user: User = Security(get_current_user, scopes=["email:write"])
+):
+    if not await InboxService.delete_message(str(current_user.id), message_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
+    return {"id": message_id, "deleted": True}
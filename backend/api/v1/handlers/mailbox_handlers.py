@@ -0,0 +1,52 @@
+from fastapi import APIRouter, HTTPException, Query, Security, status
+from core.security import get_current_user
+from models.counters_model import MailboxCounters
+from models.user_model import User
+from services.address_allocator import AddressPoolExhaustedError
+from services.counter_services import CounterService
+from services.mailbox_services import MailboxService
+
+router = APIRouter()
+
+
+@router.post(path="", summary="Create a temporary mailbox", description="Create a random temporary mailbox for the current user.")
+async def create_mailbox(
+    ttl_minutes: int = Query(None, ge=1, le=7 * 24 * 60),
+    current_user: User = Security(get_current_user, scopes=["mailboxes:write"])
+):
+    try:
+        return await MailboxService.create_mailbox(str(current_user.id), ttl_minutes)
+    except AddressPoolExhaustedError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get(path="", summary="List mailboxes", description="List the current user's temporary mailboxes.")
+async def get_mailboxes(current_user: User = Security(get_current_user, scopes=["mailboxes:read"])):
+    try:
+        return await MailboxService.get_mailboxes(str(current_user.id))
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get(path="/counters", summary="Mailbox counters", description="Total, unread and size counters of the current user's mailboxes.")
+async def get_counters(current_user: User = Security(get_current_user, scopes=["mailboxes:read"])):
+    return await CounterService.get_for_user(str(current_user.id))
+
+
+@router.get(path="/{address}/counters", summary="Counters of one mailbox", description="Total, unread and size counters of one mailbox (unread badge, quota).")
+async def get_mailbox_counters(
+    address: str,
+    current_user: User = Security(get_current_user, scopes=["mailboxes:read"])
+):
+    address = address.lower()
+    counters = await CounterService.get(address)
+    if counters is None:
+        # No message has arrived yet.
+        mailbox = await MailboxService.get_mailbox_by_address(address)
+        if mailbox is not None:
+            counters = MailboxCounters(id=address, user_id=mailbox.user_id)
+    if counters is None or counters.user_id != str(current_user.id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Mailbox not found")
+    return counters
@@ -0,0 +1,33 @@
+from fastapi import APIRouter, HTTPException, Security, status
+from core.security import get_current_user
+from schemas.template_schema import RenderedEmail, TemplateRenderRequest, TemplateUpsert
+from services.template_services import TemplateService
+
+router = APIRouter()
+
+
+@router.put(
+    path="/{name}",
+    summary="Create or update a template",
+    description="Store a template; updating an existing one bumps its version and invalidates compiled copies.",
+    dependencies=[Security(get_current_user, scopes=["templates:write"])]
+)
+async def upsert_template(name: str, template: TemplateUpsert):
+    try:
+        return await TemplateService.upsert_template(name, template)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.post(
+    path="/{name}/render",
+    response_model=RenderedEmail,
+    summary="Render a template",
+    description="Render subject, text and HTML of a template with the given context.",
+    dependencies=[Security(get_current_user, scopes=["templates:read"])]
+)
+async def render_template(name: str, request: TemplateRenderRequest):
+    try:
+        return await TemplateService.render(name, request.context)
+    except LookupError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
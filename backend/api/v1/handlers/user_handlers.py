@@ -1,8 +1,10 @@
 
 
-from fastapi import APIRouter, HTTPException, status, Security
+from typing import Literal
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile, status, Security
+from fastapi.responses import StreamingResponse
 from core.security import get_current_user
-from schemas.user_schema import UserCreate
+from schemas.user_schema import UserCreate, UserImportReport
 from services.user_services import UserService
 
 router = APIRouter()
@@ -12,19 +14,61 @@ router = APIRouter()
 async def create_user(user: UserCreate):
     try:
         return await UserService.create_user(user)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
 
+@router.post(
+    path="/import",
+    response_model=UserImportReport,
+    summary="Bulk import users",
+    description="Create users from a CSV or NDJSON upload with UserCreate fields. Returns a per-row error report.",
+    dependencies=[Security(get_current_user, scopes=["users:write"])]
+)
+async def import_users(
+    file: UploadFile = File(...),
+    format: Literal["csv", "ndjson"] = Query(None, description="Defaults to the file extension.")
+):
+    format = format or ("ndjson" if (file.filename or "").endswith((".ndjson", ".jsonl")) else "csv")
+    try:
+        return await UserService.import_users(file.file, format)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@router.get(
+    path="/export", 
+    summary="Export users", 
+    description="Stream all users as NDJSON or a JSON array. Passwords are never included.",
+    dependencies=[Security(get_current_user, scopes=["users:read"])]
+)
+async def export_users(
+    format: Literal["ndjson", "json"] = "ndjson",
+    fields: str = Query(None, description="Comma separated fields to include."),
+    batch_size: int = Query(None, ge=1, le=10_000)
+):
+    media_type = "application/x-ndjson" if format == "ndjson" else "application/json"
+    return StreamingResponse(
+        UserService.stream_users(fields.split(",") if fields else None, batch_size, format),
+        media_type=media_type
+    )
+
+
 @router.get(
     path="/", 
-    summary="Get all users", 
-    description="Get all users from the database.",
+    summary="Get users", 
+    description="Keyset pagination over users, passwords never included. Pass next_after back as after to get the next page.",
     dependencies=[Security(get_current_user, scopes=["users:read"])]
 )
-async def get_users():
+async def get_users(
+    after: str = None,
+    limit: int = Query(100, ge=1, le=1000),
+    fields: str = Query(None, description="Comma separated fields to include.")
+):
     try:
-        return await UserService.get_users()
+        return await UserService.get_users_page(after, limit, fields.split(",") if fields else None)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
 
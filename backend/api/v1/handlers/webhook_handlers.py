@@ -0,0 +1,18 @@
+from typing import Any, Dict
+from fastapi import APIRouter, HTTPException, status
+from services.suppression_services import SuppressionService
+
+router = APIRouter()
+
+
+@router.post(
+    path="/mailgun/events",
+    summary="Mailgun event webhook",
+    description="Receives bounce, complaint and unsubscribe events; suppressed addresses are written in batches."
+)
+async def mailgun_events(payload: Dict[str, Any]):
+    try:
+        suppressed = await SuppressionService.record_event(payload)
+    except PermissionError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=str(e))
+    return {"suppressed": suppressed}
@@ -3,6 +3,11 @@ from core.security import get_current_user
 from api.v1.handlers.user_handlers import router as user_router
 from api.v1.handlers.auth_handlers import router as auth_router
 from api.v1.handlers.email_handlers import router as email_router
+from api.v1.handlers.inbox_handlers import router as inbox_router
+from api.v1.handlers.mailbox_handlers import router as mailbox_router
+from api.v1.handlers.inbound_handlers import router as inbound_router
+from api.v1.handlers.template_handlers import router as template_router
+from api.v1.handlers.webhook_handlers import router as webhook_router
 
 routerv1 = APIRouter()
 
@@ -25,6 +30,36 @@ routerv1.include_router(
     tags=["Email"]
 )
 
+routerv1.include_router(
+    router=inbox_router,
+    prefix="/inbox",
+    tags=["Inbox"]
+)
+
+routerv1.include_router(
+    router=mailbox_router,
+    prefix="/mailboxes",
+    tags=["Mailboxes"]
+)
+
+routerv1.include_router(
+    router=inbound_router,
+    prefix="/inbound",
+    tags=["Inbound"]
+)
+
+routerv1.include_router(
+    router=template_router,
+    prefix="/templates",
+    tags=["Templates"]
+)
+
+routerv1.include_router(
+    router=webhook_router,
+    prefix="/webhooks",
+    tags=["Webhooks"]
+)
+
 # Health check - Sin autenticación
 @routerv1.get(
     "/health",
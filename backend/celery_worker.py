@@ -1,27 +1,30 @@
-import os
 from celery import Celery
-from core.config import settings
+from celery.signals import worker_process_init, worker_process_shutdown, worker_shutdown
+from core.async_task import get_worker_loop, run_in_worker_loop, shutdown_worker_loop
 
-# Set the default Django settings module for the 'celery' program.
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.config.settings')
+app = Celery('email_scheduler', include=['tasks.email_tasks', 'tasks.maintenance_tasks'])
 
-app = Celery('email_scheduler')
+# Broker, worker and beat settings live in core/celery_config.py.
+app.config_from_object('core.celery_config')
 
-# Using a string here means the worker doesn't have to serialize
-# the configuration object to child processes.
-app.config_from_object('core.config.settings', namespace='CELERY')
 
-# Load task modules from all registered Django app configs.
-app.autodiscover_tasks()
+# Persistent event loop with the Motor client and the shared Mailgun pool,
+# one per worker process. Prefork children set it up eagerly (and load the
+# known-address filter the pool refill uses); the solo pool creates it on
+# the first task.
+@worker_process_init.connect
+def init_worker_resources(**kwargs):
+    from services.address_allocator import address_allocator
+
+    get_worker_loop()
+    run_in_worker_loop(address_allocator.warm())
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def close_worker_resources(**kwargs):
+    shutdown_worker_loop()
 
-# Configure periodic tasks
-app.conf.beat_schedule = {
-    # Executes every 10 minutes
-    'send-scheduled-emails-every-10-minutes': {
-        'task': 'services.email_services.send_scheduled_emails',
-        'schedule': 600.0,  # 10 minutes in seconds
-    },
-}
 
 if __name__ == '__main__':
     app.start()
@@ -0,0 +1,62 @@
+import asyncio
+import inspect
+from typing import Any, Awaitable, Optional
+from celery import Task
+
+
+# One long-lived event loop per worker process. The Motor client and the
+# shared HTTP pool bind to the loop they are first used on, so every task in
+# the process has to run on this same loop to reuse them.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+async def _init_worker_resources():
+    from depends.db import init_db
+    from depends.http_client import init_http_client
+
+    await init_db()
+    init_http_client()
+
+
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """ Return the worker event loop, creating it and initialising resources on first use. """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+        _loop.run_until_complete(_init_worker_resources())
+    return _loop
+
+
+def run_in_worker_loop(coro: Awaitable[Any]) -> Any:
+    """ Run a coroutine to completion on the worker event loop.
+
+    :param coro: Awaitable to run.
+    :return: Result of the awaitable.
+    """
+    return get_worker_loop().run_until_complete(coro)
+
+
+def shutdown_worker_loop():
+    """ Release pooled resources and close the worker event loop. """
+    global _loop
+    if _loop is None or _loop.is_closed():
+        return
+    from depends.http_client import close_http_client
+    from depends.redis_client import close_redis
+
+    _loop.run_until_complete(close_http_client())
+    _loop.run_until_complete(close_redis())
+    _loop.run_until_complete(_loop.shutdown_asyncgens())
+    _loop.close()
+    _loop = None
+
+
+class AsyncTask(Task):
+    """ Celery task base that awaits ``async def`` task bodies on the worker loop. """
+
+    def __call__(self, *args, **kwargs):
+        result = super().__call__(*args, **kwargs)
+        if inspect.isawaitable(result):
+            return run_in_worker_loop(result)
+        return result
@@ -0,0 +1,66 @@
+import math
+import hashlib
+from typing import Iterable, List
+
+
+class BloomFilter:
+    """
+    In-memory Bloom filter over strings.
+
+    ``k`` bit positions come from double hashing one 16-byte blake2b digest,
+    so each add/lookup costs a single hash and the same string maps to the
+    same bits in every process. False positives are possible, false
+    negatives are not.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.capacity = max(1, capacity)
+        self.error_rate = error_rate
+        self.size = max(8, int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    @staticmethod
+    def _hashes(item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+    def add(self, item: str):
+        h1, h2 = self._hashes(item)
+        bits, size = self.bits, self.size
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % size
+            bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def update(self, items: Iterable[str]):
+        for item in items:
+            self.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        h1, h2 = self._hashes(item)
+        bits, size = self.bits, self.size
+        # Most absent items fail on the first bit or two.
+        for i in range(self.hash_count):
+            position = (h1 + i * h2) % size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def possible_members(self, items: Iterable[str]) -> List[str]:
+        """Items that may be in the filter (all members plus rare false positives)"""
+        # Same test as __contains__, inlined: this is the hot path for large lists.
+        bits, size, hash_count = self.bits, self.size, self.hash_count
+        blake2b, from_bytes = hashlib.blake2b, int.from_bytes
+        result = []
+        for item in items:
+            digest = blake2b(item.encode(), digest_size=16).digest()
+            h1, h2 = from_bytes(digest[:8], "little"), from_bytes(digest[8:], "little") | 1
+            for i in range(hash_count):
+                position = (h1 + i * h2) % size
+                if not bits[position >> 3] & (1 << (position & 7)):
+                    break
+            else:
+                result.append(item)
+        return result
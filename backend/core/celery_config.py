@@ -15,10 +15,34 @@ enable_utc = True
 
 # Beat settings (for scheduled tasks)
 beat_schedule = {
+    'dispatch-outbox': {
+        'task': 'tasks.email_tasks.dispatch_outbox',
+        'schedule': 10.0,
+    },
     'send-scheduled-emails': {
-        'task': 'services.email_services.EmailService.send_scheduled_emails',
+        'task': 'tasks.email_tasks.send_scheduled_emails',
         'schedule': 60.0,  # Check every minute
     },
+    'cleanup-expired-mailboxes': {
+        'task': 'tasks.maintenance_tasks.cleanup_expired',
+        'schedule': 300.0,  # Every 5 minutes
+    },
+    'archive-cold-messages': {
+        'task': 'tasks.maintenance_tasks.archive_messages',
+        'schedule': 3600.0,  # Every hour
+    },
+    'reconcile-mailbox-counters': {
+        'task': 'tasks.maintenance_tasks.reconcile_counters',
+        'schedule': 3600.0,  # Every hour
+    },
+    'flush-suppression-events': {
+        'task': 'tasks.maintenance_tasks.flush_suppressions',
+        'schedule': 10.0,
+    },
+    'refill-address-pool': {
+        'task': 'tasks.maintenance_tasks.refill_address_pool',
+        'schedule': 30.0,
+    },
 }
 
 # Worker settings
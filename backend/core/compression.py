@@ -0,0 +1,102 @@
+import zlib
+import logging
+from functools import lru_cache
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+ZLIB = "zlib"
+ZSTD = "zstd"
+
+
+@lru_cache(maxsize=1)
+def _zstd():
+    """ The zstandard module, imported on first use (optional dependency). """
+    import zstandard
+
+    return zstandard
+
+
+@lru_cache(maxsize=None)
+def available_codec(codec: str) -> str:
+    """ ``codec`` if it can be used here, else zlib (zstd needs the zstandard package). """
+    if codec == ZSTD:
+        try:
+            _zstd()
+        except ImportError:
+            logger.warning("zstandard is not installed, compressing with zlib")
+            return ZLIB
+    elif codec != ZLIB:
+        raise ValueError(f"Unknown compression codec {codec}")
+    return codec
+
+
+def compress_bytes(data: bytes, codec: str, level: Optional[int] = None) -> bytes:
+    if codec == ZLIB:
+        return zlib.compress(data, 6 if level is None else level)
+    if codec == ZSTD:
+        return _zstd().ZstdCompressor(level=3 if level is None else level).compress(data)
+    raise ValueError(f"Unknown compression codec {codec}")
+
+
+def decompress_bytes(data: bytes, codec: str) -> bytes:
+    if codec == ZLIB:
+        return zlib.decompress(data)
+    if codec == ZSTD:
+        return _zstd().ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown compression codec {codec}")
+
+
+def compress(text: str, codec: str, level: Optional[int] = None) -> bytes:
+    return compress_bytes(_encode(text), codec, level)
+
+
+def decompress(data: bytes, codec: str) -> str:
+    return decompress_bytes(data, codec).decode("utf-8", errors="surrogatepass")
+
+
+def _encode(text: str) -> bytes:
+    return text.encode("utf-8", errors="surrogatepass")
+
+
+def stored_size(value: Union[str, bytes, None]) -> int:
+    """ Bytes a packed value takes as stored (strings count as UTF-8). """
+    if value is None:
+        return 0
+    return len(value) if isinstance(value, bytes) else len(_encode(value))
+
+
+def pack(fields: Dict[str, Optional[str]], codec: str, min_bytes: int = 0, level: Optional[int] = None) -> Dict[str, Any]:
+    """ Compress text fields for storage.
+
+    Values shorter than ``min_bytes`` UTF-8 bytes (or no smaller once
+    compressed) stay plain strings, so readers tell the two apart by type: ``bytes`` values
+    are compressed with the document's codec, ``str`` values are plain.
+
+    :param fields: Field name to text (None is kept as is).
+    :param codec: Codec to use, see :func:`available_codec`.
+    :param min_bytes: Smallest value worth compressing.
+    :param level: Codec compression level.
+    :return: Fields to store, plus ``codec``.
+    """
+    packed: Dict[str, Any] = {"codec": codec}
+    for name, text in fields.items():
+        if text is None:
+            packed[name] = None
+            continue
+        raw = _encode(text)
+        if len(raw) < min_bytes:
+            packed[name] = text
+            continue
+        data = compress_bytes(raw, codec, level)
+        packed[name] = data if len(data) < len(raw) else text
+    return packed
+
+
+def unpack(value: Union[str, bytes, None], codec: Optional[str]) -> Optional[str]:
+    """ Stored value of a packed field back to text. """
+    if isinstance(value, bytes):
+        if codec is None:
+            raise ValueError("Compressed value without a codec")
+        return decompress(value, codec)
+    return value
@@ -1,5 +1,6 @@
+import os
 import json
-from typing import Any, List, Union
+from typing import Any, List, Optional, Union
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -12,12 +13,45 @@ class Settings(BaseSettings):
     DATABASE_URL: str   
     DATABASE_NAME: str
 
-    # Bucket to store coverage files.
+    # Bucket to store coverage files and inbound attachments (GridFS bucket name).
     BUCKET_NAME: str
 
     # Mailgun settings.
     MAILGUN_API_KEY: str
     MAILGUN_DOMAIN: str
+    MAILGUN_API_BASE_URL: str = "https://api.mailgun.net/v3"
+    MAILGUN_TEMPLATE: str = "Carta de delitos penales de ciberseguridad"
+
+    # Mailgun batch sending settings (Mailgun accepts up to 1000 recipients per call).
+    MAILGUN_BATCH_SIZE: int = 1000
+    MAILGUN_BATCH_CONCURRENCY: int = 8
+
+    # Compiled local template cache (entries are per template version).
+    TEMPLATE_CACHE_SIZE: int = 512
+
+    # Mailgun rate limiting (token bucket per domain, shared through Redis)
+    # and adaptive concurrency bounds.
+    MAILGUN_RATE_LIMIT_PER_SECOND: float = 10.0
+    MAILGUN_RATE_LIMIT_BURST: float = 20.0
+    MAILGUN_MIN_CONCURRENCY: int = 1
+    MAILGUN_MAX_CONCURRENCY: int = 32
+    MAILGUN_LATENCY_TOLERANCE: float = 2.0
+
+    # Mailgun retries and circuit breaker.
+    MAILGUN_RETRY_ATTEMPTS: int = 4
+    MAILGUN_RETRY_BASE_DELAY: float = 0.5
+    MAILGUN_RETRY_MAX_DELAY: float = 10.0
+    MAILGUN_RETRY_AFTER_MAX: float = 60.0
+    MAILGUN_BREAKER_FAILURE_THRESHOLD: int = 5
+    MAILGUN_BREAKER_RECOVERY_TIMEOUT: float = 30.0
+
+    # Mailgun HTTP client pool settings.
+    MAILGUN_HTTP2: bool = True
+    MAILGUN_MAX_CONNECTIONS: int = 100
+    MAILGUN_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    MAILGUN_KEEPALIVE_EXPIRY: float = 30.0
+    MAILGUN_TIMEOUT: float = 30.0
+    MAILGUN_CONNECT_TIMEOUT: float = 5.0
     
     # Redis settings for Celery
     REDIS_HOST: str = "localhost"
@@ -25,6 +59,113 @@ class Settings(BaseSettings):
     REDIS_DB: int = 0
     MAILGUN_FROM_EMAIL: str
 
+    # Scheduler settings.
+    SCHEDULER_MAX_JOBS_PER_TICK: int = 10_000
+    SCHEDULER_RUN_MAX_RETRIES: int = 5
+    # A claimed run is not claimed again before this; covers all retries of the run.
+    SCHEDULER_CLAIM_LEASE_SECONDS: int = 1800
+
+    # Temporary mailbox expiry. The TTL indexes fire EXPIRY_TTL_GRACE_SECONDS
+    # after expires_at so the cleanup job gets to remove related data first.
+    MAILBOX_DEFAULT_TTL_MINUTES: int = 60
+    EXPIRY_TTL_GRACE_SECONDS: int = 3600
+    EXPIRY_CLEANUP_BATCH_SIZE: int = 1000
+
+    # Temporary address allocation (pool kept in Redis, topped up by a beat task).
+    MAILBOX_DOMAIN: Optional[str] = None
+    ADDRESS_LOCAL_PART_BYTES: int = 10
+    ADDRESS_POOL_TARGET: int = 10_000
+    ADDRESS_POOL_BATCH_SIZE: int = 1000
+    ADDRESS_BLOOM_CAPACITY: int = 1_000_000
+    ADDRESS_BLOOM_ERROR_RATE: float = 0.001
+    ADDRESS_GENERATE_MAX_ATTEMPTS: int = 5
+
+    # Inbound mail. Mailgun route posts are verified with the webhook signing
+    # key, raw MIME posts with the X-Inbound-Token header.
+    MAILGUN_WEBHOOK_SIGNING_KEY: Optional[str] = None
+    INBOUND_WEBHOOK_TOKEN: Optional[str] = None
+    INBOUND_MAX_BODY_BYTES: int = 1024 * 1024
+    INBOUND_MAX_HEADER_BYTES: int = 256 * 1024
+    INBOUND_MAX_LINE_BYTES: int = 64 * 1024
+    INBOUND_MAX_INLINE_RAW_BYTES: int = 256 * 1024
+    # Whole request body, attachments included (Mailgun accepts up to 25 MB).
+    INBOUND_MAX_MESSAGE_BYTES: int = 30 * 1024 * 1024
+    # Mailgun signatures older (or further in the future) than this are rejected.
+    MAILGUN_SIGNATURE_MAX_AGE_SECONDS: int = 900
+
+    # Password hashing. Hashes with a different cost are upgraded on login.
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    # User export and bulk import.
+    USER_EXPORT_BATCH_SIZE: int = 1000
+    USER_IMPORT_BATCH_SIZE: int = 1000
+    USER_IMPORT_HASH_WORKERS: int = os.cpu_count() or 4
+
+    # Authenticated user cache (local LRU, optionally backed by Redis).
+    PRINCIPAL_CACHE_SIZE: int = 10_000
+    PRINCIPAL_CACHE_TTL_SECONDS: float = 30.0
+    PRINCIPAL_CACHE_REDIS: bool = False
+    PRINCIPAL_CACHE_REDIS_TTL_SECONDS: int = 300
+
+    # Outbox delivery.
+    OUTBOX_CLAIM_BATCH_SIZE: int = 1000
+    OUTBOX_LEASE_SECONDS: int = 300
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETRY_DELAY_SECONDS: int = 30
+    OUTBOX_MAX_BATCHES_PER_RUN: int = 50
+
+    # Recipient validation: MX lookups with a per-domain TTL cache.
+    RECIPIENT_MX_CHECK: bool = True
+    RECIPIENT_DNS_TIMEOUT: float = 3.0
+    RECIPIENT_DNS_CONCURRENCY: int = 50
+    RECIPIENT_DOMAIN_CACHE_SIZE: int = 100_000
+    RECIPIENT_DOMAIN_CACHE_TTL_SECONDS: float = 3600.0
+    RECIPIENT_DOMAIN_NEGATIVE_TTL_SECONDS: float = 300.0
+
+    # New-mail push (SSE): per-connection queue size and idle heartbeat.
+    PUSH_QUEUE_SIZE: int = 100
+    PUSH_HEARTBEAT_SECONDS: float = 15.0
+
+    # Per-mailbox counters: reconciliation batch and optional quota (bytes).
+    COUNTERS_RECONCILE_BATCH_SIZE: int = 500
+    MAILBOX_QUOTA_BYTES: Optional[int] = None
+
+    # Compression of message bodies and raw MIME (zlib, or zstd with the zstandard package).
+    MESSAGE_COMPRESSION_CODEC: str = "zlib"
+    MESSAGE_COMPRESSION_LEVEL: Optional[int] = None
+    MESSAGE_COMPRESSION_MIN_BYTES: int = 512
+    MESSAGE_COMPRESSION_BATCH_SIZE: int = 500
+
+    # Cold-message archival into compressed segment files ("gridfs" uses BUCKET_NAME, "local" uses ARCHIVE_DIR).
+    ARCHIVE_AFTER_DAYS: int = 90
+    ARCHIVE_BACKEND: str = "gridfs"
+    ARCHIVE_DIR: str = "archive"
+    ARCHIVE_SEGMENT_MAX_MESSAGES: int = 5000
+    ARCHIVE_MAX_SEGMENTS_PER_RUN: int = 20
+
+    # Full-text search over mailbox contents.
+    SEARCH_LANGUAGE: str = "english"
+    SEARCH_TEXT_MAX_CHARS: int = 20_000
+    SEARCH_MAX_RESULTS: int = 1000
+    SEARCH_SNIPPET_CHARS: int = 160
+
+    # Suppression list (bounces/complaints) and its per-process Bloom filter.
+    SUPPRESSION_BLOOM_CAPACITY: int = 1_000_000
+    SUPPRESSION_BLOOM_ERROR_RATE: float = 0.001
+    SUPPRESSION_SYNC_SECONDS: float = 5.0
+    SUPPRESSION_FLUSH_BATCH_SIZE: int = 1000
+
+    # Idempotency keys for sends (lease while a chunk is in flight, TTL once delivered).
+    IDEMPOTENCY_LEASE_SECONDS: int = 300
+    IDEMPOTENCY_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # AWS Lambda: import time above this budget is logged as a warning.
+    # Measured `import main` on 1 vCPU: 950-1140 ms, of which FastAPI,
+    # pydantic, Beanie and Motor alone take 710-870 ms.
+    LAMBDA_IMPORT_BUDGET_MS: float = 1250.0
+
     # Model configuration.
     model_config = SettingsConfigDict(
         extra="allow",
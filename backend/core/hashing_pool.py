@@ -0,0 +1,49 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class HashingPoolFull(Exception):
+    """Raised when too many hashing jobs are already queued"""
+
+
+class HashingPool:
+    """
+    Bounded thread pool for password hashing.
+
+    bcrypt releases the GIL, so hashes run in parallel on the worker
+    threads while the event loop keeps serving other requests. At most
+    ``max_pending`` jobs may be running or queued. By default further jobs
+    are rejected right away instead of piling up behind a login burst; with
+    ``wait=True`` they wait for a slot instead (bulk work, where every job
+    has to run eventually).
+    """
+
+    def __init__(self, workers: int, max_pending: int, wait: bool = False):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.wait = wait
+        self.pending = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._slots = asyncio.Semaphore(max_pending)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        if self._slots.locked() and not self.wait:
+            self.rejected += 1
+            raise HashingPoolFull("Password hashing queue is full")
+        self.waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+            self._slots.release()
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "pending": self.pending, "waiting": self.waiting, "rejected": self.rejected}
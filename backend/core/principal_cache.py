@@ -0,0 +1,111 @@
+import json
+import time
+import logging
+from collections import OrderedDict
+from typing import Optional, Tuple
+from core.config import settings
+from models.user_model import User
+
+logger = logging.getLogger(__name__)
+
+# Never cached: authentication reads the user from Mongo, not from here.
+_SECRET_FIELDS = {"password", "hashed_password"}
+_NO_SECRETS = {field: "" for field in _SECRET_FIELDS}
+
+
+class PrincipalCache:
+    """
+    Cache of authenticated users keyed by token subject (username).
+
+    First level is an in-process LRU with a short TTL; the optional second
+    level is Redis, shared by every process. Invalidation clears the local
+    entry and the Redis entry; other processes' local entries age out
+    within ``ttl`` seconds.
+
+    Cached users carry no password fields (they are blanked, locally and in
+    Redis), and every lookup returns a copy, so callers never share or
+    mutate the cached instance.
+    """
+
+    def __init__(self, max_size: int, ttl: float, redis_enabled: bool = False, redis_ttl: int = 300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.redis_enabled = redis_enabled
+        self.redis_ttl = redis_ttl
+        self._entries: "OrderedDict[str, Tuple[float, User]]" = OrderedDict()
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _redis_key(subject: str) -> str:
+        return f"principal:{subject}"
+
+    async def get(self, subject: str) -> Optional[User]:
+        entry = self._entries.get(subject)
+        if entry is not None:
+            expires, user = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(subject)
+                self.hits += 1
+                return user.model_copy()
+            del self._entries[subject]
+
+        if self.redis_enabled:
+            try:
+                from depends.redis_client import get_redis
+
+                raw = await get_redis().get(self._redis_key(subject))
+                if raw:
+                    user = User.model_validate({**json.loads(raw), **_NO_SECRETS})
+                    self._store_local(subject, user)
+                    self.redis_hits += 1
+                    return user.model_copy()
+            except Exception as e:
+                logger.warning(f"Principal cache Redis lookup failed: {str(e)}")
+
+        self.misses += 1
+        return None
+
+    async def set(self, subject: str, user: User):
+        self._store_local(subject, user.model_copy(update=_NO_SECRETS))
+        if self.redis_enabled:
+            try:
+                from depends.redis_client import get_redis
+
+                await get_redis().set(
+                    self._redis_key(subject), user.model_dump_json(exclude=_SECRET_FIELDS), ex=self.redis_ttl
+                )
+            except Exception as e:
+                logger.warning(f"Principal cache Redis write failed: {str(e)}")
+
+    async def invalidate(self, subject: str):
+        self._entries.pop(subject, None)
+        if self.redis_enabled:
+            from depends.redis_client import get_redis
+
+            await get_redis().delete(self._redis_key(subject))
+
+    def _store_local(self, subject: str, user: User):
+        self._entries[subject] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.redis_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_ratio": (self.hits + self.redis_hits) / lookups if lookups else 0.0,
+        }
+
+
+principal_cache = PrincipalCache(
+    max_size=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS,
+    redis_enabled=settings.PRINCIPAL_CACHE_REDIS,
+    redis_ttl=settings.PRINCIPAL_CACHE_REDIS_TTL_SECONDS,
+)
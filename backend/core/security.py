@@ -1,19 +1,48 @@
+import asyncio
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from functools import lru_cache
+from typing import List, Optional, Tuple
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel
 from models.user_model import User
+from core.config import settings
+from core.hashing_pool import HashingPool, HashingPoolFull
+from core.principal_cache import principal_cache
 
 # Configuration
 SECRET_KEY = "your-secret-key-here"  # In production, use a strong secret key from environment variables
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# jose and passlib/bcrypt are imported on first use so cold starts that
+# never touch authentication don't pay for them.
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """ Password hashing context. min/max rounds pin the cost so hashes made
+    with another cost report needs_update and get rehashed on login. """
+    from passlib.context import CryptContext
+
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+        bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+    )
+
+hashing_pool = HashingPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+)
+# Separate pool for bulk imports so an import cannot fill the login queue.
+# Concurrent imports share its slots and wait for them rather than fail.
+bulk_hashing_pool = HashingPool(
+    workers=settings.USER_IMPORT_HASH_WORKERS,
+    max_pending=2 * settings.USER_IMPORT_HASH_WORKERS,
+    wait=True,
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 # Token models
@@ -28,12 +57,35 @@ class UserInDB(User):
     hashed_password: str
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+async def _run_hashing(func, *args):
+    try:
+        return await hashing_pool.run(func, *args)
+    except HashingPoolFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent password operations, try again later",
+            headers={"Retry-After": "1"},
+        )
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """ Verify off the event loop; also returns a new hash when the stored one uses an outdated cost. """
+    return await _run_hashing(get_pwd_context().verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_hashing(get_pwd_context().hash, password)
+
+async def get_password_hashes(passwords: List[str]) -> List[str]:
+    """ Hash a batch of passwords in parallel on the bulk hashing pool. """
+    return await asyncio.gather(*(bulk_hashing_pool.run(get_pwd_context().hash, password) for password in passwords))
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    from jose import jwt
+
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
@@ -44,6 +96,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 async def get_current_user(token: str = Depends(oauth2_scheme)):
+    from jose import JWTError, jwt
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -58,9 +112,12 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
     
-    user = await User.find_one(User.username == token_data.username)
+    user = await principal_cache.get(token_data.username)
     if user is None:
-        raise credentials_exception
+        user = await User.find_one(User.username == token_data.username)
+        if user is None:
+            raise credentials_exception
+        await principal_cache.set(token_data.username, user)
     return user
 
 async def get_current_active_user(current_user: User = Depends(get_current_user)):
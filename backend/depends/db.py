@@ -1,11 +1,29 @@
 from beanie import init_beanie
 from core.config import settings
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
 from models.user_model import User
+from models.email_model import EmailMessage
+from models.mailbox_model import Mailbox
+from models.scheduled_job_model import ScheduledEmailJob
+from models.template_model import EmailTemplate
+from models.outbox_model import OutboxMessage
+from models.suppression_model import Suppression
+from models.counters_model import MailboxCounters
+from models.archive_model import ArchiveSegment, ArchivedMessage
 
 
 # Create async client to connect to the database.
 client = AsyncIOMotorClient(host=settings.DATABASE_URL)
+database = client[settings.DATABASE_NAME]
+
+
+def get_gridfs_bucket() -> AsyncIOMotorGridFSBucket:
+    """ GridFS bucket (named by BUCKET_NAME) holding message attachments. """
+    return AsyncIOMotorGridFSBucket(database, bucket_name=settings.BUCKET_NAME)
+
+
+# Beanie only needs to be initialised once per process (or Lambda container).
+_initialized = False
 
 
 async def init_db():
@@ -13,11 +31,24 @@ async def init_db():
 
     :return: Database connection.
     """
+    global _initialized
+    if _initialized:
+        return
     # Configure database indexes or special settings.
     # Must specify database model(s) to configure.
     await init_beanie(
-        database=client[settings.DATABASE_NAME],
+        database=database,
         document_models=[
-            User
+            User,
+            EmailMessage,
+            Mailbox,
+            ScheduledEmailJob,
+            EmailTemplate,
+            OutboxMessage,
+            Suppression,
+            MailboxCounters,
+            ArchiveSegment,
+            ArchivedMessage
         ]
     )
+    _initialized = True
@@ -0,0 +1,63 @@
+from typing import Optional, TYPE_CHECKING
+from core.config import settings
+
+if TYPE_CHECKING:
+    import httpx
+
+
+# Shared client for every outbound call to the Mailgun API. One pool per
+# process keeps TCP/TLS connections alive between sends. httpx is imported
+# when the client is first built, keeping it out of cold starts.
+_client: Optional["httpx.AsyncClient"] = None
+
+
+def create_http_client(transport: Optional["httpx.AsyncBaseTransport"] = None) -> "httpx.AsyncClient":
+    """ Build a pooled Mailgun client from settings.
+
+    :param transport: Optional transport override (e.g. ``httpx.MockTransport`` for a local stub).
+    :return: Configured async client.
+    """
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=settings.MAILGUN_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.MAILGUN_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.MAILGUN_KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(
+        settings.MAILGUN_TIMEOUT,
+        connect=settings.MAILGUN_CONNECT_TIMEOUT,
+    )
+    return httpx.AsyncClient(
+        base_url=f"{settings.MAILGUN_API_BASE_URL}/{settings.MAILGUN_DOMAIN}",
+        auth=("api", settings.MAILGUN_API_KEY),
+        http2=settings.MAILGUN_HTTP2,
+        limits=limits,
+        timeout=timeout,
+        transport=transport,
+    )
+
+
+def init_http_client(transport: Optional["httpx.AsyncBaseTransport"] = None) -> "httpx.AsyncClient":
+    """ Create the process-wide client if it does not exist yet.
+
+    :param transport: Optional transport override.
+    :return: Shared client.
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client(transport=transport)
+    return _client
+
+
+def get_http_client() -> "httpx.AsyncClient":
+    """ Return the shared client, creating it lazily outside of the app lifespan. """
+    return init_http_client()
+
+
+async def close_http_client():
+    """ Close the shared client and release its pooled connections. """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
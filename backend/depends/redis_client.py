@@ -0,0 +1,32 @@
+from typing import Optional, TYPE_CHECKING
+from core.config import settings
+
+if TYPE_CHECKING:
+    from redis.asyncio import Redis
+
+
+# Shared Redis client for rate limiting and other cross-process state.
+_redis: Optional["Redis"] = None
+
+
+def get_redis() -> "Redis":
+    """ Return the shared Redis client, creating it (and importing redis) lazily. """
+    global _redis
+    if _redis is None:
+        from redis.asyncio import Redis
+
+        _redis = Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            decode_responses=True,
+        )
+    return _redis
+
+
+async def close_redis():
+    """ Close the shared Redis client and its connection pool. """
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -1,8 +1,14 @@
-import uvicorn
-from mangum import Mangum
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+import json
+import asyncio
 from fastapi import FastAPI, Request
 from starlette import status
 from depends.db import init_db
+from depends.http_client import init_http_client, close_http_client
+from depends.redis_client import close_redis
+from services.mail_push import mail_push_hub
 from core.config import settings
 from api.v1.router import routerv1
 from contextlib import asynccontextmanager
@@ -55,7 +61,12 @@ async def lifespan(app: FastAPI):
     # Initialize DB.
     await init_db()
     print("Init dbs...")
+    # Shared Mailgun connection pool.
+    init_http_client()
     yield
+    await mail_push_hub.close()
+    await close_http_client()
+    await close_redis()
 
 app = get_application()
 
@@ -97,22 +108,64 @@ async def check_head():
 # Include the main router.
 app.include_router(router=routerv1, prefix=settings.API_PREFIX)
 
+# Module import time, i.e. the part of a Lambda cold start spent importing.
+IMPORT_MS = (time.perf_counter() - _IMPORT_STARTED) * 1000
+if IMPORT_MS > settings.LAMBDA_IMPORT_BUDGET_MS:
+    print(f"Import took {IMPORT_MS:.0f} ms, over the {settings.LAMBDA_IMPORT_BUDGET_MS:.0f} ms budget")
+
+# Mangum handler, built on the first invocation and reused by the container.
+_asgi_handler = None
+
+
+def _init_lambda():
+    """ One-time container setup: Beanie init and the Mangum handler.
+
+    Mangum runs with lifespan="off" because it would otherwise run the
+    FastAPI lifespan (and init_beanie) around every invocation. Mangum runs
+    the app on the thread's event loop, so the DB is initialised on that
+    same loop.
+    """
+    global _asgi_handler
+    from mangum import Mangum
+
+    try:
+        loop = asyncio.get_event_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    loop.run_until_complete(init_db())
+    _asgi_handler = Mangum(app, lifespan="off")
+
 
 def lambda_handler(event, context):
     """ Mangum lambda handler.
 
+    Logs one JSON line per invocation with cold/warm start timings.
+
     :param dict event: AWS Lambda event.
     :param dict context: AWS Lambda context.
     :return: Handler.
     """
+    started = time.perf_counter()
+    cold_start = _asgi_handler is None
+    if cold_start:
+        _init_lambda()
+    init_ms = (time.perf_counter() - started) * 1000
 
-    asgi_handler = Mangum(app)
-    response = asgi_handler(
+    response = _asgi_handler(
         event, context
     )  # Call the instance with the event arguments
 
+    print(json.dumps({
+        "cold_start": cold_start,
+        "import_ms": round(IMPORT_MS, 1) if cold_start else 0,
+        "init_ms": round(init_ms, 1),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }))
     return response
 
 
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
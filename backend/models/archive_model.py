@@ -0,0 +1,68 @@
+# models/archive_model.py
+from beanie import Document, PydanticObjectId
+from pydantic import Field
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from core.config import settings
+from datetime import date, datetime
+from typing import List
+from models.email_model import EmailStatus
+
+
+class ArchiveSegment(Document):
+    """ One append-only segment file of archived messages from a single day. """
+    partition: date  # created_at day of every message in the segment
+    backend: str  # "gridfs" or "local"
+    location: str  # GridFS file id or path under ARCHIVE_DIR
+    codec: str
+    message_count: int  # Locators still pointing here; the segment is deleted at 0
+    size: int
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "archive_segments"
+        indexes = [
+            "partition",
+        ]
+
+
+class ArchivedMessage(Document):
+    """ Locator of an archived message; ``id`` is the original EmailMessage id.
+
+    Keeps what the inbox lists, counts and searches, plus the record's
+    byte range in its segment, so fetching the message is one ranged read.
+    """
+    message_id: str
+    from_email: str
+    to_email: str
+    subject: str
+    status: EmailStatus
+    created_at: datetime
+    read: bool = False
+    user_id: str
+    size: int = 0
+    search_text: str = ""
+    attachment_ids: List[PydanticObjectId] = Field(default_factory=list)
+    segment_id: PydanticObjectId
+    offset: int
+    length: int
+
+    class Settings:
+        name = "archived_messages"
+        indexes = [
+            "to_email",
+            "segment_id",
+            # Same keyset as the hot inbox listing, which merges this collection in.
+            IndexModel([
+                ("user_id", ASCENDING),
+                ("status", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ]),
+            # Same text index as the hot collection, so search covers archived messages.
+            IndexModel(
+                [("user_id", ASCENDING), ("subject", TEXT), ("from_email", TEXT), ("search_text", TEXT)],
+                name="user_text_search",
+                weights={"subject": 10, "from_email": 5, "search_text": 1},
+                default_language=settings.SEARCH_LANGUAGE,
+            ),
+        ]
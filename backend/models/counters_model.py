@@ -0,0 +1,20 @@
+# models/counters_model.py
+from beanie import Document
+from pydantic import Field
+from datetime import datetime
+
+
+class MailboxCounters(Document):
+    """ Materialized message counters of one mailbox, keyed by its address. """
+    id: str  # Mailbox address
+    user_id: str
+    total: int = 0
+    unread: int = 0
+    size: int = 0  # Bytes, sum of EmailMessage.size
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "mailbox_counters"
+        indexes = [
+            "user_id",
+        ]
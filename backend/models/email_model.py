@@ -1,8 +1,10 @@
 from beanie import Document
 from pydantic import Field, EmailStr
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
 from datetime import datetime, timedelta
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Union
 from enum import Enum
+from core.config import settings
 import random
 import string
 import email
@@ -14,21 +16,30 @@ class EmailStatus(str, Enum):
     SENT = "sent"
     DRAFT = "draft"
     DELETED = "deleted"
+    QUEUED = "queued"
+    FAILED = "failed"
+    BOUNCED = "bounced"
 
 class EmailMessage(Document):
     message_id: str
     from_email: EmailStr
     to_email: EmailStr
     subject: str
-    body: str
-    html: Optional[str] = None
+    # body, html and raw_message are plain ``str`` or ``bytes`` compressed
+    # with ``codec``; read them through core.compression.unpack().
+    body: Union[bytes, str]
+    html: Optional[Union[bytes, str]] = None
     status: EmailStatus
     created_at: datetime = Field(default_factory=datetime.utcnow)
     read: bool = False
     user_id: str  # ID del dueño del buzón
-    raw_message: Optional[str] = None  # Mensaje en formato raw
+    raw_message: Optional[Union[bytes, str]] = None  # Mensaje en formato raw
     headers: Dict[str, Any] = Field(default_factory=dict)
     attachments: List[Dict[str, Any]] = Field(default_factory=list)
+    size: int = 0  # Bytes as received, counted in the mailbox quota
+    search_text: str = ""  # Plain text of the body, bounded, for the text index
+    codec: Optional[str] = None  # Compression codec of the bytes fields
+    expires_at: Optional[datetime] = None  # Expira junto con su buzón temporal
 
     class Settings:
         name = "email_messages"
@@ -37,11 +48,27 @@ class EmailMessage(Document):
             "to_email",
             "user_id",
             "status",
-            "created_at"
+            "created_at",
+            # Inbox listing: equality on user and status, keyset on (created_at, _id).
+            IndexModel([
+                ("user_id", ASCENDING),
+                ("status", ASCENDING),
+                ("created_at", DESCENDING),
+                ("_id", DESCENDING),
+            ]),
+            # Full-text search, always scoped by user (equality prefix).
+            IndexModel(
+                [("user_id", ASCENDING), ("subject", TEXT), ("from_email", TEXT), ("search_text", TEXT)],
+                name="user_text_search",
+                weights={"subject": 10, "from_email": 5, "search_text": 1},
+                default_language=settings.SEARCH_LANGUAGE,
+            ),
+            # Backstop for the expiry cleanup job, which also removes related data.
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=settings.EXPIRY_TTL_GRACE_SECONDS),
         ]
 
     @classmethod
     def generate_message_id(cls, domain: str) -> str:
         """Genera un ID único para el mensaje"""
         rand_str = ''.join(random.choices(string.ascii_letters + string.digits, k=32))
-        return f"<{int(datetime.utcnow().timestamp())}.{rand_str}@{domain}>"
\ No newline at end of file
+        return f"<{int(datetime.utcnow().timestamp())}.{rand_str}@{domain}>"
@@ -0,0 +1,24 @@
+# models/mailbox_model.py
+from beanie import Document
+from pydantic import EmailStr, Field
+from pymongo import ASCENDING, IndexModel
+from datetime import datetime
+from typing import Optional
+from core.config import settings
+
+
+class Mailbox(Document):
+    address: EmailStr
+    user_id: str  # ID del dueño del buzón
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: Optional[datetime] = None
+
+    class Settings:
+        name = "mailboxes"
+        indexes = [
+            IndexModel([("address", ASCENDING)], unique=True),
+            "user_id",
+            # Backstop only: the cleanup job removes expired mailboxes and
+            # their messages first; the TTL monitor catches what it missed.
+            IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=settings.EXPIRY_TTL_GRACE_SECONDS),
+        ]
@@ -0,0 +1,44 @@
+# models/outbox_model.py
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+from datetime import datetime
+from typing import Any, Dict, Optional
+from models.email_model import EmailStatus
+
+
+class OutboxMessage(Document):
+    """ One outgoing email per recipient, kept as send history once delivered.
+
+    Mail sent directly (send-email, send-batch, scheduled runs) is recorded
+    here too, straight in its final status.
+    """
+    batch_id: str  # Rows enqueued together share content and are sent together
+    to_email: str
+    subject: str
+    template: Optional[str] = None
+    local_template: Optional[str] = None
+    context: Dict[str, Any] = Field(default_factory=dict)
+    variables: Dict[str, Any] = Field(default_factory=dict)
+    user_id: Optional[str] = None
+    status: EmailStatus = EmailStatus.QUEUED
+    attempts: int = 0
+    # Claimable once lease_until has passed; a claim pushes it forward.
+    lease_until: datetime = Field(default_factory=lambda: datetime(1970, 1, 1))
+    claimed_by: Optional[str] = None
+    provider_id: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "outbox"
+        indexes = [
+            IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)]),
+            IndexModel([("batch_id", ASCENDING), ("status", ASCENDING)]),
+            # History of direct sends is upserted per (batch_id, to_email).
+            IndexModel([("batch_id", ASCENDING), ("to_email", ASCENDING)]),
+            IndexModel([("claimed_by", ASCENDING)]),
+            # Bounce and complaint events are matched on these.
+            IndexModel([("provider_id", ASCENDING), ("to_email", ASCENDING)]),
+        ]
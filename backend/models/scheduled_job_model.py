@@ -0,0 +1,27 @@
+# models/scheduled_job_model.py
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+from datetime import datetime
+from typing import List, Optional
+
+
+class ScheduledEmailJob(Document):
+    job_id: str
+    to_emails: List[str]
+    subject: str
+    interval_minutes: int
+    next_run: datetime
+    end_time: Optional[datetime] = None
+    # Run being sent (its next_run) and until when the claim holds.
+    claimed_run: Optional[datetime] = None
+    locked_until: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "scheduled_email_jobs"
+        indexes = [
+            IndexModel([("job_id", ASCENDING)], unique=True),
+            # Due jobs are read as a range scan on next_run.
+            IndexModel([("next_run", ASCENDING)]),
+        ]
@@ -0,0 +1,26 @@
+# models/suppression_model.py
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+from datetime import datetime
+from enum import Enum
+
+
+class SuppressionReason(str, Enum):
+    BOUNCE = "bounce"
+    COMPLAINT = "complaint"
+    UNSUBSCRIBE = "unsubscribe"
+
+
+class Suppression(Document):
+    address: str  # Lowercased
+    reason: SuppressionReason
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "suppressions"
+        indexes = [
+            IndexModel([("address", ASCENDING)], unique=True),
+            # Processes pull new entries into their Bloom filter by created_at.
+            IndexModel([("created_at", ASCENDING)]),
+        ]
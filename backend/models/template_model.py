@@ -0,0 +1,21 @@
+# models/template_model.py
+from beanie import Document
+from pydantic import Field
+from pymongo import ASCENDING, IndexModel
+from datetime import datetime
+from typing import Optional
+
+
+class EmailTemplate(Document):
+    name: str
+    version: int = 1
+    subject: str
+    text: Optional[str] = None
+    html: Optional[str] = None
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "email_templates"
+        indexes = [
+            IndexModel([("name", ASCENDING)], unique=True),
+        ]
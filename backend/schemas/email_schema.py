@@ -0,0 +1,58 @@
+# schemas/email_schema.py
+from pydantic import BaseModel, EmailStr, Field
+from typing import Any, Dict, List, Optional
+
+
+class BatchRecipient(BaseModel):
+    email: EmailStr
+    variables: Dict[str, Any] = Field(default_factory=dict)
+
+
+class BatchSendRequest(BaseModel):
+    recipients: List[BatchRecipient]
+    subject: str
+    template: Optional[str] = None
+    # Stored template rendered locally instead of a Mailgun template.
+    local_template: Optional[str] = None
+    context: Dict[str, Any] = Field(default_factory=dict)
+
+
+class ChunkReport(BaseModel):
+    chunk: int
+    recipients: List[str]
+    delivered: bool
+    # Delivered by an earlier attempt of the same run, not sent again.
+    skipped: bool = False
+    # Another attempt holds the chunk's idempotency lease.
+    in_progress: bool = False
+    provider_id: Optional[str] = None
+    error: Optional[str] = None
+
+
+class InvalidRecipient(BaseModel):
+    email: str
+    reason: str
+
+
+class RecipientValidationReport(BaseModel):
+    # Normalized and deduplicated.
+    valid: List[str]
+    invalid: List[InvalidRecipient]
+
+
+class BatchSendReport(BaseModel):
+    total_recipients: int
+    total_chunks: int
+    delivered: int
+    failed: int
+    chunks: List[ChunkReport]
+    # On the suppression list (bounced/complained), not sent.
+    suppressed: List[str] = Field(default_factory=list)
+    # Rejected by recipient validation (e.g. domain without MX), not sent.
+    invalid: List[InvalidRecipient] = Field(default_factory=list)
+    # Outbox batch holding the per-recipient history, when recorded.
+    batch_id: Optional[str] = None
+
+    @property
+    def complete(self) -> bool:
+        return all(chunk.delivered for chunk in self.chunks)
@@ -0,0 +1,47 @@
+# schemas/inbox_schema.py
+from beanie import PydanticObjectId
+from pydantic import BaseModel, EmailStr, Field
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from models.email_model import EmailStatus
+
+
+class EmailMessageSummary(BaseModel):
+    """ List view of a message. Heavy fields (raw_message, html, headers, attachments) are never loaded. """
+    id: PydanticObjectId = Field(alias="_id")
+    message_id: str
+    from_email: EmailStr
+    to_email: EmailStr
+    subject: str
+    status: EmailStatus
+    created_at: datetime
+    read: bool
+
+    model_config = {"populate_by_name": True}
+
+
+class InboxPage(BaseModel):
+    items: List[EmailMessageSummary]
+    next_cursor: Optional[str] = None
+
+
+class EmailMessageDetail(EmailMessageSummary):
+    """ Detail view: bodies decompressed, raw_message left out (see the raw endpoint). """
+    body: str
+    html: Optional[str] = None
+    headers: Dict[str, Any] = Field(default_factory=dict)
+    attachments: List[Dict[str, Any]] = Field(default_factory=list)
+    size: int = 0
+    expires_at: Optional[datetime] = None
+
+
+class SearchHit(EmailMessageSummary):
+    score: float
+    # HTML-escaped, matched terms wrapped in <mark>.
+    subject_highlight: str
+    snippet: str
+
+
+class SearchPage(BaseModel):
+    items: List[SearchHit]
+    next_cursor: Optional[str] = None
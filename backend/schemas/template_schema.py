@@ -0,0 +1,19 @@
+# schemas/template_schema.py
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional
+
+
+class TemplateUpsert(BaseModel):
+    subject: str
+    text: Optional[str] = None
+    html: Optional[str] = None
+
+
+class RenderedEmail(BaseModel):
+    subject: str
+    text: Optional[str] = None
+    html: Optional[str] = None
+
+
+class TemplateRenderRequest(BaseModel):
+    context: Dict[str, Any] = Field(default_factory=dict)
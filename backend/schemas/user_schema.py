@@ -1,10 +1,22 @@
 # schemas/user_schema.py
 from pydantic import EmailStr
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
 class UserCreate(BaseModel):
     username: str
     email: EmailStr
     full_name: Optional[str] = None
-    hashed_password: str
\ No newline at end of file
+    hashed_password: str
+
+
+class UserImportError(BaseModel):
+    row: int
+    error: str
+
+
+class UserImportReport(BaseModel):
+    total: int
+    inserted: int
+    failed: int
+    errors: List[UserImportError]
@@ -0,0 +1,134 @@
+"""
+Inbox search benchmark over a synthetic corpus.
+
+Run from the backend directory against a throwaway database:
+
+    python -m scripts.benchmark_search --database email_sender_search_bench --messages 1000000
+
+The corpus is loaded once (reruns reuse it) and indexed by init_db. One
+"heavy" user owns a large share of the messages and the rest are spread
+over many light users. Marker words appear at fixed rates. That lets the
+same query with the same number of matches be timed on a huge mailbox and
+on a small one: latency should follow the matches, not the mailbox size.
+"""
+import os
+import time
+import random
+import itertools
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+# Rate of each marker word in message bodies.
+MARKERS = {"zephyrine": 0.0001, "quillon": 0.001, "marbletide": 0.01, "copperleaf": 0.1}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="Database to fill and query (not the production one).")
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--heavy-share", type=float, default=0.2, help="Share of messages owned by the heavy user.")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query.")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def make_vocabulary(rng: random.Random, size: int = 20_000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = {"".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)}
+    words -= set(MARKERS)
+    words = sorted(words)
+    # Zipf-like weights so a few words are very common, as in real mail.
+    return words, list(itertools.accumulate(1 / (rank + 1) for rank in range(len(words))))
+
+
+def make_messages(rng: random.Random, count: int, users: int, heavy_share: float, words, weights):
+    now = datetime.utcnow()
+    for i in range(count):
+        user = "heavy" if rng.random() < heavy_share else f"user{rng.randrange(users)}"
+        body = rng.choices(words, cum_weights=weights, k=rng.randint(30, 120))
+        for marker, rate in MARKERS.items():
+            if rng.random() < rate:
+                body.insert(rng.randrange(len(body) + 1), marker)
+        text = " ".join(body)
+        subject = " ".join(rng.choices(words, cum_weights=weights, k=rng.randint(3, 8)))
+        yield {
+            "message_id": f"<bench-{i}@bench.local>",
+            "from_email": f"{rng.choice(words)}@{rng.choice(words)}.com",
+            "to_email": f"{user}@bench.local",
+            "subject": subject,
+            "body": text,
+            "status": "recieved",
+            "created_at": now - timedelta(seconds=i),
+            "read": False,
+            "user_id": user,
+            "headers": {},
+            "attachments": [],
+            "size": len(text),
+            "search_text": text,
+        }
+
+
+async def load(collection, args):
+    existing = await collection.estimated_document_count()
+    if existing >= args.messages:
+        print(f"Reusing {existing} messages in {args.database}")
+        return
+    await collection.drop()
+    rng = random.Random(args.seed)
+    words, weights = make_vocabulary(rng)
+    started = time.perf_counter()
+    batch = []
+    for document in make_messages(rng, args.messages, args.users, args.heavy_share, words, weights):
+        batch.append(document)
+        if len(batch) == 10_000:
+            await collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        await collection.insert_many(batch, ordered=False)
+    print(f"Loaded {args.messages} messages in {time.perf_counter() - started:.1f}s")
+
+
+async def run(args):
+    from depends.db import database, init_db
+    from models.email_model import EmailMessage
+    from services.search_services import SearchService
+
+    collection = database[EmailMessage.Settings.name]
+    await load(collection, args)
+    started = time.perf_counter()
+    # Builds the text index (and the others) on the loaded collection.
+    await init_db()
+    print(f"Indexes ready in {time.perf_counter() - started:.1f}s")
+
+    light = "user1"
+    counts = await asyncio.gather(*(
+        collection.count_documents({"user_id": user})
+        for user in ("heavy", light)
+    ))
+    print(f"Mailbox sizes: heavy={counts[0]}, {light}={counts[1]}\n")
+
+    print(f"{'query':<28}{'user':<8}{'matches':>9}{'p50 ms':>10}{'p95 ms':>10}")
+    for query in [*MARKERS, "quillon copperleaf", '"copperleaf"', "copperleaf -marbletide"]:
+        for user in ("heavy", light):
+            matches = await collection.count_documents({"user_id": user, "$text": {"$search": query}})
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                await SearchService.search(user, query, limit=20)
+                timings.append((time.perf_counter() - started) * 1000)
+            p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+            print(f"{query:<28}{user:<8}{matches:>9}{statistics.median(timings):>10.2f}{p95:>10.2f}")
+
+
+def main():
+    args = parse_args()
+    # Settings are read at import time, so point them at the benchmark database first.
+    os.environ["DATABASE_NAME"] = args.database
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
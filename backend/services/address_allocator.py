@@ -0,0 +1,132 @@
+import base64
+import secrets
+import logging
+from typing import List, Optional
+from core.bloom import BloomFilter
+from core.config import settings
+from depends.db import database
+from depends.redis_client import get_redis
+from models.mailbox_model import Mailbox
+
+logger = logging.getLogger(__name__)
+
+# Ready-to-use addresses, shared by every process.
+POOL_KEY = "mailbox:address_pool"
+
+
+class AddressPoolExhaustedError(Exception):
+    """Raised when repeated generation attempts yield no unused address"""
+
+
+def generate_local_parts(count: int) -> List[str]:
+    """
+    Generate ``count`` random mailbox local parts from one CSPRNG read.
+
+    Each local part is ADDRESS_LOCAL_PART_BYTES random bytes in lowercase
+    base32 (10 bytes -> 16 characters, 80 bits).
+    """
+    size = settings.ADDRESS_LOCAL_PART_BYTES
+    data = secrets.token_bytes(count * size)
+    return [
+        base64.b32encode(data[i:i + size]).decode().rstrip("=").lower()
+        for i in range(0, count * size, size)
+    ]
+
+
+class AddressAllocator:
+    """
+    Pre-generated pool of unique temporary addresses.
+
+    Candidates are screened against an in-process Bloom filter of known
+    addresses, confirmed against the mailboxes collection in one ``$in``
+    query per batch and pushed to a Redis list. Allocation is a single LPOP;
+    the unique index on ``Mailbox.address`` remains the final guard.
+
+    Loading the filter scans every mailbox, so it is warmed when a worker
+    process starts (see ``celery_worker``) and never built on the API
+    path: an inline allocation without a loaded filter only checks Mongo.
+    """
+
+    def __init__(self):
+        self._known: Optional[BloomFilter] = None
+
+    @property
+    def domain(self) -> str:
+        return settings.MAILBOX_DOMAIN or settings.MAILGUN_DOMAIN
+
+    async def warm(self) -> BloomFilter:
+        """Load the Bloom filter of known addresses, if not loaded yet"""
+        if self._known is None:
+            known = BloomFilter(capacity=settings.ADDRESS_BLOOM_CAPACITY, error_rate=settings.ADDRESS_BLOOM_ERROR_RATE)
+            cursor = database[Mailbox.Settings.name].find({}, projection={"_id": 0, "address": 1})
+            async for mailbox in cursor:
+                known.add(mailbox["address"])
+            self._known = known
+        return self._known
+
+    async def generate(self, count: int, known: Optional[BloomFilter] = None) -> List[str]:
+        """Generate up to ``count`` addresses that are not in use, screened by ``known`` if given"""
+        candidates = {
+            f"{local_part}@{self.domain}" for local_part in generate_local_parts(count)
+        }
+        candidates = [address for address in candidates if known is None or address not in known]
+        taken = set(await database[Mailbox.Settings.name].distinct("address", {"address": {"$in": candidates}}))
+        fresh = [address for address in candidates if address not in taken]
+        if known is not None:
+            known.update(fresh)
+        return fresh
+
+    async def refill(self, target: int = None) -> int:
+        """
+        Top the shared pool up to ``target`` addresses.
+
+        Returns:
+            int: Number of addresses added
+
+        Raises:
+            AddressPoolExhaustedError: If ADDRESS_GENERATE_MAX_ATTEMPTS batches
+                in a row yield nothing (saturated filter or address space)
+        """
+        target = target or settings.ADDRESS_POOL_TARGET
+        known = await self.warm()
+        redis = get_redis()
+        missing = target - await redis.llen(POOL_KEY)
+        added = 0
+        empty_batches = 0
+        while missing > 0:
+            addresses = await self.generate(min(missing, settings.ADDRESS_POOL_BATCH_SIZE), known)
+            if not addresses:
+                empty_batches += 1
+                if empty_batches >= settings.ADDRESS_GENERATE_MAX_ATTEMPTS:
+                    raise AddressPoolExhaustedError(
+                        f"No unused address in {empty_batches} batches, {added} added; "
+                        f"the known-address filter may be saturated"
+                    )
+                continue
+            empty_batches = 0
+            await redis.rpush(POOL_KEY, *addresses)
+            added += len(addresses)
+            missing -= len(addresses)
+        if added:
+            logger.info(f"Added {added} addresses to the mailbox pool")
+        return added
+
+    async def pop(self) -> str:
+        """
+        Take one address from the pool, generating one inline if the pool is empty.
+
+        Raises:
+            AddressPoolExhaustedError: If no unused address could be generated
+        """
+        address = await get_redis().lpop(POOL_KEY)
+        if address:
+            return address
+        logger.warning("Mailbox address pool is empty, generating inline")
+        for _ in range(settings.ADDRESS_GENERATE_MAX_ATTEMPTS):
+            addresses = await self.generate(1, self._known)
+            if addresses:
+                return addresses[0]
+        raise AddressPoolExhaustedError("Could not generate an unused mailbox address")
+
+
+address_allocator = AddressAllocator()
@@ -0,0 +1,318 @@
+import os
+import json
+import struct
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import bson
+from bson import ObjectId
+from gridfs.errors import NoFile
+from pymongo import DeleteOne, ReplaceOne, ReturnDocument
+from core import compression
+from core.config import settings
+from depends.db import database, get_gridfs_bucket
+from models.archive_model import ArchiveSegment, ArchivedMessage
+from models.email_model import EmailMessage
+from services.compression_services import COMPRESSED_FIELDS, CompressionService
+
+logger = logging.getLogger(__name__)
+
+# Segment trailer: big-endian offset of the compressed JSON index.
+_TRAILER = struct.Struct(">Q")
+
+
+class LocalSegmentStore:
+    """ Segments as files under ARCHIVE_DIR, written once via a temporary file and rename. """
+    backend = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, location: str) -> str:
+        return os.path.join(self.root, location)
+
+    def _write(self, location: str, data: bytes):
+        path = self._path(location)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.tmp", "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(f"{path}.tmp", path)
+
+    def _read(self, location: str, offset: int, length: int) -> bytes:
+        with open(self._path(location), "rb") as file:
+            file.seek(offset)
+            return file.read(length)
+
+    async def write(self, name: str, data: bytes) -> str:
+        await asyncio.to_thread(self._write, name, data)
+        return name
+
+    async def read(self, location: str, offset: int, length: int) -> bytes:
+        return await asyncio.to_thread(self._read, location, offset, length)
+
+    async def size(self, location: str) -> int:
+        return await asyncio.to_thread(os.path.getsize, self._path(location))
+
+    async def delete(self, location: str):
+        try:
+            await asyncio.to_thread(os.remove, self._path(location))
+        except FileNotFoundError:
+            pass
+
+
+class GridFSSegmentStore:
+    """ Segments as files in the BUCKET_NAME GridFS bucket; a ranged read only fetches the chunks it covers. """
+    backend = "gridfs"
+
+    async def write(self, name: str, data: bytes) -> str:
+        file_id = await get_gridfs_bucket().upload_from_stream(name, data, metadata={"kind": "archive-segment"})
+        return str(file_id)
+
+    async def read(self, location: str, offset: int, length: int) -> bytes:
+        stream = await get_gridfs_bucket().open_download_stream(ObjectId(location))
+        stream.seek(offset)
+        return await stream.read(length)
+
+    async def size(self, location: str) -> int:
+        stream = await get_gridfs_bucket().open_download_stream(ObjectId(location))
+        return stream.length
+
+    async def delete(self, location: str):
+        try:
+            await get_gridfs_bucket().delete(ObjectId(location))
+        except NoFile:
+            pass
+
+
+def get_segment_store(backend: Optional[str] = None):
+    backend = backend or settings.ARCHIVE_BACKEND
+    if backend == "local":
+        return LocalSegmentStore(settings.ARCHIVE_DIR)
+    if backend == "gridfs":
+        return GridFSSegmentStore()
+    raise ValueError(f"Unknown archive backend {backend}")
+
+
+class ArchiveService:
+    """
+    Moves cold messages out of ``email_messages`` into segment files.
+
+    A segment holds messages of one ``created_at`` day. Every message is a
+    separately compressed BSON record, so reading one back is a single
+    ranged read plus one decompression. The segment ends with its own
+    offset index (compressed JSON, then an 8-byte offset), which keeps it
+    self-describing. The same offsets are stored in ``archived_messages``
+    next to what the inbox lists, and listing merges in that
+    collection. Segments are never rewritten: deleting an archived
+    message removes its locator and attachments, and a segment is deleted
+    once no locator points to it any more (``message_count`` reaches 0).
+
+    Only messages without ``expires_at`` are archived. Those of temporary
+    mailboxes are deleted by the expiry job instead.
+    """
+
+    @staticmethod
+    def encode_record(message: Dict[str, Any], codec: str) -> bytes:
+        record = dict(message)
+        for field in COMPRESSED_FIELDS:
+            record[field] = compression.unpack(record.get(field), record.get("codec"))
+        record.pop("codec", None)
+        record.pop("search_text", None)
+        return compression.compress_bytes(bson.encode(record), codec)
+
+    @staticmethod
+    def decode_record(data: bytes, codec: str) -> Dict[str, Any]:
+        return bson.decode(compression.decompress_bytes(data, codec))
+
+    @staticmethod
+    def build_segment(messages: List[Dict[str, Any]], codec: str) -> Tuple[bytes, List[Tuple[int, int]]]:
+        """ Segment bytes and each message's (offset, length). """
+        parts, ranges, offset = [], [], 0
+        for message in messages:
+            record = ArchiveService.encode_record(message, codec)
+            parts.append(record)
+            ranges.append((offset, len(record)))
+            offset += len(record)
+        index = [[str(message["_id"]), start, length] for message, (start, length) in zip(messages, ranges)]
+        parts.append(compression.compress_bytes(json.dumps(index).encode(), codec))
+        parts.append(_TRAILER.pack(offset))
+        return b"".join(parts), ranges
+
+    @staticmethod
+    async def read_segment_index(segment: ArchiveSegment) -> List[Tuple[str, int, int]]:
+        """ Offset index stored at the end of a segment file: (message id, offset, length). """
+        store = get_segment_store(segment.backend)
+        total = await store.size(segment.location)
+        (index_offset,) = _TRAILER.unpack(await store.read(segment.location, total - _TRAILER.size, _TRAILER.size))
+        data = await store.read(segment.location, index_offset, total - _TRAILER.size - index_offset)
+        return [tuple(entry) for entry in json.loads(compression.decompress_bytes(data, segment.codec))]
+
+    @staticmethod
+    async def archive(current_time: datetime = None) -> Dict[str, int]:
+        """ Archive messages older than ARCHIVE_AFTER_DAYS, oldest day first.
+
+        Each segment is written and its locators upserted before the hot
+        documents are deleted, so a crash at any point loses nothing; a
+        rerun archives the leftovers again into a new segment and the
+        locators move to it.
+
+        :param current_time: Reference time, defaults to now.
+        :return: Number of segments written and messages archived.
+        """
+        current_time = current_time or datetime.utcnow()
+        cutoff = current_time - timedelta(days=settings.ARCHIVE_AFTER_DAYS)
+        codec = CompressionService.codec()
+        store = get_segment_store()
+        messages = database[EmailMessage.Settings.name]
+        result = {"segments": 0, "messages": 0}
+
+        for _ in range(settings.ARCHIVE_MAX_SEGMENTS_PER_RUN):
+            cold = {"created_at": {"$lt": cutoff}, "expires_at": None}
+            oldest = await messages.find_one(cold, projection={"created_at": 1}, sort=[("created_at", 1)])
+            if oldest is None:
+                break
+            day = oldest["created_at"].date()
+            start = datetime.combine(day, time.min)
+            batch = await messages.find(
+                {**cold, "created_at": {"$gte": start, "$lt": min(start + timedelta(days=1), cutoff)}}
+            ).sort([("created_at", 1), ("_id", 1)]) \
+                .limit(settings.ARCHIVE_SEGMENT_MAX_MESSAGES) \
+                .to_list(length=settings.ARCHIVE_SEGMENT_MAX_MESSAGES)
+
+            await ArchiveService._write_segment(day, batch, codec, store)
+            result["segments"] += 1
+            result["messages"] += len(batch)
+
+        if result["messages"]:
+            logger.info(f"Archived {result['messages']} messages into {result['segments']} segments")
+        return result
+
+    @staticmethod
+    async def _write_segment(day: date, batch: List[Dict[str, Any]], codec: str, store) -> ArchiveSegment:
+        """ Write one segment and move its messages out of the hot collection.
+
+        Locators are upserted before any hot document is deleted, and each
+        delete only matches the message as it was read (same ``_id`` and
+        ``read`` flag). Messages deleted meanwhile lose their locator;
+        messages whose read flag changed stay hot, also without a locator,
+        and are archived again by a later run.
+        """
+        data, ranges = await asyncio.to_thread(ArchiveService.build_segment, batch, codec)
+        segment_id = ObjectId()
+        location = await store.write(f"{day:%Y/%m/%d}/{segment_id}.seg", data)
+        segment = ArchiveSegment(
+            id=segment_id, partition=day, backend=store.backend, location=location,
+            codec=codec, message_count=len(batch), size=len(data)
+        )
+        await segment.insert()
+
+        messages = database[EmailMessage.Settings.name]
+        archived = database[ArchivedMessage.Settings.name]
+        ids = [message["_id"] for message in batch]
+        # Locators left by an earlier run that crashed before its deletes.
+        previous = await archived.find({"_id": {"$in": ids}}, projection={"segment_id": 1}).to_list(length=None)
+        await archived.bulk_write([
+            ReplaceOne({"_id": message["_id"]}, {
+                "message_id": message["message_id"],
+                "from_email": message["from_email"],
+                "to_email": message["to_email"],
+                "subject": message["subject"],
+                "status": message["status"],
+                "created_at": message["created_at"],
+                "read": message.get("read", False),
+                "user_id": message["user_id"],
+                "size": message.get("size", 0),
+                "search_text": message.get("search_text", ""),
+                "attachment_ids": [
+                    attachment["file_id"] for attachment in message.get("attachments", [])
+                    if attachment.get("file_id") is not None
+                ],
+                "segment_id": segment_id,
+                "offset": offset,
+                "length": length,
+            }, upsert=True)
+            for message, (offset, length) in zip(batch, ranges)
+        ], ordered=False)
+        for old_segment_id in [locator["segment_id"] for locator in previous]:
+            await ArchiveService._release_segment(old_segment_id)
+
+        hot = await messages.find({"_id": {"$in": ids}}, projection={"_id": 1}).to_list(length=None)
+        hot = {message["_id"] for message in hot}
+        changed = []
+        if hot:
+            await messages.bulk_write([
+                DeleteOne({"_id": message["_id"], "read": message.get("read", False)})
+                for message in batch if message["_id"] in hot
+            ], ordered=False)
+            changed = await messages.find({"_id": {"$in": list(hot)}}, projection={"_id": 1}).to_list(length=None)
+            changed = [message["_id"] for message in changed]
+
+        dropped = [message_id for message_id in ids if message_id not in hot] + changed
+        if dropped:
+            result = await archived.delete_many({"_id": {"$in": dropped}, "segment_id": segment_id})
+            if result.deleted_count:
+                await ArchiveService._release_segment(segment_id, result.deleted_count)
+        return segment
+
+    @staticmethod
+    async def _release_segment(segment_id: ObjectId, count: int = 1):
+        """ Drop ``count`` locators from a segment's count; delete the segment when none is left. """
+        segment = await database[ArchiveSegment.Settings.name].find_one_and_update(
+            {"_id": segment_id}, {"$inc": {"message_count": -count}}, return_document=ReturnDocument.AFTER
+        )
+        if segment is None or segment["message_count"] > 0:
+            return
+        await get_segment_store(segment["backend"]).delete(segment["location"])
+        await database[ArchiveSegment.Settings.name].delete_one({"_id": segment_id, "message_count": {"$lte": 0}})
+        logger.info(f"Deleted empty archive segment {segment_id}")
+
+    @staticmethod
+    async def get_locator(user_id: str, message_id: ObjectId) -> Optional[Dict[str, Any]]:
+        return await database[ArchivedMessage.Settings.name].find_one({"_id": message_id, "user_id": user_id})
+
+    @staticmethod
+    async def fetch(locator: Dict[str, Any]) -> Dict[str, Any]:
+        """ Full archived message for a locator, with one ranged read of its segment. """
+        segment = await ArchiveSegment.get(locator["segment_id"])
+        if segment is None:
+            raise LookupError(f"Archive segment {locator['segment_id']} is missing")
+        data = await get_segment_store(segment.backend).read(segment.location, locator["offset"], locator["length"])
+        message = ArchiveService.decode_record(data, segment.codec)
+        # The read flag lives on the locator once archived.
+        message["read"] = locator.get("read", False)
+        return message
+
+    @staticmethod
+    async def set_read(user_id: str, message_id: ObjectId, read: bool) -> Tuple[bool, Optional[str]]:
+        """ Set the read flag of an archived message.
+
+        :return: Whether the message exists, and its mailbox address if the flag changed.
+        """
+        archived = database[ArchivedMessage.Settings.name]
+        query = {"_id": message_id, "user_id": user_id}
+        locator = await archived.find_one_and_update(
+            {**query, "read": {"$ne": read}}, {"$set": {"read": read}}, projection={"to_email": 1}
+        )
+        if locator is not None:
+            return True, locator["to_email"]
+        return await archived.count_documents(query, limit=1) > 0, None
+
+    @staticmethod
+    async def delete(user_id: str, message_id: ObjectId) -> Optional[Dict[str, Any]]:
+        """ Forget an archived message and delete its attachments, and its segment once it was the last one.
+
+        :return: The removed locator, or None when there was none.
+        """
+        locator = await database[ArchivedMessage.Settings.name].find_one_and_delete(
+            {"_id": message_id, "user_id": user_id}
+        )
+        if locator is not None:
+            await ArchiveService._release_segment(locator["segment_id"])
+        if locator is not None and locator.get("attachment_ids"):
+            bucket_name = settings.BUCKET_NAME
+            await database[f"{bucket_name}.chunks"].delete_many({"files_id": {"$in": locator["attachment_ids"]}})
+            await database[f"{bucket_name}.files"].delete_many({"_id": {"$in": locator["attachment_ids"]}})
+        return locator
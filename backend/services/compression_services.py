@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+from pymongo import UpdateOne
+from core import compression
+from core.config import settings
+from depends.db import database
+from models.email_model import EmailMessage
+
+logger = logging.getLogger(__name__)
+
+# Message fields stored compressed.
+COMPRESSED_FIELDS = ("body", "html", "raw_message")
+
+# Above this many characters, compression runs off the event loop (zlib and zstd release the GIL).
+_THREAD_THRESHOLD = 64 * 1024
+
+
+class CompressionService:
+
+    @staticmethod
+    def codec() -> str:
+        return compression.available_codec(settings.MESSAGE_COMPRESSION_CODEC)
+
+    @staticmethod
+    def pack_sync(fields: Dict[str, Optional[str]]) -> Dict[str, Any]:
+        return compression.pack(
+            fields,
+            CompressionService.codec(),
+            settings.MESSAGE_COMPRESSION_MIN_BYTES,
+            settings.MESSAGE_COMPRESSION_LEVEL
+        )
+
+    @staticmethod
+    async def pack(body: str, html: Optional[str], raw_message: Optional[str]) -> Dict[str, Any]:
+        """ Message content as stored: body, html and raw_message (compressed when worth it) and codec.
+
+        :return: Keyword arguments for EmailMessage.
+        """
+        fields = {"body": body, "html": html, "raw_message": raw_message}
+        if sum(len(value) for value in fields.values() if value) > _THREAD_THRESHOLD:
+            return await asyncio.to_thread(CompressionService.pack_sync, fields)
+        return CompressionService.pack_sync(fields)
+
+    @staticmethod
+    async def migrate(batch_size: Optional[int] = None) -> Dict[str, int]:
+        """ Compress messages stored before compression, one batch at a time.
+
+        Only documents without a codec are touched, and each update is
+        conditional on that, so the migration can be rerun or run while
+        new mail arrives. Batches are walked by ``_id``.
+
+        Sizes are UTF-8 bytes. ``search_text_bytes`` is the plain text kept
+        for the search index next to the compressed content (at most
+        SEARCH_TEXT_MAX_CHARS per message); it is not compressed, so it
+        bounds what compression can save.
+
+        :param batch_size: Messages per batch (default: MESSAGE_COMPRESSION_BATCH_SIZE).
+        :return: Messages migrated, the stored size of the content before and after, and search text size.
+        """
+        batch_size = batch_size or settings.MESSAGE_COMPRESSION_BATCH_SIZE
+        messages = database[EmailMessage.Settings.name]
+        projection = {field: 1 for field in (*COMPRESSED_FIELDS, "search_text")}
+        result = {"migrated": 0, "bytes_before": 0, "bytes_after": 0, "search_text_bytes": 0}
+        last_id = None
+
+        while True:
+            query: Dict[str, Any] = {"codec": None}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await messages.find(query, projection=projection) \
+                .sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+
+            packed = await asyncio.to_thread(
+                lambda: [CompressionService.pack_sync({field: doc.get(field) for field in COMPRESSED_FIELDS}) for doc in batch]
+            )
+            updates = []
+            for doc, fields in zip(batch, packed):
+                result["bytes_before"] += sum(compression.stored_size(doc.get(field)) for field in COMPRESSED_FIELDS)
+                result["bytes_after"] += sum(compression.stored_size(fields[field]) for field in COMPRESSED_FIELDS)
+                result["search_text_bytes"] += compression.stored_size(doc.get("search_text"))
+                updates.append(UpdateOne({"_id": doc["_id"], "codec": None}, {"$set": fields}))
+            write = await messages.bulk_write(updates, ordered=False)
+            result["migrated"] += write.modified_count
+            logger.info(f"Compression migration: {result['migrated']} messages, "
+                        f"{result['bytes_before']} -> {result['bytes_after']} bytes "
+                        f"(+{result['search_text_bytes']} bytes of search text)")
+        return result
@@ -0,0 +1,171 @@
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from pymongo import UpdateOne
+from core.config import settings
+from depends.db import database
+from models.archive_model import ArchivedMessage
+from models.counters_model import MailboxCounters
+from models.email_model import EmailMessage
+from models.mailbox_model import Mailbox
+
+logger = logging.getLogger(__name__)
+
+
+class CounterService:
+    """
+    Per-mailbox total/unread/size counters kept in ``mailbox_counters``.
+
+    Every change to a mailbox's messages applies a ``$inc`` to its counters
+    document, so badge and quota reads are one ``_id`` lookup. Deletions
+    the application does not see (the TTL index backstop) and lost
+    increments are fixed by :meth:`reconcile`.
+    """
+
+    @staticmethod
+    def _collection():
+        return database[MailboxCounters.Settings.name]
+
+    @staticmethod
+    def _inc(address: str, user_id: Optional[str], total: int, unread: int, size: int) -> UpdateOne:
+        update: Dict[str, Any] = {
+            "$inc": {"total": total, "unread": unread, "size": size},
+            "$set": {"updated_at": datetime.utcnow()},
+        }
+        if user_id is not None:
+            update["$setOnInsert"] = {"user_id": user_id}
+        return UpdateOne({"_id": address}, update, upsert=user_id is not None)
+
+    @staticmethod
+    async def _apply(updates: List[UpdateOne]):
+        # The message change is already done; a lost increment is drift for reconcile() to fix.
+        try:
+            await CounterService._collection().bulk_write(updates, ordered=False)
+        except Exception as e:
+            logger.warning(f"Could not update mailbox counters: {str(e)}")
+
+    @staticmethod
+    async def message_added(message: EmailMessage):
+        await CounterService._apply([
+            CounterService._inc(message.to_email, message.user_id, 1, 0 if message.read else 1, message.size)
+        ])
+
+    @staticmethod
+    async def read_changed(address: str, read: bool):
+        """ Apply a message's read flag flip (only call after the flag actually changed). """
+        await CounterService._apply([CounterService._inc(address, None, 0, -1 if read else 1, 0)])
+
+    @staticmethod
+    async def messages_removed(messages: Iterable[Dict[str, Any]]):
+        """ Decrement counters for removed messages (documents with to_email, read and size). """
+        deltas = defaultdict(lambda: [0, 0, 0])
+        for message in messages:
+            delta = deltas[message["to_email"]]
+            delta[0] -= 1
+            delta[1] -= 0 if message.get("read") else 1
+            delta[2] -= message.get("size", 0)
+        if deltas:
+            await CounterService._apply([CounterService._inc(address, None, *delta) for address, delta in deltas.items()])
+
+    @staticmethod
+    async def remove(addresses: List[str]):
+        """ Drop the counters of deleted mailboxes. """
+        await CounterService._collection().delete_many({"_id": {"$in": addresses}})
+
+    @staticmethod
+    async def get(address: str) -> Optional[MailboxCounters]:
+        return await MailboxCounters.get(address)
+
+    @staticmethod
+    async def get_for_user(user_id: str) -> List[MailboxCounters]:
+        return await MailboxCounters.find(MailboxCounters.user_id == user_id).to_list()
+
+    @staticmethod
+    async def reconcile(batch_size: int = None) -> Dict[str, int]:
+        """ Recount every mailbox from its messages and fix counters that drifted.
+
+        Mailboxes are walked by ``_id`` in batches; each batch is recounted
+        with one aggregation over the ``to_email`` index and only counters
+        that differ are rewritten. An increment landing between the recount
+        and the write is overwritten and corrected by the next run.
+
+        :param batch_size: Mailboxes per batch (default: COUNTERS_RECONCILE_BATCH_SIZE).
+        :return: Number of mailboxes checked and counters fixed.
+        """
+        batch_size = batch_size or settings.COUNTERS_RECONCILE_BATCH_SIZE
+        mailboxes = database[Mailbox.Settings.name]
+        result = {"checked": 0, "fixed": 0}
+        last_id = None
+
+        while True:
+            query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+            batch = await mailboxes.find(query, projection={"_id": 1, "address": 1, "user_id": 1}) \
+                .sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+            result["checked"] += len(batch)
+            result["fixed"] += await CounterService._recount(batch)
+
+        if result["fixed"]:
+            logger.warning(f"Counter reconciliation fixed {result['fixed']} of {result['checked']} mailboxes")
+        return result
+
+    @staticmethod
+    async def recount(addresses: List[str]) -> int:
+        """ Recount the given mailboxes now, for removals whose counts are not known exactly.
+
+        :return: Number of counters fixed.
+        """
+        try:
+            mailboxes = await database[Mailbox.Settings.name].find(
+                {"address": {"$in": addresses}}, projection={"_id": 1, "address": 1, "user_id": 1}
+            ).to_list(length=None)
+            return await CounterService._recount(mailboxes) if mailboxes else 0
+        except Exception as e:
+            # Same as a lost increment: reconcile() fixes it later.
+            logger.warning(f"Could not recount mailbox counters: {str(e)}")
+            return 0
+
+    @staticmethod
+    async def _recount(mailboxes: List[Dict[str, Any]]) -> int:
+        """ Recount ``mailboxes`` with one aggregation per collection and rewrite counters that differ. """
+        messages = database[EmailMessage.Settings.name]
+        archived = database[ArchivedMessage.Settings.name]
+        counters = CounterService._collection()
+        owners = {mailbox["address"]: mailbox["user_id"] for mailbox in mailboxes}
+
+        actual = {address: (0, 0, 0) for address in owners}
+        # Archived messages still count towards their mailbox.
+        for collection in (messages, archived):
+            async for row in collection.aggregate([
+                {"$match": {"to_email": {"$in": list(owners)}}},
+                {"$group": {
+                    "_id": "$to_email",
+                    "total": {"$sum": 1},
+                    "unread": {"$sum": {"$cond": [{"$eq": ["$read", True]}, 0, 1]}},
+                    "size": {"$sum": {"$ifNull": ["$size", 0]}},
+                }},
+            ]):
+                total, unread, size = actual[row["_id"]]
+                actual[row["_id"]] = (total + row["total"], unread + row["unread"], size + row["size"])
+
+        stored = {
+            row["_id"]: (row.get("total"), row.get("unread"), row.get("size"))
+            async for row in counters.find({"_id": {"$in": list(owners)}})
+        }
+        now = datetime.utcnow()
+        fixes = [
+            UpdateOne(
+                {"_id": address},
+                {"$set": {"user_id": owners[address], "total": total, "unread": unread, "size": size,
+                          "updated_at": now}},
+                upsert=True
+            )
+            for address, (total, unread, size) in actual.items()
+            if stored.get(address) != (total, unread, size)
+        ]
+        if fixes:
+            await counters.bulk_write(fixes, ordered=False)
+        return len(fixes)
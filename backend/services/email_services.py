@@ -1,91 +1,396 @@
 import os
 import json
+import hashlib
+import time
+import uuid
+import asyncio
 import logging
 from typing import List, Dict, Optional, Any
 from datetime import datetime, timedelta
-import httpx
 from fastapi import HTTPException, status
 from core.config import settings
-from celery import shared_task
-from celery.schedules import crontab
+from pymongo import ASCENDING, ReturnDocument
+from depends.db import database
+from depends.http_client import get_http_client
+from models.email_model import EmailStatus
+from models.scheduled_job_model import ScheduledEmailJob
+from services.rate_limiter import mailgun_rate_limiter, mailgun_concurrency_limiter
+from services.idempotency import ClaimResult, send_idempotency
+from services.recipient_validation import recipient_validator
+from services.suppression_services import suppression_filter
+from services.template_services import TemplateService
+from services.resilience import CircuitOpenError, call_with_resilience, mailgun_breaker, mailgun_retry_policy
+from schemas.email_schema import BatchRecipient, BatchSendReport, ChunkReport
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# In-memory storage for scheduled emails (you might want to use a database in production)
-_scheduled_emails: Dict[str, Dict[str, Any]] = {}
-
 class EmailService:
     @staticmethod
-    @shared_task(bind=True, name="send_scheduled_emails")
-    async def send_scheduled_emails(self, job_id: str = None):
+    async def claim_due_jobs(current_time: datetime) -> List[Dict[str, Any]]:
         """
-        Celery task to send scheduled emails.
-        If job_id is provided, sends only that specific job's emails.
-        Otherwise, sends all due scheduled emails.
+        Claim every due scheduled job (run by the ``tasks.email_tasks`` beat task).
+
+        Only due jobs are touched: each claim is an indexed range read on
+        next_run that atomically leases the job's current run, so
+        concurrent ticks never pick the same run twice. next_run only moves
+        once the run is sent (complete_scheduled_run); a run whose attempts
+        all fail, or whose worker dies, is claimed again with the same
+        run id once the lease expires. Expired jobs are removed instead of
+        returned.
+
+        Returns:
+            List of claimed jobs; their ``next_run`` identifies the run
         """
-        if job_id:
-            if job_id in _scheduled_emails:
-                await EmailService._send_email_batch(_scheduled_emails[job_id])
-        else:
-            current_time = datetime.utcnow()
-            for job_id, job_data in list(_scheduled_emails.items()):
-                if job_data['end_time'] and job_data['end_time'] < current_time:
-                    # Remove expired jobs
-                    _scheduled_emails.pop(job_id, None)
-                    continue
-                    
-                if job_data['next_run'] <= current_time:
-                    try:
-                        await EmailService._send_email_batch(job_data)
-                        # Update next run time
-                        job_data['next_run'] = current_time + timedelta(minutes=job_data['interval_minutes'])
-                        _scheduled_emails[job_id] = job_data
-                    except Exception as e:
-                        logger.error(f"Error sending scheduled email job {job_id}: {str(e)}")
+        claimed = []
+        for _ in range(settings.SCHEDULER_MAX_JOBS_PER_TICK):
+            job_data = await EmailService._claim_due_job(current_time)
+            if job_data is None:
+                break
+
+            if job_data['end_time'] and job_data['end_time'] < current_time:
+                # Remove expired jobs
+                await database[ScheduledEmailJob.Settings.name].delete_one({'_id': job_data['_id']})
+                continue
+            claimed.append(job_data)
+        return claimed
+
+    @staticmethod
+    async def claim_job(job_id: str, current_time: datetime) -> Optional[Dict[str, Any]]:
+        """
+        Claim a job's current run now, due or not (manual runs).
+
+        The claim is the same lease the beat task takes, so the run is
+        completed or released like a scheduled one and next_run advances.
+
+        Returns:
+            The claimed job, or None if it does not exist or a run is in flight
+        """
+        return await EmailService._claim_due_job(current_time, job_id)
+
+    @staticmethod
+    async def _claim_due_job(current_time: datetime, job_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Lease the earliest due, unclaimed run of a job (or job_id's run, due or not); returns the claimed job"""
+        collection = database[ScheduledEmailJob.Settings.name]
+        return await collection.find_one_and_update(
+            {
+                **({"job_id": job_id} if job_id else {"next_run": {"$lte": current_time}}),
+                "$or": [{"locked_until": None}, {"locked_until": {"$lte": current_time}}],
+            },
+            [{"$set": {
+                "claimed_run": "$next_run",
+                "locked_until": current_time + timedelta(seconds=settings.SCHEDULER_CLAIM_LEASE_SECONDS),
+            }}],
+            sort=[("next_run", ASCENDING)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @staticmethod
+    async def complete_scheduled_run(job_id: str, run_id: str):
+        """Release a sent run's claim and schedule the next run one interval from now"""
+        await database[ScheduledEmailJob.Settings.name].update_one(
+            {"job_id": job_id, "claimed_run": datetime.fromisoformat(run_id)},
+            [{"$set": {
+                "next_run": {"$add": [datetime.utcnow(), {"$multiply": ["$interval_minutes", 60_000]}]},
+                "claimed_run": None,
+                "locked_until": None,
+            }}]
+        )
+
+    @staticmethod
+    async def release_scheduled_run(job_id: str, run_id: str):
+        """Give up a run's claim without advancing next_run, so the next tick claims the same run again"""
+        await database[ScheduledEmailJob.Settings.name].update_one(
+            {"job_id": job_id, "claimed_run": datetime.fromisoformat(run_id)},
+            {"$set": {"claimed_run": None, "locked_until": None}}
+        )
+
+    @staticmethod
+    async def send_scheduled_run(job_id: str, run_id: str) -> Optional[BatchSendReport]:
+        """
+        Send one run of a scheduled job.
+
+        Safe to call again for the same (job_id, run_id): chunks already
+        delivered by an earlier attempt are skipped.
+
+        Returns:
+            BatchSendReport, or None if the job no longer exists
+        """
+        job = await ScheduledEmailJob.find_one(ScheduledEmailJob.job_id == job_id)
+        if job is None:
+            return None
+        return await EmailService._send_email_batch(job.model_dump(), run_id)
 
     @staticmethod
-    async def _send_email_batch(job_data: Dict[str, Any]):
+    async def _send_email_batch(job_data: Dict[str, Any], run_id: str) -> BatchSendReport:
         """Helper method to send a batch of emails"""
-        try:
-            await EmailService.send_simple_message(
-                to_emails=job_data['to_emails'],
-                subject=job_data['subject']
-            )
+        report = await EmailService.send_batch_message(
+            recipients=[BatchRecipient(email=address) for address in job_data['to_emails']],
+            subject=job_data['subject'],
+            idempotency_key=f"{job_data['job_id']}:{run_id}",
+            history_batch_id=f"{job_data['job_id']}:{run_id}"
+        )
+        if report.complete:
             logger.info(f"Successfully sent scheduled email batch with job_id: {job_data.get('job_id')}")
-        except Exception as e:
-            logger.error(f"Error in scheduled email job {job_data.get('job_id')}: {str(e)}")
-            raise
+        else:
+            logger.error(
+                f"Scheduled email job {job_data.get('job_id')} run {run_id}: "
+                f"{report.failed} of {report.total_recipients} recipients not delivered"
+            )
+        return report
+
+    @staticmethod
+    async def _post_message(data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Post a message to Mailgun, retrying transient failures behind the circuit breaker.
+
+        Mailgun's messages API has no idempotency key, so the call is not
+        idempotent: errors after the request may have been sent (read
+        timeouts, dropped connections) are not retried here.
+        """
+        return await call_with_resilience(
+            lambda: EmailService._post_message_once(data),
+            breaker=mailgun_breaker,
+            policy=mailgun_retry_policy
+        )
+
+    @staticmethod
+    async def _post_message_once(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Single rate-limited POST through the shared client; returns the JSON reply"""
+        await mailgun_rate_limiter.acquire()
+        async with mailgun_concurrency_limiter:
+            started = time.monotonic()
+            response = await get_http_client().post("/messages", data=data)
+            mailgun_concurrency_limiter.record(
+                time.monotonic() - started,
+                throttled=response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+            )
+        response.raise_for_status()
+        return response.json()
 
     @staticmethod
     async def send_simple_message(to_emails: List[str], subject: str):
+        """
+        Send one message to every address, recorded as an outbox history batch.
+
+        Returns:
+            Mailgun's reply plus ``batch_id`` and any invalid or suppressed recipients
+        """
+        import httpx
+        # outbox_services imports this module.
+        from services.outbox_services import OutboxService
+
+        validation = await recipient_validator.validate(to_emails)
+        if not validation.valid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=[recipient.model_dump() for recipient in validation.invalid] or "No recipients"
+            )
+        to_emails, suppressed = await suppression_filter.filter(validation.valid)
+        batch_id = uuid.uuid4().hex
+        outcomes = [([recipient.email], EmailStatus.FAILED, None, recipient.reason) for recipient in validation.invalid]
+        if suppressed:
+            outcomes.append((suppressed, EmailStatus.FAILED, None, "Recipient is suppressed"))
+
+        async def record(sent_status: EmailStatus, provider_id: Optional[str] = None, error: Optional[str] = None):
+            await OutboxService.record(
+                batch_id, subject, outcomes + [(to_emails, sent_status, provider_id, error)],
+                template=settings.MAILGUN_TEMPLATE
+            )
+
+        if not to_emails:
+            await record(EmailStatus.FAILED)
+            return {"message": "All recipients are suppressed", "suppressed": suppressed, "batch_id": batch_id}
         try:
-            response = await httpx.AsyncClient().post(
-                f"https://api.mailgun.net/v3/{settings.MAILGUN_DOMAIN}/messages",
-                auth=("api", settings.MAILGUN_API_KEY),
-                data={
-                    "from": settings.MAILGUN_FROM_EMAIL,
-                    "to": to_emails,
-                    "subject": subject,
-			        "template": "Carta de delitos penales de ciberseguridad",
-                    "h:X-Mailgun-Variables": '{"test": "test"}'
-                },
+            result = await EmailService._post_message({
+                "from": settings.MAILGUN_FROM_EMAIL,
+                "to": to_emails,
+                "subject": subject,
+                "template": settings.MAILGUN_TEMPLATE,
+                "h:X-Mailgun-Variables": '{"test": "test"}'
+            })
+        except CircuitOpenError:
+            await record(EmailStatus.FAILED, error="Mailgun is unavailable")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Mailgun is unavailable, try again later"
             )
-            response.raise_for_status()
-            return response.json()
         except httpx.HTTPStatusError as e:
+            await record(EmailStatus.FAILED, error=str(e))
             raise HTTPException(
                 status_code=e.response.status_code,
                 detail="Error sending email via Mailgun"
             )
         except Exception as e:
+            await record(EmailStatus.FAILED, error=str(e))
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Unexpected error sending email: {str(e)}"
             )
-            
+        await record(EmailStatus.SENT, provider_id=result.get("id"))
+        result["batch_id"] = batch_id
+        if validation.invalid:
+            result["invalid"] = [recipient.model_dump() for recipient in validation.invalid]
+        if suppressed:
+            result["suppressed"] = suppressed
+        return result
+
+    @staticmethod
+    async def send_batch_message(
+        recipients: List[BatchRecipient],
+        subject: str,
+        template: Optional[str] = None,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        idempotency_key: Optional[str] = None,
+        local_template: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+        history_batch_id: Optional[str] = None
+    ) -> BatchSendReport:
+        """
+        Send one personalized copy per recipient using Mailgun batch sending.
+
+        Undeliverable addresses (no MX for the domain) and suppressed ones
+        (bounces, complaints) are dropped first. The rest
+        are split into chunks of at most ``batch_size`` addresses and
+        every chunk carries its ``recipient-variables``, so each recipient only
+        sees their own address. Chunks are posted concurrently, bounded by
+        ``concurrency``. A failing chunk does not abort the others.
+
+        Args:
+            recipients: Recipients and their per-recipient template variables
+            subject: Email subject
+            template: Mailgun template name (default: MAILGUN_TEMPLATE)
+            batch_size: Recipients per API call (default: MAILGUN_BATCH_SIZE)
+            concurrency: Max chunks in flight (default: MAILGUN_BATCH_CONCURRENCY)
+            idempotency_key: Identifies this send across replays. Each chunk is
+                recorded under "<key>:<digest of its sorted addresses>" and
+                skipped if already delivered. Keys follow a chunk's content,
+                not its position, so a replay whose validation or suppression
+                results changed never skips an address it did not send.
+            local_template: Name of a stored EmailTemplate to render locally
+                instead of using a Mailgun template. It is rendered once with
+                ``context``; variables provided per recipient are left as
+                recipient-variables placeholders for Mailgun to fill in.
+            context: Variables shared by every recipient of a local template
+            history_batch_id: Record the outcome per recipient as outbox
+                history rows of this batch (see OutboxService.record). Sends
+                made by the outbox itself leave it out.
+
+        Returns:
+            BatchSendReport: Per-chunk delivery report
+        """
+        batch_size = min(batch_size or settings.MAILGUN_BATCH_SIZE, settings.MAILGUN_BATCH_SIZE)
+        semaphore = asyncio.Semaphore(concurrency or settings.MAILGUN_BATCH_CONCURRENCY)
+
+        # Deduplicate by address, last variables win.
+        unique = {str(recipient.email): recipient.variables for recipient in recipients}
+        # EmailStr already normalizes, so valid addresses are keys of ``unique``.
+        validation = await recipient_validator.validate(unique)
+        addresses, suppressed = await suppression_filter.filter(validation.valid)
+        chunks = [addresses[i:i + batch_size] for i in range(0, len(addresses), batch_size)]
+
+        content: Dict[str, Any] = {"subject": subject, "template": template or settings.MAILGUN_TEMPLATE}
+        recipient_keys = None
+        if local_template:
+            compiled = await TemplateService.get_compiled(local_template)
+            recipient_keys = compiled.variables & {key for variables in unique.values() for key in variables}
+            rendered = TemplateService.render_for_batch(compiled, context or {}, recipient_keys)
+            content = {key: value for key, value in rendered.model_dump().items() if value is not None}
+
+        def recipient_variables(address: str) -> Dict[str, Any]:
+            if recipient_keys is None:
+                return unique[address]
+            return TemplateService.batch_recipient_variables(unique[address], recipient_keys)
+
+        async def send_chunk(index: int, chunk: List[str]) -> ChunkReport:
+            data = {
+                "from": settings.MAILGUN_FROM_EMAIL,
+                "to": chunk,
+                **content,
+                "recipient-variables": json.dumps({address: recipient_variables(address) for address in chunk}),
+            }
+            chunk_key = EmailService._chunk_key(idempotency_key, chunk) if idempotency_key else None
+            async with semaphore:
+                try:
+                    if chunk_key:
+                        claim = await send_idempotency.claim(chunk_key)
+                        if claim == ClaimResult.DONE:
+                            return ChunkReport(chunk=index, recipients=chunk, delivered=True, skipped=True)
+                        if claim == ClaimResult.IN_PROGRESS:
+                            return ChunkReport(
+                                chunk=index, recipients=chunk, delivered=False, in_progress=True,
+                                error="Chunk is being sent by another attempt"
+                            )
+                    result = await EmailService._post_message(data)
+                except Exception as e:
+                    logger.error(f"Error sending batch chunk {index} ({len(chunk)} recipients): {str(e)}")
+                    if chunk_key:
+                        await EmailService._release_chunk(chunk_key)
+                    return ChunkReport(chunk=index, recipients=chunk, delivered=False, error=str(e))
+
+                if chunk_key:
+                    await EmailService._mark_chunk_done(chunk_key)
+                return ChunkReport(chunk=index, recipients=chunk, delivered=True, provider_id=result.get("id"))
+
+        reports = await asyncio.gather(*(send_chunk(i, chunk) for i, chunk in enumerate(chunks)))
+        delivered = sum(len(report.recipients) for report in reports if report.delivered)
+        report = BatchSendReport(
+            total_recipients=len(unique),
+            total_chunks=len(chunks),
+            delivered=delivered,
+            failed=len(addresses) - delivered,
+            chunks=reports,
+            suppressed=suppressed,
+            invalid=validation.invalid,
+            batch_id=history_batch_id
+        )
+        if history_batch_id:
+            # outbox_services imports this module.
+            from services.outbox_services import OutboxService
+
+            await OutboxService.record(
+                history_batch_id, subject, OutboxService.report_outcomes(report),
+                template=None if local_template else template or settings.MAILGUN_TEMPLATE,
+                local_template=local_template,
+                context=context,
+                variables=unique
+            )
+        return report
+
+    @staticmethod
+    def _chunk_key(idempotency_key: str, chunk: List[str]) -> str:
+        """Idempotency key of a chunk: the send's key plus a digest of the chunk's addresses"""
+        digest = hashlib.sha256("\n".join(sorted(chunk)).encode()).hexdigest()[:32]
+        return f"{idempotency_key}:{digest}"
+
+    @staticmethod
+    async def _mark_chunk_done(chunk_key: str):
+        """Record a delivered chunk; on failure its lease still keeps it from being resent until it expires"""
+        try:
+            await send_idempotency.mark_done(chunk_key)
+        except Exception as e:
+            logger.error(f"Could not mark idempotency key {chunk_key} done: {str(e)}")
+
+    @staticmethod
+    async def _release_chunk(chunk_key: str):
+        """Drop a chunk's lease after a failed send so a retry can send it"""
+        try:
+            await send_idempotency.release(chunk_key)
+        except Exception as e:
+            logger.error(f"Could not release idempotency key {chunk_key}: {str(e)}")
+
+    @staticmethod
+    def get_provider_status() -> Dict[str, Any]:
+        """Breaker, retry and concurrency counters for the Mailgun integration"""
+        return {
+            "breaker": mailgun_breaker.stats(),
+            "retries": mailgun_retry_policy.stats(),
+            "concurrency": mailgun_concurrency_limiter.stats(),
+        }
+
     @classmethod
-    def schedule_email_job(
+    async def schedule_email_job(
         cls, 
         to_emails: List[str], 
         subject: str, 
@@ -106,41 +411,44 @@ class EmailService:
         Returns:
             str: The job ID for the scheduled task
         """
-        import uuid
-        from datetime import datetime, timedelta
-        
         job_id = job_id or f"email_job_{uuid.uuid4().hex[:8]}"
         current_time = datetime.utcnow()
         
         # Store the email configuration
-        _scheduled_emails[job_id] = {
-            'job_id': job_id,
-            'to_emails': to_emails,
-            'subject': subject,
-            'interval_minutes': interval_minutes,
-            'next_run': current_time + timedelta(minutes=interval_minutes),
-            'end_time': current_time + timedelta(minutes=duration_minutes) if duration_minutes else None,
-            'created_at': current_time
-        }
+        await database[ScheduledEmailJob.Settings.name].update_one(
+            {'job_id': job_id},
+            {
+                '$set': {
+                    'to_emails': to_emails,
+                    'subject': subject,
+                    'interval_minutes': interval_minutes,
+                    'next_run': current_time + timedelta(minutes=interval_minutes),
+                    'end_time': current_time + timedelta(minutes=duration_minutes) if duration_minutes else None,
+                },
+                '$setOnInsert': {'created_at': current_time},
+            },
+            upsert=True
+        )
         
         logger.info(f"Scheduled email job {job_id} to run every {interval_minutes} minutes")
         return job_id
     
     @classmethod
-    def get_scheduled_jobs(cls) -> Dict[str, Dict[str, Any]]:
-        """Get all scheduled email jobs"""
-        return _scheduled_emails
+    async def get_scheduled_jobs(cls) -> Dict[str, Dict[str, Any]]:
+        """Get all scheduled email jobs, ordered by next run"""
+        jobs = await ScheduledEmailJob.find_all().sort(+ScheduledEmailJob.next_run).to_list()
+        return {job.job_id: job.model_dump(exclude={"id"}) for job in jobs}
     
     @classmethod
-    def remove_scheduled_job(cls, job_id: str) -> bool:
+    async def remove_scheduled_job(cls, job_id: str) -> bool:
         """
         Remove a scheduled email job
         
         Returns:
             bool: True if job was found and removed, False otherwise
         """
-        if job_id in _scheduled_emails:
-            _scheduled_emails.pop(job_id, None)
+        result = await database[ScheduledEmailJob.Settings.name].delete_one({'job_id': job_id})
+        if result.deleted_count:
             logger.info(f"Removed scheduled email job: {job_id}")
             return True
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,91 @@
+import logging
+from datetime import datetime
+from typing import Any, Dict, List
+from core.config import settings
+from depends.db import database
+from models.email_model import EmailMessage
+from models.mailbox_model import Mailbox
+from services.counter_services import CounterService
+
+logger = logging.getLogger(__name__)
+
+
+class ExpiryService:
+    # Fields needed to clean up what a message owns outside its document.
+    _RELATED_PROJECTION = {"_id": 1, "to_email": 1, "read": 1, "size": 1, "attachments.file_id": 1}
+
+    @staticmethod
+    async def cleanup_expired(current_time: datetime = None) -> Dict[str, int]:
+        """ Remove expired mailboxes, their messages and expired messages in batches.
+
+        A TTL index deletes documents one by one and cannot cascade, so this
+        job runs ahead of it (the TTL indexes have a grace period) and
+        removes everything that hangs off an expired mailbox or message.
+
+        :param current_time: Reference time, defaults to now.
+        :return: Number of mailboxes and messages removed.
+        """
+        current_time = current_time or datetime.utcnow()
+        batch_size = settings.EXPIRY_CLEANUP_BATCH_SIZE
+        mailboxes = database[Mailbox.Settings.name]
+        removed = {"mailboxes": 0, "messages": 0}
+
+        while True:
+            batch = await mailboxes.find(
+                {"expires_at": {"$lte": current_time}},
+                projection={"_id": 1, "address": 1}
+            ).limit(batch_size).to_list(length=batch_size)
+            if not batch:
+                break
+            addresses = [mailbox["address"] for mailbox in batch]
+            removed["messages"] += await ExpiryService.purge_messages({"to_email": {"$in": addresses}})
+            result = await mailboxes.delete_many({"_id": {"$in": [mailbox["_id"] for mailbox in batch]}})
+            await CounterService.remove(addresses)
+            removed["mailboxes"] += result.deleted_count
+
+        removed["messages"] += await ExpiryService.purge_messages({"expires_at": {"$lte": current_time}})
+        logger.info(f"Expiry cleanup removed {removed['mailboxes']} mailboxes and {removed['messages']} messages")
+        return removed
+
+    @staticmethod
+    async def purge_messages(query: Dict[str, Any]) -> int:
+        """ Delete messages matching ``query`` with their related data, one batch at a time.
+
+        Counters are decremented for a batch only when this call removed all
+        of it; a batch partly removed by a concurrent delete is recounted.
+
+        :param query: Message filter.
+        :return: Number of messages removed.
+        """
+        batch_size = settings.EXPIRY_CLEANUP_BATCH_SIZE
+        messages = database[EmailMessage.Settings.name]
+        removed = 0
+        while True:
+            batch = await messages.find(query, projection=ExpiryService._RELATED_PROJECTION) \
+                .limit(batch_size).to_list(length=batch_size)
+            if not batch:
+                return removed
+            await ExpiryService._delete_related(batch)
+            result = await messages.delete_many({"_id": {"$in": [message["_id"] for message in batch]}})
+            removed += result.deleted_count
+            if result.deleted_count == len(batch):
+                await CounterService.messages_removed(batch)
+            elif result.deleted_count:
+                # Some were removed concurrently by someone who decrements
+                # them too, and which ones is unknown: recount instead.
+                await CounterService.recount(list({message["to_email"] for message in batch}))
+
+    @staticmethod
+    async def _delete_related(messages: List[Dict[str, Any]]):
+        """ Remove data owned by ``messages`` that lives outside the message documents. """
+        file_ids = [
+            attachment["file_id"]
+            for message in messages
+            for attachment in message.get("attachments", [])
+            if attachment.get("file_id") is not None
+        ]
+        if file_ids:
+            # Batched equivalent of GridFSBucket.delete for every attachment.
+            bucket_name = settings.BUCKET_NAME
+            await database[f"{bucket_name}.chunks"].delete_many({"files_id": {"$in": file_ids}})
+            await database[f"{bucket_name}.files"].delete_many({"_id": {"$in": file_ids}})
@@ -0,0 +1,89 @@
+from enum import Enum
+from typing import Dict, List
+from core.config import settings
+from depends.redis_client import get_redis
+
+
+class ClaimResult(str, Enum):
+    CLAIMED = "claimed"
+    DONE = "done"
+    IN_PROGRESS = "in_progress"
+
+
+_INFLIGHT = "inflight"
+_DONE = "done"
+
+
+class IdempotencyStore:
+    """
+    Redis-backed idempotency keys for outbound sends.
+
+    A key is claimed with a short lease before the send and marked done with
+    a long TTL afterwards. Replays skip keys that are done; a key whose
+    lease is still held (e.g. by a worker that just crashed) is reported as
+    in progress so the caller can retry once the lease expires.
+    """
+
+    def __init__(self, prefix: str, lease_seconds: int, ttl_seconds: int):
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def claim(self, key: str) -> ClaimResult:
+        redis = get_redis()
+        if await redis.set(self._key(key), _INFLIGHT, nx=True, ex=self.lease_seconds):
+            return ClaimResult.CLAIMED
+        state = await redis.get(self._key(key))
+        if state == _DONE:
+            return ClaimResult.DONE
+        if state is None:
+            # Lease expired between the two calls, try once more.
+            if await redis.set(self._key(key), _INFLIGHT, nx=True, ex=self.lease_seconds):
+                return ClaimResult.CLAIMED
+        return ClaimResult.IN_PROGRESS
+
+    async def claim_many(self, keys: List[str]) -> Dict[str, ClaimResult]:
+        """Claim several keys in two round trips; same outcomes as :meth:`claim`"""
+        if not keys:
+            return {}
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(self._key(key), _INFLIGHT, nx=True, ex=self.lease_seconds)
+            claimed = await pipe.execute()
+        taken = [key for key, ok in zip(keys, claimed) if not ok]
+        states = await get_redis().mget([self._key(key) for key in taken]) if taken else []
+        result = {key: ClaimResult.CLAIMED for key, ok in zip(keys, claimed) if ok}
+        for key, state in zip(taken, states):
+            # A lease that expired in between is left for the next attempt.
+            result[key] = ClaimResult.DONE if state == _DONE else ClaimResult.IN_PROGRESS
+        return result
+
+    async def mark_done(self, key: str):
+        await get_redis().set(self._key(key), _DONE, ex=self.ttl_seconds)
+
+    async def mark_done_many(self, keys: List[str]):
+        if not keys:
+            return
+        async with get_redis().pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.set(self._key(key), _DONE, ex=self.ttl_seconds)
+            await pipe.execute()
+
+    async def release(self, key: str):
+        await get_redis().delete(self._key(key))
+
+    async def release_many(self, keys: List[str]):
+        if keys:
+            await get_redis().delete(*(self._key(key) for key in keys))
+
+
+# Keys for Mailgun sends: "<job>:<run>:<chunk digest>" for batch chunks,
+# "outbox:<row id>" for outbox rows.
+send_idempotency = IdempotencyStore(
+    prefix="idem:send",
+    lease_seconds=settings.IDEMPOTENCY_LEASE_SECONDS,
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+)
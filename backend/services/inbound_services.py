@@ -0,0 +1,308 @@
+import hmac
+import time
+import hashlib
+import logging
+import tempfile
+from email.utils import getaddresses, parseaddr
+from typing import Any, AsyncIterator, Dict, List, Optional
+from python_multipart.multipart import MultipartParser, parse_options_header
+from core.config import settings
+from depends.db import get_gridfs_bucket
+from models.email_model import EmailMessage, EmailStatus
+from services.compression_services import CompressionService
+from services.counter_services import CounterService
+from services.mail_push import mail_push_hub
+from services.mailbox_services import MailboxService
+from services.mime_stream import StreamingMimeParser
+from services.search_services import SearchService
+
+logger = logging.getLogger(__name__)
+
+# Form field of a Mailgun "forward(...mime)" route post holding the raw message.
+MAILGUN_MIME_FIELD = "body-mime"
+
+
+# Read size when replaying a spooled body-mime field into the MIME parser.
+_SPOOL_READ_BYTES = 64 * 1024
+
+
+class InboundRejected(Exception):
+    """The message is addressed to a mailbox that does not exist"""
+
+
+class InboundTooLarge(Exception):
+    """The request body is larger than INBOUND_MAX_MESSAGE_BYTES"""
+
+
+class _GridFSSink:
+    """Streams one attachment into GridFS chunk by chunk"""
+
+    def __init__(self, filename: str, content_type: str):
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self._stream = get_gridfs_bucket().open_upload_stream(
+            filename, metadata={"content_type": content_type}
+        )
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        await self._stream.write(data)
+
+    async def abort(self):
+        await self._stream.abort()
+
+    async def close(self) -> Dict[str, Any]:
+        await self._stream.close()
+        return {
+            "file_id": self._stream._id,
+            "filename": self.filename,
+            "content_type": self.content_type,
+            "size": self.size,
+        }
+
+
+async def _gridfs_sink(filename: str, content_type: str) -> _GridFSSink:
+    return _GridFSSink(filename, content_type)
+
+
+async def _limited(stream: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Pass request body chunks through, failing once INBOUND_MAX_MESSAGE_BYTES is exceeded"""
+    total = 0
+    async for chunk in stream:
+        total += len(chunk)
+        if total > settings.INBOUND_MAX_MESSAGE_BYTES:
+            raise InboundTooLarge(f"Message larger than {settings.INBOUND_MAX_MESSAGE_BYTES} bytes")
+        yield chunk
+
+
+class InboundService:
+
+    @staticmethod
+    def new_parser() -> StreamingMimeParser:
+        return StreamingMimeParser(
+            attachment_sink_factory=_gridfs_sink,
+            max_body_bytes=settings.INBOUND_MAX_BODY_BYTES,
+            max_header_bytes=settings.INBOUND_MAX_HEADER_BYTES,
+            max_line_bytes=settings.INBOUND_MAX_LINE_BYTES,
+            max_inline_raw_bytes=settings.INBOUND_MAX_INLINE_RAW_BYTES,
+        )
+
+
+    @staticmethod
+    def verify_token(token: Optional[str]):
+        if not settings.INBOUND_WEBHOOK_TOKEN:
+            raise PermissionError("Inbound webhook is not configured")
+        if not token or not hmac.compare_digest(token, settings.INBOUND_WEBHOOK_TOKEN):
+            raise PermissionError("Invalid inbound token")
+
+
+    @staticmethod
+    def verify_mailgun_signature(timestamp: str, token: str, signature: str):
+        if not settings.MAILGUN_WEBHOOK_SIGNING_KEY:
+            raise PermissionError("Inbound webhook is not configured")
+        try:
+            age = abs(time.time() - int(timestamp))
+        except ValueError:
+            raise PermissionError("Invalid Mailgun signature")
+        if age > settings.MAILGUN_SIGNATURE_MAX_AGE_SECONDS:
+            raise PermissionError("Stale Mailgun signature")
+        expected = hmac.new(
+            settings.MAILGUN_WEBHOOK_SIGNING_KEY.encode(),
+            f"{timestamp}{token}".encode(),
+            hashlib.sha256
+        ).hexdigest()
+        if not signature or not hmac.compare_digest(expected, signature):
+            raise PermissionError("Invalid Mailgun signature")
+
+
+    @staticmethod
+    async def ingest_raw(stream: AsyncIterator[bytes], recipient: Optional[str] = None) -> EmailMessage:
+        """ Ingest a raw MIME message streamed from the request body.
+
+        :param stream: Request body chunks.
+        :param recipient: Mailbox address; read from Delivered-To/To when missing.
+        :return: Stored message.
+        """
+        parser = InboundService.new_parser()
+        try:
+            async for chunk in _limited(stream):
+                await parser.feed(chunk)
+            await parser.close()
+            return await InboundService._store(parser, recipient)
+        except Exception:
+            await InboundService._discard(parser)
+            raise
+
+
+    @staticmethod
+    async def ingest_mailgun(content_type: str, stream: AsyncIterator[bytes]) -> EmailMessage:
+        """ Ingest a Mailgun route post (``forward("https://.../inbound/mailgun")`` to a MIME URL).
+
+        The multipart/form-data body is parsed as it streams in and the
+        ``body-mime`` field is fed straight into the MIME parser, so the raw
+        message is never held whole in memory. The other (small) form fields
+        carry the signature and recipient.
+
+        Nothing is written to GridFS before the signature is verified: until
+        the timestamp, token and signature fields have all arrived,
+        ``body-mime`` is spooled to a temporary file (in memory while small)
+        and replayed into the parser once they check out.
+
+        :param content_type: Request Content-Type header.
+        :param stream: Request body chunks.
+        :return: Stored message.
+        """
+        _, options = parse_options_header(content_type)
+        boundary = options.get(b"boundary")
+        if not boundary:
+            raise ValueError("Expected a multipart/form-data body")
+
+        parser = InboundService.new_parser()
+        fields: Dict[str, str] = {}
+        pending: List[bytes] = []
+        part: Dict[str, Any] = {}
+
+        def on_part_begin():
+            part.clear()
+            part.update(name=None, data=bytearray(), header_field=bytearray(), header_value=bytearray())
+
+        def on_header_field(data, start, end):
+            part["header_field"] += data[start:end]
+
+        def on_header_value(data, start, end):
+            part["header_value"] += data[start:end]
+
+        def on_header_end():
+            if bytes(part["header_field"]).lower() == b"content-disposition":
+                _, params = parse_options_header(bytes(part["header_value"]))
+                part["name"] = params.get(b"name", b"").decode()
+            part["header_field"] = bytearray()
+            part["header_value"] = bytearray()
+
+        def on_part_data(data, start, end):
+            if part["name"] == MAILGUN_MIME_FIELD:
+                pending.append(bytes(data[start:end]))
+            elif len(part["data"]) < settings.INBOUND_MAX_HEADER_BYTES:
+                part["data"] += data[start:end]
+
+        def on_part_end():
+            if part["name"] and part["name"] != MAILGUN_MIME_FIELD:
+                fields[part["name"]] = part["data"].decode("utf-8", errors="replace")
+
+        form_parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": on_part_begin,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+        })
+        spool: Optional[tempfile.SpooledTemporaryFile] = tempfile.SpooledTemporaryFile(
+            max_size=settings.INBOUND_MAX_INLINE_RAW_BYTES
+        )
+
+        async def verify():
+            nonlocal spool
+            InboundService.verify_mailgun_signature(
+                fields.get("timestamp", ""), fields.get("token", ""), fields.get("signature", "")
+            )
+            spooled, spool = spool, None
+            with spooled:
+                spooled.seek(0)
+                while data := spooled.read(_SPOOL_READ_BYTES):
+                    await parser.feed(data)
+
+        try:
+            async for chunk in _limited(stream):
+                form_parser.write(chunk)
+                if spool is not None:
+                    spool.writelines(pending)
+                    if {"timestamp", "token", "signature"} <= fields.keys():
+                        await verify()
+                else:
+                    for data in pending:
+                        await parser.feed(data)
+                pending.clear()
+            form_parser.finalize()
+            if spool is not None:
+                await verify()
+            await parser.close()
+            return await InboundService._store(parser, fields.get("recipient"))
+        except Exception:
+            if spool is not None:
+                spool.close()
+            await InboundService._discard(parser)
+            raise
+
+
+    @staticmethod
+    async def _store(parser: StreamingMimeParser, recipient: Optional[str]) -> EmailMessage:
+        headers = parser.headers
+        if not recipient:
+            recipient = str(headers.get("Delivered-To") or headers.get("To") or "")
+        addresses = [address for _, address in getaddresses([recipient]) if address]
+        mailbox = None
+        for address in addresses:
+            mailbox = await MailboxService.get_mailbox_by_address(address.lower())
+            if mailbox:
+                break
+        if mailbox is None:
+            raise InboundRejected(f"No mailbox for {recipient}")
+        if settings.MAILBOX_QUOTA_BYTES:
+            counters = await CounterService.get(mailbox.address)
+            if counters is not None and counters.size + parser.size > settings.MAILBOX_QUOTA_BYTES:
+                raise InboundRejected(f"Mailbox {mailbox.address} is over quota")
+
+        message = EmailMessage(
+            message_id=str(headers.get("Message-ID") or EmailMessage.generate_message_id(mailbox.address.split("@")[1])),
+            from_email=parseaddr(str(headers.get("From", "")))[1],
+            to_email=mailbox.address,
+            subject=str(headers.get("Subject", "")),
+            status=EmailStatus.RECIEVED,
+            user_id=mailbox.user_id,
+            **await CompressionService.pack(parser.body or "", parser.html, parser.raw_message),
+            headers=InboundService._headers_dict(headers),
+            attachments=parser.attachments,
+            expires_at=mailbox.expires_at,
+            size=parser.size,
+            search_text=SearchService.search_text(parser.body, parser.html),
+        )
+        await message.insert()
+        await CounterService.message_added(message)
+        await mail_push_hub.publish(message)
+        logger.info(f"Stored inbound message {message.message_id} for {mailbox.address} ({parser.size} bytes)")
+        return message
+
+
+    @staticmethod
+    def _headers_dict(headers) -> Dict[str, Any]:
+        result: Dict[str, Any] = {}
+        for name, value in headers.items():
+            value = str(value)
+            if name in result:
+                previous = result[name]
+                result[name] = previous + [value] if isinstance(previous, list) else [previous, value]
+            else:
+                result[name] = value
+        return result
+
+
+    @staticmethod
+    async def _discard(parser: StreamingMimeParser):
+        """ Delete what a failed ingest wrote to GridFS: the open attachment and the finished ones. """
+        try:
+            await parser.abort()
+        except Exception as e:
+            logger.error(f"Could not abort attachment upload: {str(e)}")
+        await InboundService._discard_attachments(parser.attachments)
+
+
+    @staticmethod
+    async def _discard_attachments(attachments: List[Dict[str, Any]]):
+        bucket = get_gridfs_bucket()
+        for attachment in attachments:
+            try:
+                await bucket.delete(attachment["file_id"])
+            except Exception as e:
+                logger.error(f"Could not delete attachment {attachment.get('file_id')}: {str(e)}")
@@ -0,0 +1,172 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Optional, Tuple
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import DESCENDING
+from core.compression import unpack
+from depends.db import database
+from models.archive_model import ArchivedMessage
+from models.email_model import EmailMessage, EmailStatus
+from schemas.inbox_schema import EmailMessageDetail, EmailMessageSummary, InboxPage
+from services.archive_services import ArchiveService
+from services.counter_services import CounterService
+from services.expiry_services import ExpiryService
+
+
+class InboxService:
+
+    @staticmethod
+    def encode_cursor(created_at: datetime, message_id: ObjectId) -> str:
+        raw = json.dumps({"c": created_at.isoformat(), "i": str(message_id)}).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            data = json.loads(raw)
+            return datetime.fromisoformat(data["c"]), ObjectId(data["i"])
+        except (binascii.Error, ValueError, KeyError, TypeError, InvalidId):
+            raise ValueError("Invalid cursor")
+
+
+    @staticmethod
+    async def list_messages(
+        user_id: str,
+        status: EmailStatus = EmailStatus.RECIEVED,
+        cursor: Optional[str] = None,
+        limit: int = 50
+    ) -> InboxPage:
+        """ List a mailbox newest first, one keyset page at a time.
+
+        The query is an equality match on (user_id, status) followed by a
+        range on (created_at, _id), so every page is a bounded walk of the
+        compound index regardless of mailbox size. Archived messages are
+        walked the same way and merged in on (created_at, _id).
+
+        :param user_id: Mailbox owner.
+        :param status: Message status to list.
+        :param cursor: ``next_cursor`` of the previous page.
+        :param limit: Page size.
+        :return: Page of message summaries.
+        """
+        query = {"user_id": user_id, "status": status.value}
+        if cursor:
+            created_at, last_id = InboxService.decode_cursor(cursor)
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": last_id}},
+            ]
+
+        items = await EmailMessage.find(query) \
+            .sort([("created_at", DESCENDING), ("_id", DESCENDING)]) \
+            .limit(limit + 1) \
+            .project(EmailMessageSummary) \
+            .to_list()
+
+        # Archived messages can be newer than hot ones (messages with an
+        # expiry are never archived), so both walks are merged on the key.
+        archived = await ArchivedMessage.find(query) \
+            .sort([("created_at", DESCENDING), ("_id", DESCENDING)]) \
+            .limit(limit + 1) \
+            .project(EmailMessageSummary) \
+            .to_list()
+        if archived:
+            hot_ids = {item.id for item in items}
+            items = sorted(
+                items + [item for item in archived if item.id not in hot_ids],
+                key=lambda item: (item.created_at, item.id), reverse=True
+            )[:limit + 1]
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            next_cursor = InboxService.encode_cursor(items[-1].created_at, items[-1].id)
+        return InboxPage(items=items, next_cursor=next_cursor)
+
+
+    @staticmethod
+    async def get_message(user_id: str, message_id: str) -> Optional[EmailMessageDetail]:
+        """ Detail view of a message, hot or archived. raw_message is not loaded; body and html are decompressed here. """
+        if not ObjectId.is_valid(message_id):
+            return None
+        message = await database[EmailMessage.Settings.name].find_one(
+            {"_id": ObjectId(message_id), "user_id": user_id},
+            projection={"raw_message": 0, "search_text": 0}
+        )
+        if message is None:
+            locator = await ArchiveService.get_locator(user_id, ObjectId(message_id))
+            if locator is None:
+                return None
+            message = await ArchiveService.fetch(locator)
+        codec = message.get("codec")
+        message["body"] = unpack(message.get("body"), codec) or ""
+        message["html"] = unpack(message.get("html"), codec)
+        return EmailMessageDetail.model_validate(message)
+
+
+    @staticmethod
+    async def get_raw_message(user_id: str, message_id: str) -> Optional[str]:
+        """ Raw MIME source of a message, decompressed (None when missing or not kept inline). """
+        if not ObjectId.is_valid(message_id):
+            return None
+        message = await database[EmailMessage.Settings.name].find_one(
+            {"_id": ObjectId(message_id), "user_id": user_id},
+            projection={"raw_message": 1, "codec": 1}
+        )
+        if message is None:
+            locator = await ArchiveService.get_locator(user_id, ObjectId(message_id))
+            if locator is None:
+                return None
+            message = await ArchiveService.fetch(locator)
+        return unpack(message.get("raw_message"), message.get("codec"))
+
+
+    @staticmethod
+    async def set_read(user_id: str, message_id: str, read: bool = True) -> bool:
+        """ Set a message's read flag, updating its mailbox's unread counter.
+
+        The update only matches while the flag still has the other value, so
+        concurrent requests flip it (and count it) once.
+
+        :return: False when the message does not exist.
+        """
+        if not ObjectId.is_valid(message_id):
+            return False
+        query = {"_id": ObjectId(message_id), "user_id": user_id}
+        message = await database[EmailMessage.Settings.name].find_one_and_update(
+            {**query, "read": {"$ne": read}},
+            {"$set": {"read": read}},
+            projection={"to_email": 1}
+        )
+        if message is not None:
+            await CounterService.read_changed(message["to_email"], read)
+            return True
+        if await database[EmailMessage.Settings.name].count_documents(query, limit=1):
+            return True
+        found, changed_address = await ArchiveService.set_read(user_id, query["_id"], read)
+        if changed_address:
+            await CounterService.read_changed(changed_address, read)
+        return found
+
+
+    @staticmethod
+    async def delete_message(user_id: str, message_id: str) -> bool:
+        """ Delete a message with its attachments and update its mailbox counters.
+
+        :return: False when the message does not exist.
+        """
+        if not ObjectId.is_valid(message_id):
+            return False
+        if await ExpiryService.purge_messages({"_id": ObjectId(message_id), "user_id": user_id}):
+            # An archive run may have written a locator before the purge.
+            await ArchiveService.delete(user_id, ObjectId(message_id))
+            return True
+        locator = await ArchiveService.delete(user_id, ObjectId(message_id))
+        if locator is None:
+            return False
+        await CounterService.messages_removed([locator])
+        return True
@@ -0,0 +1,185 @@
+import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Set
+from core.config import settings
+from models.email_model import EmailMessage
+from schemas.inbox_schema import EmailMessageSummary
+
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub channel carrying one event per stored inbound message.
+CHANNEL = "mail:new"
+
+# Queue item telling a client it missed events and should re-list its inbox.
+RESYNC = "resync"
+
+
+class MailPushHub:
+    """
+    Per-process fan-out of new-mail events to connected clients.
+
+    The process holds a single Redis pub/sub subscription, started with the
+    first client, and routes each event to the queues of the event's user
+    in memory. Connections cost one small bounded queue each and no
+    database work. A slow client whose queue fills up, or every client
+    when the subscription drops, loses its pending events and gets a
+    single ``RESYNC`` marker instead. An idle queue gets
+    a heartbeat (``None``) from one shared timer, not a timer per
+    connection.
+    """
+
+    def __init__(self, queue_size: int = 100, heartbeat: float = 15.0, channel: str = CHANNEL):
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.channel = channel
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._listener: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.delivered = 0
+        self.dropped = 0
+
+    @staticmethod
+    async def publish(message: EmailMessage):
+        """
+        Announce a stored message. Failures are logged, never raised: the
+        message is already stored and clients can still list it.
+        """
+        from depends.redis_client import get_redis
+
+        summary = EmailMessageSummary.model_validate(message.model_dump(by_alias=True))
+        event = {"user_id": str(message.user_id), "message": summary.model_dump(mode="json")}
+        try:
+            await get_redis().publish(CHANNEL, json.dumps(event))
+        except Exception as e:
+            logger.warning(f"Could not publish new-mail event for {message.message_id}: {str(e)}")
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: str) -> AsyncIterator[asyncio.Queue]:
+        """
+        Register a client for ``user_id`` events for the duration of the block.
+
+        Queue items are event dicts, ``RESYNC`` or ``None`` (heartbeat).
+        """
+        self._ensure_started()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            queues = self._subscribers.get(user_id)
+            if queues is not None:
+                queues.discard(queue)
+                if not queues:
+                    del self._subscribers[user_id]
+
+    async def stream(self, user_id: str, to_email: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Server-Sent Events for one client.
+
+        :param user_id: Owner of the mailboxes to watch.
+        :param to_email: Only events for this mailbox address.
+        :return: SSE frames: ``message`` events (id is the message id),
+            ``resync`` events and comment heartbeats.
+        """
+        async with self.subscribe(user_id) as queue:
+            yield "retry: 3000\n\n"
+            while True:
+                item = await queue.get()
+                if item is None:
+                    yield ": ping\n\n"
+                elif item == RESYNC:
+                    yield "event: resync\ndata: {}\n\n"
+                elif to_email is None or item.get("to_email") == to_email:
+                    yield f"id: {item['id']}\nevent: message\ndata: {json.dumps(item)}\n\n"
+
+    def _ensure_started(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._beat())
+
+    def _route(self, raw: str):
+        try:
+            event = json.loads(raw)
+            queues = self._subscribers.get(event["user_id"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed new-mail event")
+            return
+        if not queues:
+            return
+        payload = event["message"]
+        for queue in queues:
+            try:
+                queue.put_nowait(payload)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                self._resync(queue)
+
+    def _resync(self, queue: asyncio.Queue):
+        """ Drop what is pending and ask the client to re-list instead. """
+        while not queue.empty():
+            if isinstance(queue.get_nowait(), dict):
+                self.dropped += 1
+        queue.put_nowait(RESYNC)
+
+    async def _listen(self):
+        from depends.redis_client import get_redis
+
+        delay = 1.0
+        while True:
+            pubsub = get_redis().pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._route(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"New-mail subscription lost, retrying in {delay:.0f}s: {str(e)}")
+                # Events published while disconnected are gone; tell everyone to re-list.
+                for queues in self._subscribers.values():
+                    for queue in queues:
+                        self._resync(queue)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 30.0)
+            finally:
+                await pubsub.aclose()
+
+    async def _beat(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            for queues in self._subscribers.values():
+                for queue in queues:
+                    if queue.empty():
+                        queue.put_nowait(None)
+
+    async def close(self):
+        """ Stop the upstream subscription and the heartbeat timer. """
+        for task in (self._listener, self._heartbeat_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._listener = None
+        self._heartbeat_task = None
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._subscribers),
+            "connections": sum(len(queues) for queues in self._subscribers.values()),
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "subscribed": self._listener is not None and not self._listener.done(),
+        }
+
+
+mail_push_hub = MailPushHub(
+    queue_size=settings.PUSH_QUEUE_SIZE,
+    heartbeat=settings.PUSH_HEARTBEAT_SECONDS,
+)
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+from typing import List, Optional
+from pymongo.errors import DuplicateKeyError
+from core.config import settings
+from models.mailbox_model import Mailbox
+from services.address_allocator import AddressPoolExhaustedError, address_allocator
+
+
+class MailboxService:
+
+    @staticmethod
+    async def create_mailbox(user_id: str, ttl_minutes: Optional[int] = None) -> Mailbox:
+        """ Create a temporary mailbox with an address from the pre-generated pool.
+
+        :param user_id: Mailbox owner.
+        :param ttl_minutes: Lifetime of the mailbox, defaults to MAILBOX_DEFAULT_TTL_MINUTES.
+        :return: New mailbox.
+        :raises AddressPoolExhaustedError: If no unused address could be allocated.
+        """
+        ttl_minutes = ttl_minutes or settings.MAILBOX_DEFAULT_TTL_MINUTES
+        for _ in range(settings.ADDRESS_GENERATE_MAX_ATTEMPTS):
+            current_time = datetime.utcnow()
+            mailbox = Mailbox(
+                address=await address_allocator.pop(),
+                user_id=user_id,
+                created_at=current_time,
+                expires_at=current_time + timedelta(minutes=ttl_minutes)
+            )
+            try:
+                await mailbox.insert()
+                return mailbox
+            except DuplicateKeyError:
+                # Allocated elsewhere between generation and now; take another.
+                continue
+        raise AddressPoolExhaustedError("Every allocated address was already taken")
+
+
+    @staticmethod
+    async def get_mailboxes(user_id: str) -> List[Mailbox]:
+        return await Mailbox.find(Mailbox.user_id == user_id).to_list()
+
+
+    @staticmethod
+    async def get_mailbox_by_address(address: str) -> Optional[Mailbox]:
+        return await Mailbox.find_one(Mailbox.address == address)
@@ -0,0 +1,290 @@
+import binascii
+from email import policy
+from email.message import EmailMessage as MimeHeaders
+from email.parser import BytesFeedParser
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol
+
+# Parser states.
+_HEADERS = "headers"
+_BODY = "body"
+_PREAMBLE = "preamble"
+_EPILOGUE = "epilogue"
+
+
+class AttachmentSink(Protocol):
+    async def write(self, data: bytes): ...
+
+    async def close(self) -> Dict[str, Any]:
+        """Finish the upload and return the attachment reference stored on the message"""
+        ...
+
+    async def abort(self):
+        """Drop a partly written attachment"""
+        ...
+
+
+# (filename, content_type) -> sink receiving the decoded attachment bytes.
+AttachmentSinkFactory = Callable[[str, str], Awaitable[AttachmentSink]]
+
+
+class _IdentityDecoder:
+    def decode(self, data: bytes) -> bytes:
+        return data
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _Base64Decoder:
+    def __init__(self):
+        self._carry = b""
+
+    def decode(self, data: bytes) -> bytes:
+        data = self._carry + data.translate(None, b" \t\r\n")
+        cut = len(data) - len(data) % 4
+        self._carry = data[cut:]
+        return binascii.a2b_base64(data[:cut]) if cut else b""
+
+    def flush(self) -> bytes:
+        if not self._carry:
+            return b""
+        try:
+            return binascii.a2b_base64(self._carry + b"=" * (-len(self._carry) % 4))
+        except binascii.Error:
+            return b""
+
+
+class _QuotedPrintableDecoder:
+    def __init__(self, max_carry: int):
+        self._carry = b""
+        self._max_carry = max_carry
+
+    def decode(self, data: bytes) -> bytes:
+        data = self._carry + data
+        end = data.rfind(b"\n") + 1
+        if end == 0 and len(data) > self._max_carry:
+            end = len(data)
+        self._carry = data[end:]
+        return binascii.a2b_qp(data[:end]) if end else b""
+
+    def flush(self) -> bytes:
+        carry, self._carry = self._carry, b""
+        return binascii.a2b_qp(carry)
+
+
+class _TextSink:
+    """Keeps a text part in memory up to ``limit`` bytes; the rest is dropped"""
+
+    def __init__(self, limit: int):
+        self.data = bytearray()
+        self.limit = limit
+
+    async def write(self, data: bytes):
+        room = self.limit - len(self.data)
+        if room > 0:
+            self.data += data[:room]
+
+    async def close(self) -> bytes:
+        return bytes(self.data)
+
+
+class StreamingMimeParser:
+    """
+    Incremental MIME parser that never holds a whole attachment in memory.
+
+    Bytes are fed as they arrive and split into lines. Header blocks are
+    parsed with the stdlib ``BytesFeedParser``; part bodies are decoded on
+    the fly (base64 / quoted-printable) and either kept (first text/plain and
+    text/html parts, capped) or streamed to an attachment sink. Memory is
+    bounded by the body caps and the longest line kept, not by message size.
+    """
+
+    def __init__(
+        self,
+        attachment_sink_factory: AttachmentSinkFactory,
+        max_body_bytes: int,
+        max_header_bytes: int,
+        max_line_bytes: int,
+        max_inline_raw_bytes: int
+    ):
+        self._sink_factory = attachment_sink_factory
+        self._max_body_bytes = max_body_bytes
+        self._max_header_bytes = max_header_bytes
+        self._max_line_bytes = max_line_bytes
+        self._max_inline_raw_bytes = max_inline_raw_bytes
+
+        self._buffer = bytearray()
+        self._mid_line = False
+        self._state = _HEADERS
+        self._header_lines: List[bytes] = []
+        self._header_size = 0
+        self._boundaries: List[bytes] = []
+        self._leaf: Optional[Dict[str, Any]] = None
+        self._pending_newline = b""
+        self._raw: Optional[bytearray] = bytearray()
+
+        self.headers: Optional[MimeHeaders] = None
+        self.body: Optional[str] = None
+        self.html: Optional[str] = None
+        self.attachments: List[Dict[str, Any]] = []
+        self.size = 0
+
+    @property
+    def raw_message(self) -> Optional[str]:
+        """The raw message if it was small enough to keep inline"""
+        if self._raw is None:
+            return None
+        return self._raw.decode("utf-8", errors="replace")
+
+    async def feed(self, data: bytes):
+        self.size += len(data)
+        if self._raw is not None:
+            if len(self._raw) + len(data) <= self._max_inline_raw_bytes:
+                self._raw += data
+            else:
+                self._raw = None
+
+        start = 0
+        while True:
+            end = data.find(b"\n", start) + 1
+            if not end:
+                break
+            if self._buffer:
+                self._buffer += data[start:end]
+                line = bytes(self._buffer)
+                self._buffer.clear()
+            else:
+                line = data[start:end]
+            await self._line(line)
+            self._mid_line = False
+            start = end
+        self._buffer += data[start:]
+
+        if len(self._buffer) > self._max_line_bytes:
+            if self._state == _HEADERS:
+                raise ValueError("MIME header line too long")
+            chunk = bytes(self._buffer)
+            self._buffer.clear()
+            self._mid_line = True
+            # Pathologically long body line: pass it on without waiting for "\n".
+            # Preamble and epilogue lines are dropped; neither can be a boundary.
+            if self._state == _BODY:
+                await self._content(chunk, newline=b"")
+
+    async def close(self):
+        if self._buffer:
+            line = bytes(self._buffer)
+            self._buffer.clear()
+            await self._line(line)
+        if self._state == _HEADERS and self._header_lines:
+            await self._start_part()
+        await self._end_leaf()
+        if self.headers is None:
+            raise ValueError("Empty or malformed MIME message")
+
+    async def abort(self):
+        """ Drop the attachment being written, if any; closed ones stay in ``attachments``. """
+        leaf, self._leaf = self._leaf, None
+        if leaf is not None and leaf["kind"] == "attachment":
+            await leaf["sink"].abort()
+
+    async def _line(self, line: bytes):
+        stripped = line.rstrip(b"\r\n")
+        if self._state == _HEADERS:
+            if not stripped:
+                await self._start_part()
+                return
+            self._header_size += len(line)
+            if self._header_size > self._max_header_bytes:
+                raise ValueError("MIME headers too large")
+            self._header_lines.append(line)
+            return
+
+        if not self._mid_line and self._boundaries and stripped.startswith(b"--"):
+            marker = stripped.rstrip(b" \t")
+            for depth in range(len(self._boundaries) - 1, -1, -1):
+                delimiter = b"--" + self._boundaries[depth]
+                if marker == delimiter:
+                    await self._end_leaf()
+                    del self._boundaries[depth + 1:]
+                    self._state = _HEADERS
+                    return
+                if marker == delimiter + b"--":
+                    await self._end_leaf()
+                    del self._boundaries[depth:]
+                    self._state = _EPILOGUE
+                    return
+
+        if self._state == _BODY:
+            await self._content(stripped, newline=line[len(stripped):])
+
+    async def _content(self, data: bytes, newline: bytes):
+        # The line break before a boundary belongs to the boundary, so each
+        # line's break is only written once the next content line shows up.
+        await self._write(self._pending_newline + data)
+        self._pending_newline = newline
+
+    async def _write(self, data: bytes):
+        if data:
+            decoded = self._leaf["decoder"].decode(data)
+            if decoded:
+                await self._leaf["sink"].write(decoded)
+
+    async def _start_part(self):
+        parser = BytesFeedParser(policy=policy.default)
+        parser.feed(b"".join(self._header_lines) + b"\r\n")
+        headers = parser.close()
+        self._header_lines = []
+        self._header_size = 0
+        if self.headers is None:
+            self.headers = headers
+
+        boundary = headers.get_boundary() if headers.get_content_maintype() == "multipart" else None
+        if boundary:
+            self._boundaries.append(boundary.encode("utf-8", errors="replace"))
+            self._state = _PREAMBLE
+            return
+
+        self._state = _BODY
+        self._pending_newline = b""
+        self._leaf = await self._open_leaf(headers)
+
+    async def _open_leaf(self, headers: MimeHeaders) -> Dict[str, Any]:
+        encoding = str(headers.get("Content-Transfer-Encoding", "")).strip().lower()
+        if encoding == "base64":
+            decoder = _Base64Decoder()
+        elif encoding == "quoted-printable":
+            decoder = _QuotedPrintableDecoder(self._max_line_bytes)
+        else:
+            decoder = _IdentityDecoder()
+
+        content_type = headers.get_content_type()
+        is_attachment = headers.get_content_disposition() == "attachment" or headers.get_filename()
+        if not is_attachment and content_type == "text/plain" and self.body is None:
+            return {"kind": "body", "headers": headers, "decoder": decoder, "sink": _TextSink(self._max_body_bytes)}
+        if not is_attachment and content_type == "text/html" and self.html is None:
+            return {"kind": "html", "headers": headers, "decoder": decoder, "sink": _TextSink(self._max_body_bytes)}
+
+        filename = headers.get_filename() or f"attachment-{len(self.attachments) + 1}"
+        sink = await self._sink_factory(filename, content_type)
+        return {"kind": "attachment", "headers": headers, "decoder": decoder, "sink": sink}
+
+    async def _end_leaf(self):
+        if self._leaf is None:
+            return
+        leaf, self._leaf = self._leaf, None
+        tail = leaf["decoder"].flush()
+        if tail:
+            await leaf["sink"].write(tail)
+        result = await leaf["sink"].close()
+        self._pending_newline = b""
+
+        if leaf["kind"] == "attachment":
+            self.attachments.append(result)
+            return
+        charset = leaf["headers"].get_content_charset() or "utf-8"
+        try:
+            text = result.decode(charset, errors="replace")
+        except LookupError:
+            text = result.decode("utf-8", errors="replace")
+        setattr(self, leaf["kind"], text)
@@ -0,0 +1,271 @@
+import uuid
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import ASCENDING, UpdateMany, UpdateOne
+from core.config import settings
+from depends.db import database
+from models.email_model import EmailStatus
+from models.outbox_model import OutboxMessage
+from schemas.email_schema import BatchRecipient, BatchSendReport
+from services.email_services import EmailService
+from services.idempotency import ClaimResult, send_idempotency
+
+logger = logging.getLogger(__name__)
+
+# (addresses, final status, provider id, error) of one send outcome.
+Outcome = Tuple[List[str], EmailStatus, Optional[str], Optional[str]]
+
+
+class OutboxService:
+
+    @staticmethod
+    def _collection():
+        return database[OutboxMessage.Settings.name]
+
+
+    @staticmethod
+    async def enqueue(
+        recipients: List[BatchRecipient],
+        subject: str,
+        template: Optional[str] = None,
+        local_template: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+        user_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """ Record one queued outbox row per recipient; workers deliver them.
+
+        :return: Batch id and number of queued rows.
+        """
+        batch_id = uuid.uuid4().hex
+        unique = {str(recipient.email): recipient.variables for recipient in recipients}
+        rows = [
+            OutboxMessage(
+                batch_id=batch_id,
+                to_email=address,
+                subject=subject,
+                template=template,
+                local_template=local_template,
+                context=context or {},
+                variables=variables,
+                user_id=user_id,
+            ).model_dump(exclude={"id", "revision_id"})
+            for address, variables in unique.items()
+        ]
+        for start in range(0, len(rows), settings.OUTBOX_CLAIM_BATCH_SIZE):
+            await OutboxService._collection().insert_many(rows[start:start + settings.OUTBOX_CLAIM_BATCH_SIZE], ordered=False)
+        return {"batch_id": batch_id, "queued": len(rows)}
+
+
+    @staticmethod
+    def report_outcomes(report: BatchSendReport) -> List[Outcome]:
+        """ Final outcomes of a batch report; chunks skipped or still in flight elsewhere have none. """
+        outcomes: List[Outcome] = [
+            (chunk.recipients, EmailStatus.SENT if chunk.delivered else EmailStatus.FAILED, chunk.provider_id, chunk.error)
+            for chunk in report.chunks if not chunk.skipped and not chunk.in_progress
+        ]
+        if report.suppressed:
+            outcomes.append((report.suppressed, EmailStatus.FAILED, None, "Recipient is suppressed"))
+        outcomes += [([recipient.email], EmailStatus.FAILED, None, recipient.reason) for recipient in report.invalid]
+        return outcomes
+
+
+    @staticmethod
+    async def record(
+        batch_id: str,
+        subject: str,
+        outcomes: List[Outcome],
+        template: Optional[str] = None,
+        local_template: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+        variables: Optional[Dict[str, Dict[str, Any]]] = None,
+        user_id: Optional[str] = None
+    ):
+        """ Keep mail sent directly (not through the queue) as outbox history rows.
+
+        One upsert per recipient on (batch_id, to_email), all in a single
+        ``bulk_write``, so recording a retried scheduled run again updates
+        its rows instead of adding new ones. Errors are logged, not raised:
+        the mail has already gone out.
+        """
+        now = datetime.utcnow()
+        updates = []
+        for addresses, status, provider_id, error in outcomes:
+            for address in addresses:
+                row = OutboxMessage(
+                    batch_id=batch_id,
+                    to_email=address,
+                    subject=subject,
+                    template=template,
+                    local_template=local_template,
+                    context=context or {},
+                    variables=(variables or {}).get(address, {}),
+                    user_id=user_id,
+                ).model_dump(exclude={"id", "revision_id", "status", "attempts", "provider_id", "error", "updated_at"})
+                updates.append(UpdateOne(
+                    {"batch_id": batch_id, "to_email": address},
+                    {
+                        "$set": {"status": status.value, "provider_id": provider_id, "error": error, "updated_at": now},
+                        "$inc": {"attempts": 1},
+                        "$setOnInsert": row,
+                    },
+                    upsert=True
+                ))
+        if not updates:
+            return
+        try:
+            await OutboxService._collection().bulk_write(updates, ordered=False)
+        except Exception as e:
+            logger.error(f"Could not record send history for batch {batch_id}: {str(e)}")
+
+
+    @staticmethod
+    async def claim(limit: int) -> List[Dict[str, Any]]:
+        """ Lease up to ``limit`` queued rows to this caller.
+
+        Rows whose lease expired (a worker died mid-send) are claimable
+        again, which gives at-least-once delivery.
+        """
+        collection = OutboxService._collection()
+        now = datetime.utcnow()
+        claimable = {"status": EmailStatus.QUEUED.value, "lease_until": {"$lte": now}}
+        candidates = await collection.find(claimable, projection={"_id": 1}) \
+            .sort("lease_until", ASCENDING).limit(limit).to_list(length=limit)
+        if not candidates:
+            return []
+
+        token = uuid.uuid4().hex
+        await collection.update_many(
+            {"_id": {"$in": [row["_id"] for row in candidates]}, **claimable},
+            {
+                "$set": {"claimed_by": token, "lease_until": now + timedelta(seconds=settings.OUTBOX_LEASE_SECONDS)},
+                "$inc": {"attempts": 1},
+            }
+        )
+        return await collection.find({"claimed_by": token}).to_list(length=limit)
+
+
+    @staticmethod
+    async def dispatch(limit: int = None) -> Dict[str, int]:
+        """ Claim one batch of rows, send them and flush their new statuses.
+
+        Rows are grouped by ``batch_id`` and each group goes out through the
+        Mailgun batch engine. Status changes are written with a single
+        ``bulk_write`` of one ``UpdateMany`` per outcome and chunk, not one
+        update per message.
+
+        Every row is also claimed under the idempotency key
+        ``outbox:<row id>`` before it is sent and marked done right after,
+        so a row re-claimed after a worker died between the send and the
+        status write is marked sent without being sent again.
+
+        :return: Counts of claimed, sent, retried and failed rows.
+        """
+        rows = await OutboxService.claim(limit or settings.OUTBOX_CLAIM_BATCH_SIZE)
+        counts = {"claimed": len(rows), "sent": 0, "retried": 0, "failed": 0}
+        if not rows:
+            return counts
+
+        groups: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            groups[row["batch_id"]].append(row)
+
+        now = datetime.utcnow()
+        updates = []
+        keys = {row["_id"]: f"outbox:{row['_id']}" for row in rows}
+        claims = await send_idempotency.claim_many(list(keys.values()))
+        already_sent = [row["_id"] for row in rows if claims[keys[row["_id"]]] == ClaimResult.DONE]
+        if already_sent:
+            counts["sent"] += len(already_sent)
+            updates.append(UpdateMany(
+                {"_id": {"$in": already_sent}},
+                {"$set": {"status": EmailStatus.SENT.value, "error": None, "claimed_by": None, "updated_at": now}}
+            ))
+        in_flight = [row["_id"] for row in rows if claims[keys[row["_id"]]] == ClaimResult.IN_PROGRESS]
+        if in_flight:
+            # Another attempt still holds the key; look again once its lease is over.
+            counts["retried"] += len(in_flight)
+            updates.append(UpdateMany(
+                {"_id": {"$in": in_flight}},
+                {"$set": {"claimed_by": None, "updated_at": now,
+                          "lease_until": now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS)}}
+            ))
+
+        for group in groups.values():
+            group = [row for row in group if claims[keys[row["_id"]]] == ClaimResult.CLAIMED]
+            if not group:
+                continue
+            first = group[0]
+            by_address = {row["to_email"]: row for row in group}
+            done_keys, released_keys = [], []
+            try:
+                report = await EmailService.send_batch_message(
+                    recipients=[BatchRecipient(email=row["to_email"], variables=row["variables"]) for row in group],
+                    subject=first["subject"],
+                    template=first.get("template"),
+                    local_template=first.get("local_template"),
+                    context=first.get("context")
+                )
+                outcomes = [(chunk.recipients, chunk.delivered, chunk.provider_id, chunk.error) for chunk in report.chunks]
+                rejected = [(address, "Recipient is suppressed") for address in report.suppressed]
+                rejected += [(recipient.email, recipient.reason) for recipient in report.invalid]
+                for address, reason in rejected:
+                    if address in by_address:
+                        released_keys.append(keys[by_address[address]["_id"]])
+                        counts["failed"] += 1
+                        updates.append(UpdateOne(
+                            {"_id": by_address[address]["_id"]},
+                            {"$set": {"status": EmailStatus.FAILED.value, "error": reason,
+                                      "claimed_by": None, "updated_at": now}}
+                        ))
+            except Exception as e:
+                logger.error(f"Outbox batch {first['batch_id']} could not be sent: {str(e)}")
+                outcomes = [(list(by_address), False, None, str(e))]
+
+            for addresses, delivered, provider_id, error in outcomes:
+                group_rows = [by_address[address] for address in addresses if address in by_address]
+                (done_keys if delivered else released_keys).extend(keys[row["_id"]] for row in group_rows)
+                if delivered:
+                    counts["sent"] += len(group_rows)
+                    updates.append(UpdateMany(
+                        {"_id": {"$in": [row["_id"] for row in group_rows]}},
+                        {"$set": {"status": EmailStatus.SENT.value, "provider_id": provider_id, "error": None,
+                                  "claimed_by": None, "updated_at": now}}
+                    ))
+                    continue
+                retry = [row["_id"] for row in group_rows if row["attempts"] < settings.OUTBOX_MAX_ATTEMPTS]
+                failed = [row["_id"] for row in group_rows if row["attempts"] >= settings.OUTBOX_MAX_ATTEMPTS]
+                if retry:
+                    counts["retried"] += len(retry)
+                    backoff = settings.OUTBOX_RETRY_DELAY_SECONDS * (2 ** (group_rows[0]["attempts"] - 1))
+                    updates.append(UpdateMany(
+                        {"_id": {"$in": retry}},
+                        {"$set": {"error": error, "claimed_by": None, "updated_at": now,
+                                  "lease_until": now + timedelta(seconds=backoff)}}
+                    ))
+                if failed:
+                    counts["failed"] += len(failed)
+                    updates.append(UpdateMany(
+                        {"_id": {"$in": failed}},
+                        {"$set": {"status": EmailStatus.FAILED.value, "error": error, "claimed_by": None,
+                                  "updated_at": now}}
+                    ))
+            # Right after the send: from here on a crash no longer means a resend.
+            await send_idempotency.mark_done_many(done_keys)
+            await send_idempotency.release_many(released_keys)
+
+        if updates:
+            await OutboxService._collection().bulk_write(updates, ordered=False)
+        return counts
+
+
+    @staticmethod
+    async def get_batch_status(batch_id: str) -> Dict[str, int]:
+        """ Number of rows per status for one enqueued batch. """
+        pipeline = [
+            {"$match": {"batch_id": batch_id}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+        ]
+        result = await OutboxService._collection().aggregate(pipeline).to_list(length=None)
+        return {row["_id"]: row["count"] for row in result}
@@ -0,0 +1,145 @@
+import time
+import asyncio
+import logging
+from typing import Optional
+from core.config import settings
+from depends.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+# Refill and take tokens atomically. Redis TIME is used so every process
+# shares the same clock. Returns the seconds to wait before retrying ("0"
+# when the tokens were taken); returned as a string to keep the fraction.
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= requested then
+    tokens = tokens - requested
+else
+    wait = (requested - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+class TokenBucket:
+    """
+    Token bucket shared by every process through Redis.
+
+    Falls back to a process-local bucket with the same parameters when Redis
+    is unreachable, so sends keep flowing at a (per-process) bounded rate.
+    """
+
+    def __init__(self, key: str, rate: float, capacity: float):
+        self.key = key
+        self.rate = rate
+        self.capacity = capacity
+        self._script = None
+        self._local_tokens = capacity
+        self._local_ts = time.monotonic()
+
+    def _take_local(self, tokens: float) -> float:
+        now = time.monotonic()
+        self._local_tokens = min(self.capacity, self._local_tokens + (now - self._local_ts) * self.rate)
+        self._local_ts = now
+        if self._local_tokens >= tokens:
+            self._local_tokens -= tokens
+            return 0.0
+        return (tokens - self._local_tokens) / self.rate
+
+    async def _take(self, tokens: float) -> float:
+        from redis.exceptions import RedisError
+
+        try:
+            if self._script is None:
+                self._script = get_redis().register_script(_TOKEN_BUCKET_SCRIPT)
+            return float(await self._script(keys=[self.key], args=[self.rate, self.capacity, tokens]))
+        except RedisError as e:
+            logger.warning(f"Rate limiter falling back to local bucket for {self.key}: {str(e)}")
+            return self._take_local(tokens)
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until ``tokens`` are available and take them"""
+        while True:
+            wait = await self._take(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on in-flight requests.
+
+    The limit grows by roughly one slot per limit's worth of healthy responses,
+    halves on a throttling response (429) and shrinks by 10% when latency rises
+    above ``latency_tolerance`` times the observed baseline.
+    """
+
+    def __init__(self, min_limit: int, max_limit: int, latency_tolerance: float = 2.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.limit = float(min_limit)
+        self.in_flight = 0
+        self.baseline_latency: Optional[float] = None
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def record(self, latency: float, throttled: bool = False):
+        """Adjust the limit from one observed response"""
+        if throttled:
+            self.limit = max(self.min_limit, self.limit / 2)
+            return
+
+        if self.baseline_latency is None:
+            self.baseline_latency = latency
+        else:
+            # Track the floor of the latency distribution, drift up slowly.
+            self.baseline_latency = min(latency, 0.95 * self.baseline_latency + 0.05 * latency)
+
+        if latency > self.baseline_latency * self.latency_tolerance:
+            self.limit = max(self.min_limit, self.limit * 0.9)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> dict:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "baseline_latency": self.baseline_latency,
+        }
+
+
+# Limiters in front of every Mailgun send, keyed by sending domain.
+mailgun_rate_limiter = TokenBucket(
+    key=f"ratelimit:mailgun:{settings.MAILGUN_DOMAIN}",
+    rate=settings.MAILGUN_RATE_LIMIT_PER_SECOND,
+    capacity=settings.MAILGUN_RATE_LIMIT_BURST,
+)
+mailgun_concurrency_limiter = AdaptiveConcurrencyLimiter(
+    min_limit=settings.MAILGUN_MIN_CONCURRENCY,
+    max_limit=settings.MAILGUN_MAX_CONCURRENCY,
+    latency_tolerance=settings.MAILGUN_LATENCY_TOLERANCE,
+)
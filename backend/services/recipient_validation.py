@@ -0,0 +1,207 @@
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+from email_validator import EmailNotValidError, validate_email
+from core.config import settings
+from schemas.email_schema import InvalidRecipient, RecipientValidationReport
+
+logger = logging.getLogger(__name__)
+
+
+class DomainCache:
+    """
+    Per-domain deliverability results with a TTL and LRU eviction.
+
+    Entries are ``(expires, reason)``; ``reason`` is ``None`` for a domain
+    that accepts mail. Negative results get a shorter TTL so a domain that
+    gains MX records is picked up quickly.
+    """
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries: "OrderedDict[str, Tuple[float, Optional[str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, domain: str) -> Tuple[bool, Optional[str]]:
+        """
+        :return: ``(found, reason)``.
+        """
+        entry = self._entries.get(domain)
+        if entry is not None:
+            expires, reason = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(domain)
+                self.hits += 1
+                return True, reason
+            del self._entries[domain]
+        self.misses += 1
+        return False, None
+
+    def set(self, domain: str, reason: Optional[str]):
+        ttl = self.ttl if reason is None else self.negative_ttl
+        self._entries[domain] = (time.monotonic() + ttl, reason)
+        self._entries.move_to_end(domain)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class RecipientValidator:
+    """
+    Bulk recipient validation: syntax and normalization with
+    ``email_validator``, then one MX lookup per distinct domain.
+
+    Lookups run concurrently (bounded by ``concurrency``) on an async
+    resolver, results are kept in a :class:`DomainCache`, and concurrent
+    callers asking for the same domain share one in-flight lookup. The
+    resolver only needs an ``async resolve(qname, rdtype)`` method, so a
+    stub can replace ``dns.asyncresolver.Resolver`` to run offline.
+
+    DNS failures other than "domain does not exist" and "no mail server"
+    (timeouts, SERVFAIL) do not reject the recipient and are not cached.
+    """
+
+    def __init__(
+        self,
+        resolver=None,
+        cache: Optional[DomainCache] = None,
+        concurrency: int = 50,
+        timeout: float = 3.0,
+        check_mx: bool = True
+    ):
+        self._resolver = resolver
+        self.cache = cache or DomainCache(
+            max_size=settings.RECIPIENT_DOMAIN_CACHE_SIZE,
+            ttl=settings.RECIPIENT_DOMAIN_CACHE_TTL_SECONDS,
+            negative_ttl=settings.RECIPIENT_DOMAIN_NEGATIVE_TTL_SECONDS,
+        )
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.check_mx = check_mx
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.lookups = 0
+
+    def _get_resolver(self):
+        if self._resolver is None:
+            import dns.asyncresolver
+
+            resolver = dns.asyncresolver.Resolver()
+            resolver.lifetime = self.timeout
+            self._resolver = resolver
+        return self._resolver
+
+    async def _resolve(self, domain: str) -> Optional[str]:
+        """
+        Look up one domain.
+
+        :return: ``None`` when the domain accepts mail, otherwise the reason.
+        :raises Exception: Transient resolver errors, left to the caller.
+        """
+        import dns.resolver
+
+        resolver = self._get_resolver()
+        self.lookups += 1
+        try:
+            answer = await resolver.resolve(domain, "MX")
+        except dns.resolver.NXDOMAIN:
+            return "Domain does not exist"
+        except dns.resolver.NoAnswer:
+            # No MX record: RFC 5321 falls back to the domain's address record.
+            for rdtype in ("A", "AAAA"):
+                try:
+                    await resolver.resolve(domain, rdtype)
+                    return None
+                except (dns.resolver.NoAnswer, dns.resolver.NXDOMAIN):
+                    continue
+            return "Domain has no mail server"
+
+        exchanges = [str(record.exchange).rstrip(".") for record in answer]
+        # RFC 7505 null MX: the domain explicitly accepts no mail.
+        if not any(exchanges):
+            return "Domain does not accept mail"
+        return None
+
+    async def _lookup(self, domain: str) -> Optional[str]:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            try:
+                reason = await asyncio.wait_for(self._resolve(domain), timeout=self.timeout)
+            except Exception as e:
+                logger.warning(f"MX lookup for {domain} failed: {str(e)}")
+                return None
+            self.cache.set(domain, reason)
+            return reason
+
+    async def check_domain(self, domain: str) -> Optional[str]:
+        """
+        Deliverability of one domain, cached and shared with concurrent callers.
+
+        :return: ``None`` when the domain accepts mail, otherwise the reason.
+        """
+        found, reason = self.cache.get(domain)
+        if found:
+            return reason
+        future = self._inflight.get(domain)
+        if future is None:
+            future = asyncio.ensure_future(self._lookup(domain))
+            self._inflight[domain] = future
+            future.add_done_callback(lambda _: self._inflight.pop(domain, None))
+        return await asyncio.shield(future)
+
+    async def validate(self, addresses: Iterable[str]) -> RecipientValidationReport:
+        """
+        Validate and normalize recipients.
+
+        Addresses are deduplicated after normalization, keeping the first
+        occurrence's order; each distinct domain is resolved at most once.
+
+        :param addresses: Raw recipient addresses.
+        :return: Normalized valid addresses and the rejected ones with a reason.
+        """
+        valid: Dict[str, str] = {}
+        invalid = []
+        for address in addresses:
+            try:
+                result = validate_email(address, check_deliverability=False)
+            except EmailNotValidError as e:
+                invalid.append(InvalidRecipient(email=address, reason=str(e)))
+                continue
+            valid.setdefault(result.normalized, result.ascii_domain)
+
+        if self.check_mx and valid:
+            domains = list(dict.fromkeys(valid.values()))
+            reasons = dict(zip(domains, await asyncio.gather(*(self.check_domain(domain) for domain in domains))))
+            for address, domain in list(valid.items()):
+                if reasons[domain] is not None:
+                    invalid.append(InvalidRecipient(email=address, reason=reasons[domain]))
+                    del valid[address]
+
+        return RecipientValidationReport(valid=list(valid), invalid=invalid)
+
+    def stats(self) -> dict:
+        return {**self.cache.stats(), "lookups": self.lookups, "in_flight": len(self._inflight)}
+
+
+recipient_validator = RecipientValidator(
+    concurrency=settings.RECIPIENT_DNS_CONCURRENCY,
+    timeout=settings.RECIPIENT_DNS_TIMEOUT,
+    check_mx=settings.RECIPIENT_MX_CHECK,
+)
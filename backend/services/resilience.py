@@ -0,0 +1,207 @@
+import time
+import random
+import asyncio
+import logging
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Optional
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker rejects a call without trying it"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    rejects calls for ``recovery_timeout`` seconds. It then lets a single
+    probe through (half-open); success closes it, failure reopens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+        self.rejected_calls = 0
+        self.times_opened = 0
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+
+        if self.state == self.CLOSED:
+            return
+        if self.state == self.HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return
+        self.rejected_calls += 1
+        raise CircuitOpenError(f"Circuit '{self.name}' is open")
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+
+    def release_probe(self):
+        """Give up a call's probe slot without an outcome (the call was cancelled)"""
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logger.warning(f"Circuit '{self.name}' opened after {self.consecutive_failures} failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "rejected_calls": self.rejected_calls,
+            "times_opened": self.times_opened,
+        }
+
+
+class RetryPolicy:
+    """
+    Bounded retries with exponential backoff and full jitter.
+
+    5xx and 429 responses and errors raised before the request went out
+    (connect errors and timeouts, pool timeouts) are retried. Any other
+    transport error, such as a read timeout, may come after the provider
+    accepted the request, so it is only retried for idempotent calls. A
+    ``Retry-After`` header overrides the computed delay (capped at
+    ``max_retry_after``). Other 4xx responses fail immediately.
+    """
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float, max_retry_after: float):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.calls = 0
+        self.retries = 0
+        self.exhausted = 0
+
+    @staticmethod
+    def is_retryable(error: Exception, idempotent: bool = False) -> bool:
+        import httpx
+
+        if isinstance(error, httpx.HTTPStatusError):
+            code = error.response.status_code
+            return code == 429 or code >= 500
+        if isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)):
+            return True
+        return idempotent and isinstance(error, httpx.TransportError)
+
+    @staticmethod
+    def is_provider_failure(error: Exception) -> bool:
+        """Whether the error says the provider is unhealthy (counts against the breaker)"""
+        import httpx
+
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500
+        return isinstance(error, httpx.TransportError)
+
+    def _retry_after(self, error: Exception) -> Optional[float]:
+        import httpx
+
+        if not isinstance(error, httpx.HTTPStatusError):
+            return None
+        value = error.response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0.0), self.max_retry_after)
+
+    def delay(self, attempt: int, error: Exception) -> float:
+        """Seconds to sleep before retry number ``attempt`` (0-based)"""
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def stats(self) -> dict:
+        return {"calls": self.calls, "retries": self.retries, "exhausted": self.exhausted}
+
+
+async def call_with_resilience(
+    func: Callable[[], Awaitable[Any]],
+    breaker: CircuitBreaker,
+    policy: RetryPolicy,
+    idempotent: bool = False
+) -> Any:
+    """
+    Call ``func`` through the breaker, retrying transient failures.
+
+    ``idempotent`` marks calls that are safe to repeat after the request
+    may have reached the provider (reads, or writes carrying a provider
+    idempotency key); see RetryPolicy.
+
+    Raises:
+        CircuitOpenError: If the breaker rejects the call
+        Exception: The last error once retries are exhausted or on a non-retryable error
+    """
+    policy.calls += 1
+    for attempt in range(policy.max_attempts):
+        breaker.allow()
+        try:
+            result = await func()
+        except Exception as e:
+            if RetryPolicy.is_provider_failure(e):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if not RetryPolicy.is_retryable(e, idempotent):
+                raise
+            if attempt + 1 >= policy.max_attempts:
+                policy.exhausted += 1
+                raise
+            policy.retries += 1
+            delay = policy.delay(attempt, e)
+            logger.warning(f"Retrying {breaker.name} call in {delay:.2f}s after: {str(e)}")
+            await asyncio.sleep(delay)
+        except BaseException:
+            # Cancelled: no verdict on the provider, but free the half-open probe.
+            breaker.release_probe()
+            raise
+        else:
+            breaker.record_success()
+            return result
+
+
+# Resilience settings for the Mailgun API.
+mailgun_breaker = CircuitBreaker(
+    name="mailgun",
+    failure_threshold=settings.MAILGUN_BREAKER_FAILURE_THRESHOLD,
+    recovery_timeout=settings.MAILGUN_BREAKER_RECOVERY_TIMEOUT,
+)
+mailgun_retry_policy = RetryPolicy(
+    max_attempts=settings.MAILGUN_RETRY_ATTEMPTS,
+    base_delay=settings.MAILGUN_RETRY_BASE_DELAY,
+    max_delay=settings.MAILGUN_RETRY_MAX_DELAY,
+    max_retry_after=settings.MAILGUN_RETRY_AFTER_MAX,
+)
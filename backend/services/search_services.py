@@ -0,0 +1,229 @@
+import re
+import html
+import base64
+import binascii
+import logging
+from typing import Any, Dict, List, Optional
+from pymongo import UpdateOne
+from core.compression import unpack
+from core.config import settings
+from depends.db import database
+from models.archive_model import ArchivedMessage
+from models.email_model import EmailMessage
+from schemas.inbox_schema import SearchHit, SearchPage
+from services.archive_services import ArchiveService
+
+logger = logging.getLogger(__name__)
+
+_TAG = re.compile(r"<(script|style)\b.*?</\1\s*>|<[^>]+>", re.IGNORECASE | re.DOTALL)
+_SPACE = re.compile(r"\s+")
+_TERM = re.compile(r'(-?)"([^"]*)"|(-?)(\S+)')
+_WORD = re.compile(r"\w+")
+# Rough English suffixes, so "sending" still highlights "send"/"sends".
+_SUFFIXES = ("ings", "ing", "ed", "es", "s")
+
+_SEARCH_PROJECTION = {
+    "_id": 1, "message_id": 1, "from_email": 1, "to_email": 1, "subject": 1,
+    "status": 1, "created_at": 1, "read": 1, "search_text": 1,
+    "score": {"$meta": "textScore"},
+}
+
+
+class SearchService:
+
+    @staticmethod
+    def search_text(body: Optional[str], html_body: Optional[str] = None) -> str:
+        """ Plain text indexed for a message: the text body, else the HTML with tags stripped, bounded.
+
+        :param body: Text body.
+        :param html_body: HTML body, used when there is no text body.
+        :return: Whitespace-collapsed text of at most SEARCH_TEXT_MAX_CHARS.
+        """
+        text = body or ""
+        if not text.strip() and html_body:
+            text = html.unescape(_TAG.sub(" ", html_body))
+        return _SPACE.sub(" ", text).strip()[:settings.SEARCH_TEXT_MAX_CHARS]
+
+    @staticmethod
+    def highlight_terms(query: str) -> List[str]:
+        """ Words to highlight for a ``$text`` query: negated terms are dropped, suffixes trimmed. """
+        terms = set()
+        for match in _TERM.finditer(query):
+            negated = match.group(1) or match.group(3)
+            if negated:
+                continue
+            for word in _WORD.findall(match.group(2) if match.group(2) is not None else match.group(4)):
+                word = word.lower()
+                if len(word) < 2:
+                    continue
+                for suffix in _SUFFIXES:
+                    if word.endswith(suffix) and len(word) - len(suffix) >= 3:
+                        word = word[:-len(suffix)]
+                        break
+                terms.add(word)
+        return sorted(terms, key=len, reverse=True)
+
+    @staticmethod
+    def highlight(text: str, terms: List[str], width: Optional[int] = None) -> str:
+        """ HTML-escaped excerpt of ``text`` around the first match, matches wrapped in ``<mark>``.
+
+        :param text: Plain text.
+        :param terms: Output of :meth:`highlight_terms`.
+        :param width: Excerpt length; None keeps the whole text.
+        """
+        if not terms:
+            return html.escape(text[:width] if width else text)
+        pattern = re.compile(r"\b(?:" + "|".join(re.escape(term) for term in terms) + r")\w*", re.IGNORECASE)
+        start, end = 0, len(text)
+        if width and len(text) > width:
+            first = pattern.search(text)
+            start = max(0, first.start() - width // 4) if first else 0
+            end = min(len(text), start + width)
+        window = text[start:end]
+
+        parts = ["…"] if start else []
+        position = 0
+        for match in pattern.finditer(window):
+            parts.append(html.escape(window[position:match.start()]))
+            parts.append(f"<mark>{html.escape(match.group())}</mark>")
+            position = match.end()
+        parts.append(html.escape(window[position:]))
+        if end < len(text):
+            parts.append("…")
+        return "".join(parts)
+
+    @staticmethod
+    def encode_cursor(offset: int) -> str:
+        return base64.urlsafe_b64encode(str(offset).encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> int:
+        try:
+            offset = int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        except (binascii.Error, ValueError):
+            raise ValueError("Invalid cursor")
+        if offset < 0:
+            raise ValueError("Invalid cursor")
+        return offset
+
+    @staticmethod
+    async def search(
+        user_id: str,
+        query: str,
+        to_email: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 20
+    ) -> SearchPage:
+        """ Search a user's messages by subject, sender and body, best match first.
+
+        Uses the ``user_text_search`` index: equality on ``user_id`` then the
+        text terms, so only the user's matching postings are read and the
+        cost follows the number of matches, not the mailbox size. Ranking is
+        Mongo's text score (subject weighs 10, sender 5, body 1), newest
+        first on ties. Archived messages carry the same fields and index,
+        and both collections are merged on that order. Score order has no
+        stable keyset, so pages are offsets, capped at SEARCH_MAX_RESULTS.
+
+        :param user_id: Mailbox owner.
+        :param query: ``$text`` search string; supports "phrases" and -negation.
+        :param to_email: Only messages of this mailbox.
+        :param cursor: ``next_cursor`` of the previous page.
+        :param limit: Page size.
+        :return: Page of hits with highlighted subject and body snippet.
+        """
+        query = query.strip()
+        if not query:
+            raise ValueError("Empty search query")
+        offset = SearchService.decode_cursor(cursor) if cursor else 0
+        if offset >= settings.SEARCH_MAX_RESULTS:
+            return SearchPage(items=[])
+        limit = min(limit, settings.SEARCH_MAX_RESULTS - offset)
+
+        match: Dict[str, Any] = {"user_id": user_id, "$text": {"$search": query}}
+        if to_email:
+            match["to_email"] = to_email
+        # Each collection's first offset + limit + 1 hits hold the merged page.
+        wanted = offset + limit + 1
+        merged: Dict[Any, Dict[str, Any]] = {}
+        for model in (ArchivedMessage, EmailMessage):
+            hits = await database[model.Settings.name].find(match, projection=_SEARCH_PROJECTION) \
+                .sort([("score", {"$meta": "textScore"}), ("created_at", -1), ("_id", -1)]) \
+                .limit(wanted) \
+                .to_list(length=wanted)
+            # Hot copies win over a locator of a message still being archived.
+            merged.update((row["_id"], row) for row in hits)
+        rows = sorted(merged.values(), key=lambda row: (row["score"], row["created_at"], row["_id"]), reverse=True)
+        rows = rows[offset:wanted]
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            if offset + limit < settings.SEARCH_MAX_RESULTS:
+                next_cursor = SearchService.encode_cursor(offset + limit)
+
+        terms = SearchService.highlight_terms(query)
+        items = [
+            SearchHit(
+                **{key: value for key, value in row.items() if key != "search_text"},
+                subject_highlight=SearchService.highlight(row.get("subject", ""), terms),
+                snippet=SearchService.highlight(row.get("search_text", ""), terms, settings.SEARCH_SNIPPET_CHARS),
+            )
+            for row in rows
+        ]
+        return SearchPage(items=items, next_cursor=next_cursor)
+
+    @staticmethod
+    async def backfill(batch_size: int = 1000) -> int:
+        """ Fill ``search_text`` for messages stored before search existed, one batch at a time.
+
+        Archived messages whose locator predates search get it from their
+        segment record, one ranged read each.
+
+        :param batch_size: Messages per batch.
+        :return: Number of messages updated.
+        """
+        messages = database[EmailMessage.Settings.name]
+        updated = 0
+        last_id = None
+        while True:
+            query: Dict[str, Any] = {"search_text": {"$exists": False}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await messages.find(query, projection={"_id": 1, "body": 1, "html": 1, "codec": 1}) \
+                .sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+            if not batch:
+                break
+            last_id = batch[-1]["_id"]
+            await messages.bulk_write([
+                UpdateOne(
+                    {"_id": message["_id"]},
+                    {"$set": {"search_text": SearchService.search_text(
+                        unpack(message.get("body"), message.get("codec")),
+                        unpack(message.get("html"), message.get("codec"))
+                    )}}
+                )
+                for message in batch
+            ], ordered=False)
+            updated += len(batch)
+            logger.info(f"Search backfill: {updated} messages indexed")
+
+        archived = database[ArchivedMessage.Settings.name]
+        last_id = None
+        while True:
+            query = {"search_text": {"$exists": False}}
+            if last_id is not None:
+                query["_id"] = {"$gt": last_id}
+            batch = await archived.find(query).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+            if not batch:
+                return updated
+            last_id = batch[-1]["_id"]
+            updates = []
+            for locator in batch:
+                message = await ArchiveService.fetch(locator)
+                updates.append(UpdateOne(
+                    {"_id": locator["_id"]},
+                    {"$set": {"search_text": SearchService.search_text(message.get("body"), message.get("html"))}}
+                ))
+            await archived.bulk_write(updates, ordered=False)
+            updated += len(batch)
+            logger.info(f"Search backfill: {updated} messages indexed")
@@ -0,0 +1,270 @@
+import hmac
+import json
+import time
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from pymongo import UpdateMany, UpdateOne
+from core.bloom import BloomFilter
+from core.config import settings
+from depends.db import database
+from depends.redis_client import get_redis
+from models.email_model import EmailStatus
+from models.outbox_model import OutboxMessage
+from models.suppression_model import Suppression, SuppressionReason
+
+logger = logging.getLogger(__name__)
+
+# Webhook events waiting to be written, shared by every API process.
+EVENTS_KEY = "suppression:events"
+# Events taken by a flush and not written yet; removed once they are.
+PROCESSING_KEY = "suppression:events:processing"
+# Webhook tokens already accepted, kept while their signature is fresh.
+TOKENS_KEY = "suppression:tokens"
+# Bumped after every flush so processes know to pull new suppressions.
+VERSION_KEY = "suppression:version"
+# Re-read this far behind the newest created_at seen, so entries written
+# concurrently with a slightly older timestamp are not missed.
+_SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class SuppressionFilter:
+    """
+    Per-process Bloom filter of suppressed addresses.
+
+    The filter is loaded once from the suppressions collection and then
+    kept in sync incrementally: at most every SUPPRESSION_SYNC_SECONDS the
+    process reads the Redis version counter, and when it moved, pulls the
+    entries created since the newest one it has seen; while Redis is down it
+    pulls them on every check. Lookups that hit the filter are confirmed
+    against Mongo, so false positives never drop a recipient.
+    """
+
+    def __init__(self):
+        self._bloom: Optional[BloomFilter] = None
+        self._synced_until: Optional[datetime] = None
+        self._version: Optional[str] = None
+        self._checked_at = 0.0
+
+    def _collection(self):
+        return database[Suppression.Settings.name]
+
+    async def _load(self, since: Optional[datetime] = None):
+        query = {"created_at": {"$gte": since - _SYNC_OVERLAP}} if since else {}
+        cursor = self._collection().find(query, projection={"_id": 0, "address": 1, "created_at": 1})
+        async for suppression in cursor:
+            self._bloom.add(suppression["address"])
+            if self._synced_until is None or suppression["created_at"] > self._synced_until:
+                self._synced_until = suppression["created_at"]
+
+    async def _read_version(self) -> Tuple[bool, Optional[str]]:
+        """ Whether Redis answered, and the version counter it holds. """
+        from redis.exceptions import RedisError
+
+        try:
+            return True, await get_redis().get(VERSION_KEY)
+        except RedisError as e:
+            logger.warning(f"Suppression filter syncing from Mongo, Redis is unavailable: {str(e)}")
+            return False, None
+
+    async def sync(self, force: bool = False):
+        """ Load the filter, or pull new entries when the Redis version moved.
+
+        Without Redis the version cannot be compared, so new entries are
+        pulled from Mongo (an indexed ``created_at`` range) every
+        SUPPRESSION_SYNC_SECONDS instead, as if it had moved.
+        """
+        if self._bloom is None:
+            bloom = BloomFilter(
+                capacity=settings.SUPPRESSION_BLOOM_CAPACITY,
+                error_rate=settings.SUPPRESSION_BLOOM_ERROR_RATE
+            )
+            _, self._version = await self._read_version()
+            self._checked_at = time.monotonic()
+            self._bloom = bloom
+            try:
+                await self._load()
+            except Exception:
+                # A partly loaded filter would let suppressed addresses through.
+                self._bloom = None
+                self._synced_until = None
+                raise
+            return
+
+        if not force and time.monotonic() - self._checked_at < settings.SUPPRESSION_SYNC_SECONDS:
+            return
+        self._checked_at = time.monotonic()
+        available, version = await self._read_version()
+        if force or not available or version != self._version:
+            if available:
+                self._version = version
+            await self._load(self._synced_until)
+
+    async def filter(self, addresses: List[str]) -> Tuple[List[str], List[str]]:
+        """ Split ``addresses`` into (allowed, suppressed).
+
+        :param addresses: Recipient addresses.
+        :return: Allowed and suppressed addresses, in input order.
+        """
+        await self.sync()
+        possible = self._bloom.possible_members(address.lower() for address in addresses)
+        if not possible:
+            return list(addresses), []
+
+        confirmed = set(await self._collection().distinct("address", {"address": {"$in": possible}}))
+        allowed, suppressed = [], []
+        for address in addresses:
+            (suppressed if address.lower() in confirmed else allowed).append(address)
+        return allowed, suppressed
+
+
+suppression_filter = SuppressionFilter()
+
+
+class SuppressionService:
+
+    @staticmethod
+    async def verify_signature(signature: Dict[str, Any]):
+        """ Check the HMAC and timestamp of a webhook, and that its token was not used before. """
+        if not settings.MAILGUN_WEBHOOK_SIGNING_KEY:
+            raise PermissionError("Event webhook is not configured")
+        timestamp, token = str(signature.get("timestamp", "")), str(signature.get("token", ""))
+        try:
+            age = abs(time.time() - int(timestamp))
+        except ValueError:
+            raise PermissionError("Invalid Mailgun signature")
+        if age > settings.MAILGUN_SIGNATURE_MAX_AGE_SECONDS:
+            raise PermissionError("Stale Mailgun signature")
+        expected = hmac.new(
+            settings.MAILGUN_WEBHOOK_SIGNING_KEY.encode(),
+            f"{timestamp}{token}".encode(),
+            hashlib.sha256
+        ).hexdigest()
+        if not token or not hmac.compare_digest(expected, str(signature.get("signature", ""))):
+            raise PermissionError("Invalid Mailgun signature")
+        # Timestamps are accepted up to the max age on either side of now.
+        if not await get_redis().set(
+            f"{TOKENS_KEY}:{token}", 1, nx=True, ex=2 * settings.MAILGUN_SIGNATURE_MAX_AGE_SECONDS
+        ):
+            raise PermissionError("Replayed Mailgun signature")
+
+
+    @staticmethod
+    def _reason(event_data: Dict[str, Any]) -> Optional[SuppressionReason]:
+        event = event_data.get("event")
+        if event == "failed" and event_data.get("severity") == "permanent":
+            return SuppressionReason.BOUNCE
+        if event == "complained":
+            return SuppressionReason.COMPLAINT
+        if event == "unsubscribed":
+            return SuppressionReason.UNSUBSCRIBE
+        return None
+
+
+    @staticmethod
+    async def record_event(payload: Dict[str, Any]) -> bool:
+        """ Queue a Mailgun webhook event for the next batched flush.
+
+        :param payload: Webhook body with ``signature`` and ``event-data``.
+        :return: Whether the event leads to a suppression.
+        """
+        await SuppressionService.verify_signature(payload.get("signature") or {})
+        event_data = payload.get("event-data") or {}
+        reason = SuppressionService._reason(event_data)
+        recipient = event_data.get("recipient")
+        if reason is None or not recipient:
+            return False
+
+        message_id = ((event_data.get("message") or {}).get("headers") or {}).get("message-id")
+        await get_redis().rpush(EVENTS_KEY, json.dumps({
+            "address": recipient.lower(),
+            "reason": reason.value,
+            "message_id": message_id,
+        }))
+        return True
+
+
+    @staticmethod
+    async def _write_events(events: List[Dict[str, Any]]):
+        now = datetime.utcnow()
+        await database[Suppression.Settings.name].bulk_write([
+            UpdateOne(
+                {"address": event["address"]},
+                {"$setOnInsert": {"address": event["address"], "reason": event["reason"], "created_at": now}},
+                upsert=True
+            )
+            for event in events
+        ], ordered=False)
+
+        bounced: Dict[str, List[str]] = defaultdict(list)
+        for event in events:
+            if event.get("message_id"):
+                bounced[event["message_id"]].append(event["address"])
+        if bounced:
+            await database[OutboxMessage.Settings.name].bulk_write([
+                UpdateMany(
+                    {"provider_id": {"$in": [message_id, f"<{message_id}>"]}, "to_email": {"$in": addresses}},
+                    {"$set": {"status": EmailStatus.BOUNCED.value, "updated_at": now}}
+                )
+                for message_id, addresses in bounced.items()
+            ], ordered=False)
+
+
+    @staticmethod
+    async def flush_events(batch_size: int = None) -> int:
+        """ Write queued webhook events with batched bulk writes.
+
+        Suppressions are upserted, and outbox rows of bounced/complained
+        messages are marked bounced, one ``bulk_write`` per batch. Each
+        batch is moved to a processing list first and removed from it only
+        once written; a failed batch goes back to the front of the queue,
+        and one left behind by a flush that died is requeued by the next.
+        Writes are idempotent, so an event written twice does no harm.
+
+        :return: Number of events written.
+        """
+        batch_size = batch_size or settings.SUPPRESSION_FLUSH_BATCH_SIZE
+        redis = get_redis()
+        while await redis.lmove(PROCESSING_KEY, EVENTS_KEY, "RIGHT", "LEFT") is not None:
+            pass
+
+        written = 0
+        while True:
+            async with redis.pipeline(transaction=True) as pipe:
+                for _ in range(batch_size):
+                    pipe.lmove(EVENTS_KEY, PROCESSING_KEY, "LEFT", "RIGHT")
+                raw_events = [raw for raw in await pipe.execute() if raw is not None]
+            if not raw_events:
+                break
+            try:
+                await SuppressionService._write_events([json.loads(raw) for raw in raw_events])
+            except Exception:
+                async with redis.pipeline(transaction=True) as pipe:
+                    pipe.lpush(EVENTS_KEY, *reversed(raw_events))
+                    for raw in raw_events:
+                        pipe.lrem(PROCESSING_KEY, 1, raw)
+                    await pipe.execute()
+                raise
+            async with redis.pipeline(transaction=False) as pipe:
+                for raw in raw_events:
+                    pipe.lrem(PROCESSING_KEY, 1, raw)
+                await pipe.execute()
+            written += len(raw_events)
+
+        if written:
+            await redis.incr(VERSION_KEY)
+            logger.info(f"Flushed {written} suppression events")
+        return written
+
+
+    @staticmethod
+    async def add(address: str, reason: SuppressionReason):
+        """ Suppress an address right away (manual entry). """
+        await database[Suppression.Settings.name].update_one(
+            {"address": address.lower()},
+            {"$setOnInsert": {"address": address.lower(), "reason": reason.value, "created_at": datetime.utcnow()}},
+            upsert=True
+        )
+        await get_redis().incr(VERSION_KEY)
@@ -0,0 +1,211 @@
+import re
+import html
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from core.config import settings
+from depends.db import database
+from models.template_model import EmailTemplate
+from schemas.template_schema import RenderedEmail, TemplateUpsert
+
+logger = logging.getLogger(__name__)
+
+# {{ name }} or {{ name.field }}
+_PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z_][\w.]*)\s*\}\}")
+
+
+class SafeString(str):
+    """Value inserted into HTML without escaping"""
+
+
+class CompiledString:
+    """
+    A template string split once into literal chunks and variable paths.
+
+    Rendering is a single ``"".join`` over precomputed pieces; no regex or
+    parsing happens per recipient.
+    """
+    __slots__ = ("literals", "paths", "variables")
+
+    def __init__(self, source: str):
+        self.literals: List[str] = []
+        self.paths: List[Tuple[str, ...]] = []
+        position = 0
+        for match in _PLACEHOLDER.finditer(source):
+            self.literals.append(source[position:match.start()])
+            self.paths.append(tuple(match.group(1).split(".")))
+            position = match.end()
+        self.literals.append(source[position:])
+        self.variables = {path[0] for path in self.paths}
+
+    @staticmethod
+    def _lookup(context: Dict[str, Any], path: Tuple[str, ...]) -> Any:
+        value: Any = context
+        for key in path:
+            if isinstance(value, dict):
+                value = value.get(key)
+            else:
+                value = getattr(value, key, None)
+            if value is None:
+                return ""
+        return value
+
+    def render(self, context: Dict[str, Any], escape: bool = False) -> str:
+        literals = self.literals
+        parts = [literals[0]]
+        for index, path in enumerate(self.paths):
+            value = self._lookup(context, path)
+            if escape and not isinstance(value, SafeString):
+                value = html.escape(str(value))
+            parts.append(str(value))
+            parts.append(literals[index + 1])
+        return "".join(parts)
+
+
+class CompiledTemplate:
+    __slots__ = ("name", "version", "subject", "text", "html", "variables")
+
+    def __init__(self, template: EmailTemplate):
+        self.name = template.name
+        self.version = template.version
+        self.subject = CompiledString(template.subject)
+        self.text = CompiledString(template.text) if template.text is not None else None
+        self.html = CompiledString(template.html) if template.html is not None else None
+        self.variables = set().union(*(part.variables for part in (self.subject, self.text, self.html) if part))
+
+    def render(self, context: Dict[str, Any]) -> RenderedEmail:
+        return RenderedEmail(
+            subject=self.subject.render(context),
+            text=self.text.render(context) if self.text else None,
+            html=self.html.render(context, escape=True) if self.html else None,
+        )
+
+
+class TemplateCache:
+    """LRU of compiled templates keyed by name; an entry is valid for one template version"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, CompiledTemplate]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name: str, version: int) -> Optional[CompiledTemplate]:
+        compiled = self._entries.get(name)
+        if compiled is None or compiled.version != version:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(name)
+        self.hits += 1
+        return compiled
+
+    def put(self, compiled: CompiledTemplate):
+        self._entries[compiled.name] = compiled
+        self._entries.move_to_end(compiled.name)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def evict(self, name: str):
+        self._entries.pop(name, None)
+
+
+template_cache = TemplateCache(max_size=settings.TEMPLATE_CACHE_SIZE)
+
+
+class TemplateService:
+
+    @staticmethod
+    async def upsert_template(name: str, data: TemplateUpsert) -> EmailTemplate:
+        """ Create a template or replace it with a new version.
+
+        One upsert that sets the content and increments ``version``, so
+        concurrent updates each get their own version number. A concurrent
+        first insert of the same name loses on the unique index and is
+        retried as an update.
+        """
+        collection = database[EmailTemplate.Settings.name]
+        update = {
+            "$set": {**data.model_dump(), "updated_at": datetime.utcnow()},
+            "$inc": {"version": 1},
+        }
+        try:
+            document = await collection.find_one_and_update(
+                {"name": name}, update, upsert=True, return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            document = await collection.find_one_and_update(
+                {"name": name}, update, return_document=ReturnDocument.AFTER
+            )
+        template_cache.evict(name)
+        return EmailTemplate.model_validate(document)
+
+
+    @staticmethod
+    async def get_compiled(name: str) -> CompiledTemplate:
+        """ Compiled template, recompiled only when its stored version changed.
+
+        The freshness check reads just the version through the unique name
+        index; the full document is only fetched and compiled on a miss.
+        """
+        collection = database[EmailTemplate.Settings.name]
+        current = await collection.find_one({"name": name}, projection={"_id": 0, "version": 1})
+        if current is None:
+            raise LookupError(f"Template {name} not found")
+        compiled = template_cache.get(name, current["version"])
+        if compiled is None:
+            template = await EmailTemplate.find_one(EmailTemplate.name == name)
+            if template is None:
+                raise LookupError(f"Template {name} not found")
+            compiled = CompiledTemplate(template)
+            template_cache.put(compiled)
+        return compiled
+
+
+    @staticmethod
+    async def render(name: str, context: Dict[str, Any]) -> RenderedEmail:
+        return (await TemplateService.get_compiled(name)).render(context)
+
+
+    @staticmethod
+    async def render_many(name: str, contexts: Iterable[Dict[str, Any]]) -> List[RenderedEmail]:
+        compiled = await TemplateService.get_compiled(name)
+        return [compiled.render(context) for context in contexts]
+
+
+    @staticmethod
+    def render_for_batch(
+        compiled: CompiledTemplate,
+        shared_context: Dict[str, Any],
+        recipient_keys: Iterable[str]
+    ) -> RenderedEmail:
+        """ Render once per batch, leaving per-recipient values to Mailgun.
+
+        Top-level variables in ``recipient_keys`` become ``%recipient.<key>%``
+        placeholders (``%recipient.<key>__html%`` in the HTML part, whose
+        value the caller sends pre-escaped); everything else is rendered
+        from ``shared_context``.
+        """
+        text_context = dict(shared_context)
+        html_context = dict(shared_context)
+        for key in recipient_keys:
+            text_context[key] = f"%recipient.{key}%"
+            html_context[key] = SafeString(f"%recipient.{key}__html%")
+        return RenderedEmail(
+            subject=compiled.subject.render(text_context),
+            text=compiled.text.render(text_context) if compiled.text else None,
+            html=compiled.html.render(html_context, escape=True) if compiled.html else None,
+        )
+
+    @staticmethod
+    def batch_recipient_variables(variables: Dict[str, Any], recipient_keys: Iterable[str]) -> Dict[str, Any]:
+        """ recipient-variables entry matching the placeholders of ``render_for_batch``. """
+        result = {}
+        for key in recipient_keys:
+            value = variables.get(key)
+            value = "" if value is None else str(value)
+            result[key] = value
+            result[f"{key}__html"] = html.escape(value)
+        return result
@@ -1,12 +1,103 @@
+import io
+import csv
+import json
+from typing import Any, AsyncIterator, BinaryIO, Dict, Iterator, List, Optional, Tuple
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo.errors import BulkWriteError
+from core.config import settings
+from depends.db import database
 from models.user_model import User
-from schemas.user_schema import UserCreate
-from core.security import get_current_user, get_password_hash
+from schemas.user_schema import UserCreate, UserImportError, UserImportReport
+from core.security import get_current_user, get_password_hash_async, get_password_hashes
+from core.principal_cache import principal_cache
+
+# Fields that may leave the API in exports. Password fields are never projected.
+USER_EXPORT_FIELDS = ("username", "email", "full_name", "disabled")
+
 
 class UserService:
-    
+
+    @staticmethod
+    def _export_projection(fields: Optional[List[str]]) -> Dict[str, int]:
+        selected = [field for field in (fields or USER_EXPORT_FIELDS) if field in USER_EXPORT_FIELDS]
+        return {field: 1 for field in selected or USER_EXPORT_FIELDS}
+
+
+    @staticmethod
+    def _export_row(document: Dict) -> Dict:
+        document["id"] = str(document.pop("_id"))
+        return document
+
+
     @staticmethod
-    async def get_users():
-        return await User.find_all().to_list()
+    async def stream_users(
+        fields: Optional[List[str]] = None,
+        batch_size: Optional[int] = None,
+        format: str = "ndjson"
+    ) -> AsyncIterator[bytes]:
+        """ Stream every user as NDJSON lines or a JSON array.
+
+        Documents are read from a Motor cursor ``batch_size`` at a time and
+        each batch is emitted as one chunk, so memory stays flat however
+        many users there are.
+
+        :param fields: Fields to include, restricted to USER_EXPORT_FIELDS.
+        :param batch_size: Cursor batch size, defaults to USER_EXPORT_BATCH_SIZE.
+        :param format: "ndjson" or "json".
+        """
+        batch_size = batch_size or settings.USER_EXPORT_BATCH_SIZE
+        cursor = database[User.Settings.name].find(
+            {}, projection=UserService._export_projection(fields), batch_size=batch_size
+        ).sort("_id", 1)
+
+        ndjson = format == "ndjson"
+        if not ndjson:
+            yield b"["
+        lines, first = [], True
+        async for document in cursor:
+            lines.append(json.dumps(UserService._export_row(document), default=str))
+            if len(lines) >= batch_size:
+                yield UserService._export_chunk(lines, ndjson, first)
+                lines, first = [], False
+        if lines:
+            yield UserService._export_chunk(lines, ndjson, first)
+        if not ndjson:
+            yield b"]"
+
+
+    @staticmethod
+    def _export_chunk(lines: List[str], ndjson: bool, first: bool) -> bytes:
+        if ndjson:
+            return ("\n".join(lines) + "\n").encode()
+        return (("" if first else ",") + ",".join(lines)).encode()
+
+
+    @staticmethod
+    async def get_users_page(
+        after: Optional[str] = None,
+        limit: int = 100,
+        fields: Optional[List[str]] = None
+    ) -> Dict:
+        """ Keyset page of users ordered by id.
+
+        :param after: ``next_after`` of the previous page.
+        :param limit: Page size.
+        :param fields: Fields to include, restricted to USER_EXPORT_FIELDS.
+        """
+        query = {}
+        if after:
+            if not ObjectId.is_valid(after):
+                raise ValueError("Invalid cursor")
+            query["_id"] = {"$gt": ObjectId(after)}
+        documents = await database[User.Settings.name].find(
+            query, projection=UserService._export_projection(fields)
+        ).sort("_id", 1).limit(limit).to_list(length=limit)
+        items = [UserService._export_row(document) for document in documents]
+        return {
+            "items": items,
+            "next_after": items[-1]["id"] if len(items) == limit else None,
+        }
 
 
     @staticmethod
@@ -31,20 +122,113 @@ class UserService:
     
     @staticmethod
     async def create_user(user_data: UserCreate):
-        hash_password = get_password_hash(user_data.hashed_password)
-        new_user = User(**user_data.model_dump(exclude_none=True), password=hash_password)
+        hash_password = await get_password_hash_async(user_data.hashed_password)
+        new_user = User(
+            **user_data.model_dump(exclude_none=True, exclude={"hashed_password"}),
+            password=hash_password, hashed_password=hash_password
+        )
         await new_user.insert()
         return new_user
 
     
+    @staticmethod
+    def _read_rows(file: BinaryIO, format: str) -> Iterator[Tuple[int, Any]]:
+        """ Yield (row number, raw row) from a CSV or NDJSON upload without reading it whole. """
+        text = io.TextIOWrapper(file, encoding="utf-8", newline="")
+        if format == "csv":
+            for number, row in enumerate(csv.DictReader(text), start=1):
+                yield number, {key: value for key, value in row.items() if value not in (None, "")}
+            return
+        for number, line in enumerate(text, start=1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError as e:
+                    yield number, e
+
+
+    @staticmethod
+    async def import_users(file: BinaryIO, format: str = "csv") -> UserImportReport:
+        """ Bulk create users from a CSV or NDJSON upload.
+
+        Rows are validated with ``UserCreate`` as they are read and handled
+        USER_IMPORT_BATCH_SIZE at a time: passwords are hashed in parallel
+        and the batch is written with one unordered ``insert_many``.
+        Usernames that already exist are reported instead of inserted.
+
+        :param file: Uploaded file.
+        :param format: "csv" or "ndjson".
+        :return: Per-row error report.
+        """
+        report = UserImportReport(total=0, inserted=0, failed=0, errors=[])
+        batch: List[Tuple[int, UserCreate]] = []
+        for number, row in UserService._read_rows(file, format):
+            report.total += 1
+            try:
+                if isinstance(row, Exception):
+                    raise row
+                batch.append((number, UserCreate.model_validate(row)))
+            except (ValueError, ValidationError) as e:
+                report.errors.append(UserImportError(row=number, error=str(e)))
+            if len(batch) >= settings.USER_IMPORT_BATCH_SIZE:
+                await UserService._import_batch(batch, report)
+                batch = []
+        if batch:
+            await UserService._import_batch(batch, report)
+        report.failed = len(report.errors)
+        return report
+
+
+    @staticmethod
+    async def _import_batch(batch: List[Tuple[int, UserCreate]], report: UserImportReport):
+        collection = database[User.Settings.name]
+        existing = set(await collection.distinct(
+            "username", {"username": {"$in": [user.username for _, user in batch]}}
+        ))
+        rows = []
+        for number, user in batch:
+            if user.username in existing:
+                report.errors.append(UserImportError(row=number, error=f"Username {user.username} already exists"))
+                continue
+            existing.add(user.username)
+            rows.append((number, user))
+        if not rows:
+            return
+
+        hashes = await get_password_hashes([user.hashed_password for _, user in rows])
+        documents = [
+            User(
+                **user.model_dump(exclude_none=True, exclude={"hashed_password"}),
+                password=password_hash, hashed_password=password_hash
+            ).model_dump(exclude={"id", "revision_id"})
+            for (_, user), password_hash in zip(rows, hashes)
+        ]
+        try:
+            result = await collection.insert_many(documents, ordered=False)
+            report.inserted += len(result.inserted_ids)
+        except BulkWriteError as e:
+            report.inserted += e.details.get("nInserted", 0)
+            for error in e.details.get("writeErrors", []):
+                report.errors.append(UserImportError(row=rows[error["index"]][0], error=error.get("errmsg", "Write error")))
+
+    
     @staticmethod
     async def update_user(user: User):
         user = await UserService.get_user_by_id(user.id)
         await user.update({ "$set": user.model_dump(exclude_unset=True)})
+        await principal_cache.invalidate(user.username)
         return user
 
     
+    @staticmethod
+    async def update_password_hash(user: User, password_hash: str):
+        await user.set({User.password: password_hash})
+        await principal_cache.invalidate(user.username)
+
+    
     @staticmethod
     async def delete_user(user: User):
         user = await UserService.get_user_by_id(user.id)
-        return await user.delete()
\ No newline at end of file
+        result = await user.delete()
+        await principal_cache.invalidate(user.username)
+        return result
\ No newline at end of file
@@ -0,0 +1,72 @@
+import logging
+from datetime import datetime
+from celery import shared_task
+from core.async_task import AsyncTask
+from core.config import settings
+from services.email_services import EmailService
+from services.outbox_services import OutboxService
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(base=AsyncTask, name="tasks.email_tasks.send_scheduled_emails")
+async def send_scheduled_emails(job_id: str = None):
+    """
+    Celery task to send scheduled emails.
+    If job_id is provided, claims that job's current run now and sends it.
+    Otherwise, dispatches one send_scheduled_job task per due job.
+    """
+    current_time = datetime.utcnow()
+    if job_id:
+        job_data = await EmailService.claim_job(job_id, current_time)
+        if job_data is None:
+            logger.warning(f"Scheduled job {job_id} not run: it does not exist or a run is in flight")
+            return
+        send_scheduled_job.delay(job_id, job_data['next_run'].isoformat())
+        return
+
+    for job_data in await EmailService.claim_due_jobs(current_time):
+        send_scheduled_job.delay(job_data['job_id'], job_data['next_run'].isoformat())
+
+
+@shared_task(
+    base=AsyncTask,
+    bind=True,
+    name="tasks.email_tasks.send_scheduled_job",
+    max_retries=settings.SCHEDULER_RUN_MAX_RETRIES
+)
+async def send_scheduled_job(self, job_id: str, run_id: str):
+    """
+    Celery task to send one run of a scheduled job.
+
+    Redeliveries and retries of the same (job_id, run_id) only send the
+    chunks that were not delivered yet. Chunks that failed or are still
+    leased by another attempt are retried after the lease expires. The
+    job's next_run only advances once the run is complete; when retries
+    run out the claim is released and a later tick claims the run again.
+    """
+    report = await EmailService.send_scheduled_run(job_id, run_id)
+    if report is None:
+        return
+    if report.complete:
+        await EmailService.complete_scheduled_run(job_id, run_id)
+    elif self.request.retries >= self.max_retries:
+        await EmailService.release_scheduled_run(job_id, run_id)
+    else:
+        raise self.retry(countdown=settings.IDEMPOTENCY_LEASE_SECONDS)
+
+
+@shared_task(base=AsyncTask, name="tasks.email_tasks.dispatch_outbox")
+async def dispatch_outbox():
+    """
+    Celery task to deliver queued outbox rows, one claimed batch at a time,
+    until the outbox is drained or OUTBOX_MAX_BATCHES_PER_RUN is reached.
+    """
+    totals = {"claimed": 0, "sent": 0, "retried": 0, "failed": 0}
+    for _ in range(settings.OUTBOX_MAX_BATCHES_PER_RUN):
+        counts = await OutboxService.dispatch()
+        for key, value in counts.items():
+            totals[key] += value
+        if not counts["claimed"]:
+            break
+    return totals
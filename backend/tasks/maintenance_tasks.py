@@ -0,0 +1,65 @@
+from celery import shared_task
+from core.async_task import AsyncTask
+from services.address_allocator import address_allocator
+from services.archive_services import ArchiveService
+from services.compression_services import CompressionService
+from services.counter_services import CounterService
+from services.expiry_services import ExpiryService
+from services.search_services import SearchService
+from services.suppression_services import SuppressionService
+
+
+@shared_task(base=AsyncTask, name="tasks.maintenance_tasks.cleanup_expired")
+async def cleanup_expired():
+    """
+    Celery task to remove expired temporary mailboxes and messages.
+    """
+    return await ExpiryService.cleanup_expired()
+
+
+@shared_task(base=AsyncTask, name="tasks.maintenance_tasks.archive_messages")
+async def archive_messages():
+    """
+    Celery task to move cold messages into compressed archive segments.
+    """
+    return await ArchiveService.archive()
+
+
+@shared_task(base=AsyncTask, name="tasks.maintenance_tasks.refill_address_pool")
+async def refill_address_pool():
+    """
+    Celery task to top up the pool of pre-generated temporary addresses.
+    """
+    return await address_allocator.refill()
+
+
+@shared_task(base=AsyncTask, name="tasks.maintenance_tasks.flush_suppressions")
+async def flush_suppressions():
+    """
+    Celery task to write queued bounce/complaint events to the suppression list.
+    """
+    return await SuppressionService.flush_events()
+
+
+@shared_task(base=AsyncTask, name="tasks.maintenance_tasks.reconcile_counters")
+async def reconcile_counters():
+    """
+    Celery task to recount mailbox counters and fix any drift.
+    """
+    return await CounterService.reconcile()
+
+
+@shared_task(base=AsyncTask, name="tasks.maintenance_tasks.backfill_search_text")
+async def backfill_search_text(batch_size: int = 1000):
+    """
+    Celery task (run once, not scheduled) to index messages stored before search existed.
+    """
+    return await SearchService.backfill(batch_size)
+
+
+@shared_task(base=AsyncTask, name="tasks.maintenance_tasks.compress_messages")
+async def compress_messages(batch_size: int = None):
+    """
+    Celery task (run once, not scheduled) to compress messages stored before compression.
+    """
+    return await CompressionService.migrate(batch_size)
@@ -0,0 +1,14 @@
+import os
+import sys
+
+# Settings are read at import time; give the required ones test values.
+os.environ.setdefault("BACKEND_CORS_ORIGINS", '["http://localhost"]')
+os.environ.setdefault("API_PREFIX", "/api")
+os.environ.setdefault("DATABASE_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DATABASE_NAME", "email_sender_test")
+os.environ.setdefault("BUCKET_NAME", "attachments")
+os.environ.setdefault("MAILGUN_API_KEY", "test-key")
+os.environ.setdefault("MAILGUN_DOMAIN", "mg.example.com")
+os.environ.setdefault("MAILGUN_FROM_EMAIL", "sender@example.com")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
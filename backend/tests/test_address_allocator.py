@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from core.bloom import BloomFilter
+from services import address_allocator as allocator_module
+from services.address_allocator import AddressAllocator, AddressPoolExhaustedError
+
+
+class SaturatedBloom(BloomFilter):
+    def __contains__(self, item: str) -> bool:
+        return True
+
+
+class FakeRedis:
+    def __init__(self):
+        self.pool = []
+
+    async def llen(self, key):
+        return len(self.pool)
+
+    async def rpush(self, key, *values):
+        self.pool.extend(values)
+
+    async def lpop(self, key):
+        return self.pool.pop(0) if self.pool else None
+
+
+class FakeMailboxes:
+    def __init__(self, taken=()):
+        self.taken = set(taken)
+        self.queries = 0
+
+    async def distinct(self, field, query):
+        self.queries += 1
+        return [address for address in query["address"]["$in"] if address in self.taken]
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    redis, mailboxes = FakeRedis(), FakeMailboxes()
+    monkeypatch.setattr(allocator_module, "get_redis", lambda: redis)
+    monkeypatch.setattr(allocator_module, "database", {allocator_module.Mailbox.Settings.name: mailboxes})
+    return redis, mailboxes
+
+
+def test_refill_tops_up_the_pool(stores):
+    redis, _ = stores
+    allocator = AddressAllocator()
+    allocator._known = BloomFilter(capacity=1000)
+
+    assert asyncio.run(allocator.refill(target=50)) == 50
+    assert len(set(redis.pool)) == 50
+
+
+def test_refill_raises_when_the_filter_is_saturated(stores):
+    allocator = AddressAllocator()
+    allocator._known = SaturatedBloom(capacity=10)
+
+    with pytest.raises(AddressPoolExhaustedError):
+        asyncio.run(allocator.refill(target=10))
+
+
+def test_pop_without_a_loaded_filter_only_checks_mongo(stores):
+    _, mailboxes = stores
+    allocator = AddressAllocator()
+
+    address = asyncio.run(allocator.pop())
+
+    assert address.endswith(f"@{allocator.domain}")
+    assert allocator._known is None
+    assert mailboxes.queries == 1
@@ -0,0 +1,254 @@
+import asyncio
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+import pytest
+from bson import ObjectId
+from pymongo import DeleteOne
+from models.archive_model import ArchiveSegment, ArchivedMessage
+from models.email_model import EmailMessage, EmailStatus
+from schemas.inbox_schema import EmailMessageSummary
+from services import archive_services, inbox_services
+from services.archive_services import ArchiveService, LocalSegmentStore
+from services.inbox_services import InboxService
+
+
+def matches(document, query):
+    for field, condition in query.items():
+        value = document.get(field)
+        if isinstance(condition, dict):
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$lte" in condition and not value <= condition["$lte"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    async def to_list(self, length=None):
+        return self.documents
+
+
+class FakeCollection:
+    """ Just enough of a Motor collection for the archive writer: equality, $in and $lte filters. """
+
+    def __init__(self, documents=()):
+        self.documents = {document["_id"]: dict(document) for document in documents}
+        # Called between the writer's steps, to interleave concurrent changes.
+        self.before_delete = None
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(document) for document in self.documents.values() if matches(document, query)])
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.before_delete is not None and isinstance(requests[0], DeleteOne):
+            self.before_delete()
+        for request in requests:
+            if isinstance(request, DeleteOne):
+                for document in list(self.documents.values()):
+                    if matches(document, request._filter):
+                        del self.documents[document["_id"]]
+                        break
+            else:
+                self.documents[request._filter["_id"]] = {"_id": request._filter["_id"], **request._doc}
+
+    async def delete_many(self, query):
+        deleted = [key for key, document in self.documents.items() if matches(document, query)]
+        for key in deleted:
+            del self.documents[key]
+        return SimpleNamespace(deleted_count=len(deleted))
+
+    async def delete_one(self, query):
+        return await self.delete_many(query)
+
+    async def find_one_and_delete(self, query):
+        for key, document in self.documents.items():
+            if matches(document, query):
+                return self.documents.pop(key)
+        return None
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        for document in self.documents.values():
+            if matches(document, query):
+                for field, amount in update["$inc"].items():
+                    document[field] += amount
+                return dict(document)
+        return None
+
+
+def hot_message(day: date, read: bool = False, **fields):
+    return {
+        "_id": ObjectId(), "message_id": f"<{ObjectId()}@example.com>", "from_email": "sender@example.com",
+        "to_email": "box@example.com", "subject": "Hello", "status": EmailStatus.RECIEVED.value,
+        "created_at": datetime.combine(day, datetime.min.time()), "read": read, "user_id": "u1",
+        "body": "Hi", "html": None, "raw_message": None, **fields,
+    }
+
+
+@pytest.fixture
+def archive(monkeypatch, tmp_path):
+    """ In-memory collections and a segment store under tmp_path. """
+    collections = {
+        EmailMessage.Settings.name: FakeCollection(),
+        ArchivedMessage.Settings.name: FakeCollection(),
+        ArchiveSegment.Settings.name: FakeCollection(),
+    }
+    store = LocalSegmentStore(str(tmp_path))
+
+    async def insert(segment):
+        collections[ArchiveSegment.Settings.name].documents[segment.id] = {
+            "_id": segment.id, **segment.model_dump(exclude={"id", "revision_id"})
+        }
+
+    monkeypatch.setattr(archive_services, "database", collections)
+    monkeypatch.setattr(archive_services, "get_segment_store", lambda backend=None: store)
+    monkeypatch.setattr(ArchiveSegment, "get_pymongo_collection", classmethod(lambda cls: None))
+    monkeypatch.setattr(ArchiveSegment, "insert", insert)
+    return SimpleNamespace(
+        hot=collections[EmailMessage.Settings.name],
+        locators=collections[ArchivedMessage.Settings.name],
+        segments=collections[ArchiveSegment.Settings.name],
+        store=store, root=tmp_path,
+    )
+
+
+def write(archive, batch):
+    return asyncio.run(ArchiveService._write_segment(date(2024, 1, 1), batch, "zlib", archive.store))
+
+
+def segment_files(archive):
+    return list(archive.root.rglob("*.seg"))
+
+
+def test_segment_moves_messages_out_of_hot(archive):
+    batch = [hot_message(date(2024, 1, 1), search_text=f"invoice {i}") for i in range(3)]
+    archive.hot.documents = {message["_id"]: dict(message) for message in batch}
+
+    segment = write(archive, batch)
+
+    assert archive.hot.documents == {}
+    assert set(archive.locators.documents) == {message["_id"] for message in batch}
+    # Kept on the locator so search still finds archived messages.
+    assert [archive.locators.documents[message["_id"]]["search_text"] for message in batch] == [
+        "invoice 0", "invoice 1", "invoice 2"
+    ]
+    assert archive.segments.documents[segment.id]["message_count"] == 3
+
+
+def test_message_read_meanwhile_stays_hot(archive):
+    batch = [hot_message(date(2024, 1, 1)) for _ in range(3)]
+    archive.hot.documents = {message["_id"]: dict(message) for message in batch}
+    marked = batch[1]["_id"]
+    archive.hot.before_delete = lambda: archive.hot.documents[marked].update(read=True)
+
+    segment = write(archive, batch)
+
+    assert list(archive.hot.documents) == [marked]
+    assert archive.hot.documents[marked]["read"] is True
+    assert marked not in archive.locators.documents
+    assert archive.segments.documents[segment.id]["message_count"] == 2
+
+
+def test_message_deleted_meanwhile_gets_no_locator(archive):
+    batch = [hot_message(date(2024, 1, 1)) for _ in range(3)]
+    archive.hot.documents = {message["_id"]: dict(message) for message in batch[1:]}
+
+    segment = write(archive, batch)
+
+    assert batch[0]["_id"] not in archive.locators.documents
+    assert archive.segments.documents[segment.id]["message_count"] == 2
+
+
+def test_segment_without_messages_is_deleted(archive):
+    batch = [hot_message(date(2024, 1, 1)) for _ in range(2)]
+
+    write(archive, batch)
+
+    assert archive.locators.documents == {}
+    assert archive.segments.documents == {}
+    assert segment_files(archive) == []
+
+
+def test_rerun_releases_previous_segment(archive):
+    batch = [hot_message(date(2024, 1, 1)) for _ in range(2)]
+    archive.hot.documents = {message["_id"]: dict(message) for message in batch}
+    # First run crashed after writing its locators: the messages are still hot.
+    archive.hot.before_delete = lambda: (_ for _ in ()).throw(ConnectionError("lost"))
+    with pytest.raises(ConnectionError):
+        write(archive, batch)
+    archive.hot.before_delete = None
+
+    second = write(archive, batch)
+
+    assert list(archive.segments.documents) == [second.id]
+    assert len(segment_files(archive)) == 1
+    assert {locator["segment_id"] for locator in archive.locators.documents.values()} == {second.id}
+
+
+def test_deleting_last_archived_message_deletes_segment(archive):
+    batch = [hot_message(date(2024, 1, 1)) for _ in range(2)]
+    archive.hot.documents = {message["_id"]: dict(message) for message in batch}
+    segment = write(archive, batch)
+
+    asyncio.run(ArchiveService.delete("u1", batch[0]["_id"]))
+    assert archive.segments.documents[segment.id]["message_count"] == 1
+    assert len(segment_files(archive)) == 1
+
+    asyncio.run(ArchiveService.delete("u1", batch[1]["_id"]))
+    assert archive.segments.documents == {}
+    assert segment_files(archive) == []
+
+
+class FakeQuery:
+    def __init__(self, items):
+        self.items = items
+
+    def sort(self, keys):
+        self.items = sorted(self.items, key=lambda item: (item.created_at, item.id), reverse=True)
+        return self
+
+    def limit(self, count):
+        self.items = self.items[:count]
+        return self
+
+    def project(self, model):
+        return self
+
+    async def to_list(self):
+        return self.items
+
+
+def summary(created_at):
+    return EmailMessageSummary(
+        id=ObjectId(), message_id="<m@example.com>", from_email="sender@example.com",
+        to_email="box@example.com", subject="Hello", status=EmailStatus.RECIEVED, created_at=created_at, read=False
+    )
+
+
+def test_listing_merges_hot_and_archived_by_key(monkeypatch):
+    now = datetime(2024, 6, 1)
+    # An expiring hot message can be older than archived ones.
+    hot = [summary(now), summary(now - timedelta(days=200))]
+    archived = [summary(now - timedelta(days=100)), summary(now - timedelta(days=300))]
+
+    def find(items):
+        def query(filter):
+            if "$or" not in filter:
+                return FakeQuery(list(items))
+            created_at, last_id = filter["$or"][1]["created_at"], filter["$or"][1]["_id"]["$lt"]
+            return FakeQuery([item for item in items if (item.created_at, item.id) < (created_at, last_id)])
+        return query
+
+    monkeypatch.setattr(inbox_services.EmailMessage, "find", find(hot))
+    monkeypatch.setattr(inbox_services.ArchivedMessage, "find", find(archived))
+
+    first = asyncio.run(InboxService.list_messages("u1", limit=2))
+    second = asyncio.run(InboxService.list_messages("u1", cursor=first.next_cursor, limit=2))
+
+    assert [item.id for item in first.items] == [hot[0].id, archived[0].id]
+    assert [item.id for item in second.items] == [hot[1].id, archived[1].id]
+    assert second.next_cursor is None
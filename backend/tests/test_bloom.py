@@ -0,0 +1,37 @@
+import subprocess
+import sys
+from core.bloom import BloomFilter
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"user{i}@example.com" for i in range(1000)]
+    bloom.update(items)
+
+    assert all(item in bloom for item in items)
+    assert bloom.possible_members(items) == items
+
+
+def test_false_positive_rate_is_near_target():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    bloom.update(f"user{i}@example.com" for i in range(1000))
+
+    false_positives = bloom.possible_members(f"other{i}@example.com" for i in range(10000))
+    assert len(false_positives) < 300
+
+
+def test_bits_are_the_same_in_every_process():
+    script = (
+        "from core.bloom import BloomFilter\n"
+        "bloom = BloomFilter(capacity=100)\n"
+        "bloom.update(['a@example.com', 'b@example.com'])\n"
+        "print(bloom.bits.hex())\n"
+    )
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True,
+            env={"PYTHONHASHSEED": seed, "PYTHONPATH": sys.path[0]}
+        ).stdout
+        for seed in ("1", "2")
+    }
+    assert len(outputs) == 1
@@ -0,0 +1,93 @@
+import asyncio
+from bson import ObjectId
+from core import compression
+from services import compression_services
+from services.compression_services import CompressionService
+
+
+def test_pack_round_trips_and_keeps_small_values_plain():
+    fields = {"body": "hello " * 200, "html": "short", "raw_message": None}
+
+    packed = compression.pack(fields, compression.ZLIB, min_bytes=512)
+
+    assert packed["codec"] == compression.ZLIB
+    assert isinstance(packed["body"], bytes)
+    assert packed["html"] == "short"
+    assert packed["raw_message"] is None
+    assert {name: compression.unpack(packed[name], packed["codec"]) for name in fields} == fields
+
+
+def test_pack_threshold_counts_utf8_bytes():
+    # 300 characters, 600 bytes: over a 512-byte threshold.
+    text = "é" * 300
+
+    packed = compression.pack({"body": text}, compression.ZLIB, min_bytes=512)
+
+    assert isinstance(packed["body"], bytes)
+    assert compression.unpack(packed["body"], compression.ZLIB) == text
+
+
+def test_pack_compares_compressed_size_with_utf8_bytes():
+    # Scattered CJK text: compressed it is longer than its character count
+    # but still shorter than its UTF-8 bytes, so it is worth storing.
+    text = "".join(chr(0x4E00 + (i * 7919) % 20000) for i in range(400))
+    data = compression.compress(text, compression.ZLIB)
+    assert len(text) < len(data) < len(text.encode())
+
+    packed = compression.pack({"body": text}, compression.ZLIB, min_bytes=0)
+
+    assert packed["body"] == data
+
+
+def test_stored_size_counts_bytes():
+    assert compression.stored_size(None) == 0
+    assert compression.stored_size("é") == 2
+    assert compression.stored_size(b"\x00\x01") == 2
+
+
+class FakeFind:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def sort(self, *args):
+        return self
+
+    def limit(self, limit):
+        self._limit = limit
+        return self
+
+    async def to_list(self, length=None):
+        return self.documents[:self._limit]
+
+
+class FakeMessages:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def find(self, query, projection=None):
+        after = query.get("_id", {}).get("$gt")
+        return FakeFind([
+            doc for doc in self.documents
+            if doc.get("codec") is None and (after is None or doc["_id"] > after)
+        ])
+
+    async def bulk_write(self, updates, ordered=True):
+        by_id = {doc["_id"]: doc for doc in self.documents}
+        for update in updates:
+            by_id[update._filter["_id"]].update(update._doc["$set"])
+        return type("Result", (), {"modified_count": len(updates)})()
+
+
+def test_migrate_reports_utf8_sizes_and_search_text(monkeypatch):
+    body = "ñandú " * 200
+    documents = [{"_id": ObjectId(), "body": body, "html": None, "raw_message": None, "search_text": "ñandú"}]
+    monkeypatch.setattr(compression_services, "database", {"email_messages": FakeMessages(documents)})
+    monkeypatch.setattr(compression_services.settings, "MESSAGE_COMPRESSION_CODEC", compression.ZLIB)
+
+    result = asyncio.run(CompressionService.migrate(batch_size=10))
+
+    assert result["migrated"] == 1
+    assert result["bytes_before"] == len(body.encode())
+    assert result["bytes_after"] == len(documents[0]["body"])
+    assert result["search_text_bytes"] == len("ñandú".encode())
+    assert documents[0]["codec"] == compression.ZLIB
@@ -0,0 +1,116 @@
+import json
+import asyncio
+import pytest
+from schemas.email_schema import BatchRecipient
+from services import email_services
+from services.email_services import EmailService
+from services.idempotency import ClaimResult
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """ Capture Mailgun posts; no validation or suppression lookups. """
+    posts = []
+
+    async def post_message(data):
+        posts.append(data)
+        return {"id": f"<{len(posts)}@mg.example.com>", "message": "Queued. Thank you."}
+
+    async def no_suppression(addresses):
+        return list(addresses), []
+
+    monkeypatch.setattr(EmailService, "_post_message", staticmethod(post_message))
+    monkeypatch.setattr(email_services.suppression_filter, "filter", no_suppression)
+    monkeypatch.setattr(email_services.recipient_validator, "check_mx", False)
+    return posts
+
+
+def test_send_batch_message_chunks_and_personalizes(sent):
+    recipients = [BatchRecipient(email=f"user{i}@example.com", variables={"n": i}) for i in range(5)]
+
+    report = asyncio.run(EmailService.send_batch_message(recipients, "Hello", template="welcome", batch_size=2))
+
+    assert report.total_recipients == 5
+    assert report.total_chunks == 3
+    assert report.delivered == 5
+    assert report.failed == 0
+    assert [len(post["to"]) for post in sent] == [2, 2, 1]
+    variables = json.loads(sent[0]["recipient-variables"])
+    assert variables == {"user0@example.com": {"n": 0}, "user1@example.com": {"n": 1}}
+
+
+def test_send_batch_message_reports_failed_chunk(sent, monkeypatch):
+    async def post_message(data):
+        if "user2@example.com" in data["to"]:
+            raise RuntimeError("boom")
+        return {"id": "<ok@mg.example.com>"}
+
+    monkeypatch.setattr(EmailService, "_post_message", staticmethod(post_message))
+    recipients = [BatchRecipient(email=f"user{i}@example.com") for i in range(4)]
+
+    report = asyncio.run(EmailService.send_batch_message(recipients, "Hello", batch_size=2))
+
+    assert report.delivered == 2
+    assert report.failed == 2
+    failed = [chunk for chunk in report.chunks if not chunk.delivered]
+    assert failed[0].error == "boom"
+
+
+def test_replay_with_changed_filtering_sends_undelivered_addresses(sent, monkeypatch):
+    """ Chunk keys follow content: dropping an address on replay must not skip the ones after it. """
+    states = {}
+
+    async def claim(key):
+        if states.get(key) == "done":
+            return ClaimResult.DONE
+        states[key] = "claimed"
+        return ClaimResult.CLAIMED
+
+    async def mark_done(key):
+        states[key] = "done"
+
+    async def release(key):
+        states.pop(key, None)
+
+    monkeypatch.setattr(email_services.send_idempotency, "claim", claim)
+    monkeypatch.setattr(email_services.send_idempotency, "mark_done", mark_done)
+    monkeypatch.setattr(email_services.send_idempotency, "release", release)
+    recipients = [BatchRecipient(email=f"user{i}@example.com") for i in range(4)]
+
+    first = asyncio.run(EmailService.send_batch_message(recipients, "Hello", batch_size=2, idempotency_key="job:1"))
+    assert first.delivered == 4
+
+    async def suppress_first(addresses):
+        return [address for address in addresses if address != "user0@example.com"], ["user0@example.com"]
+
+    monkeypatch.setattr(email_services.suppression_filter, "filter", suppress_first)
+    sent.clear()
+    replay = asyncio.run(EmailService.send_batch_message(recipients, "Hello", batch_size=2, idempotency_key="job:1"))
+
+    # New chunks ["user1", "user2"] and ["user3"] were never delivered under those keys, so both go out.
+    assert sorted(address for post in sent for address in post["to"]) == [
+        "user1@example.com", "user2@example.com", "user3@example.com"
+    ]
+    assert not any(chunk.skipped for chunk in replay.chunks)
+
+    sent.clear()
+    again = asyncio.run(EmailService.send_batch_message(recipients, "Hello", batch_size=2, idempotency_key="job:1"))
+    assert sent == []
+    assert all(chunk.skipped for chunk in again.chunks)
+
+
+def test_delivered_chunk_is_reported_when_marking_it_done_fails(sent, monkeypatch):
+    async def claim(key):
+        return ClaimResult.CLAIMED
+
+    async def mark_done(key):
+        raise ConnectionError("redis went away")
+
+    monkeypatch.setattr(email_services.send_idempotency, "claim", claim)
+    monkeypatch.setattr(email_services.send_idempotency, "mark_done", mark_done)
+    recipients = [BatchRecipient(email=f"user{i}@example.com") for i in range(4)]
+
+    report = asyncio.run(EmailService.send_batch_message(recipients, "Hello", batch_size=2, idempotency_key="job:1"))
+
+    assert report.delivered == 4
+    assert all(chunk.delivered for chunk in report.chunks)
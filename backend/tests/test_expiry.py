@@ -0,0 +1,84 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from bson import ObjectId
+from models.email_model import EmailMessage
+from services import expiry_services
+from services.counter_services import CounterService
+from services.expiry_services import ExpiryService
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def limit(self, count):
+        self.documents = self.documents[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return self.documents
+
+
+class FakeMessages:
+    def __init__(self, documents):
+        self.documents = {document["_id"]: document for document in documents}
+        # Runs right before delete_many, to remove messages concurrently.
+        self.before_delete = None
+
+    def find(self, query, projection=None):
+        return FakeCursor([dict(document) for document in self.documents.values()])
+
+    async def delete_many(self, query):
+        if self.before_delete is not None:
+            self.before_delete()
+            self.before_delete = None
+        deleted = [key for key in query["_id"]["$in"] if self.documents.pop(key, None) is not None]
+        return SimpleNamespace(deleted_count=len(deleted))
+
+
+@pytest.fixture
+def counters(monkeypatch):
+    """ Messages of one mailbox; returns the decremented batches and recounted addresses. """
+    calls = {"removed": [], "recounted": []}
+
+    async def messages_removed(batch):
+        calls["removed"].append(batch)
+
+    async def recount(addresses):
+        calls["recounted"].append(addresses)
+        return len(addresses)
+
+    async def no_related(batch):
+        pass
+
+    monkeypatch.setattr(CounterService, "messages_removed", staticmethod(messages_removed))
+    monkeypatch.setattr(CounterService, "recount", staticmethod(recount))
+    monkeypatch.setattr(ExpiryService, "_delete_related", staticmethod(no_related))
+    return calls
+
+
+def messages(monkeypatch, count):
+    collection = FakeMessages([
+        {"_id": ObjectId(), "to_email": "box@example.com", "read": False, "size": 10} for _ in range(count)
+    ])
+    monkeypatch.setattr(expiry_services, "database", {EmailMessage.Settings.name: collection})
+    return collection
+
+
+def test_whole_batch_removed_is_decremented(counters, monkeypatch):
+    messages(monkeypatch, 3)
+
+    assert asyncio.run(ExpiryService.purge_messages({})) == 3
+    assert [len(batch) for batch in counters["removed"]] == [3]
+    assert counters["recounted"] == []
+
+
+def test_batch_partly_removed_concurrently_is_recounted(counters, monkeypatch):
+    collection = messages(monkeypatch, 3)
+    first = next(iter(collection.documents))
+    collection.before_delete = lambda: collection.documents.pop(first)
+
+    assert asyncio.run(ExpiryService.purge_messages({})) == 2
+    assert counters["removed"] == []
+    assert counters["recounted"] == [["box@example.com"]]
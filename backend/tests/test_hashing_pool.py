@@ -0,0 +1,41 @@
+import time
+import asyncio
+from core.hashing_pool import HashingPool, HashingPoolFull
+
+
+def slow_hash(value: str) -> str:
+    time.sleep(0.01)
+    return value.upper()
+
+
+def test_full_pool_rejects():
+    pool = HashingPool(workers=1, max_pending=2)
+
+    async def main():
+        return await asyncio.gather(*(pool.run(slow_hash, str(i)) for i in range(5)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert sum(isinstance(result, HashingPoolFull) for result in results) == 3
+    assert pool.rejected == 3
+
+
+def test_waiting_pool_runs_every_job_of_concurrent_batches():
+    pool = HashingPool(workers=2, max_pending=4, wait=True)
+    peak = 0
+
+    def tracked_hash(value: str) -> str:
+        nonlocal peak
+        peak = max(peak, pool.pending)
+        return slow_hash(value)
+
+    async def batch(prefix: str):
+        return await asyncio.gather(*(pool.run(tracked_hash, f"{prefix}{i}") for i in range(20)))
+
+    async def main():
+        return await asyncio.gather(batch("a"), batch("b"))
+
+    first, second = asyncio.run(main())
+    assert first == [f"A{i}" for i in range(20)]
+    assert second == [f"B{i}" for i in range(20)]
+    assert pool.rejected == 0
+    assert peak <= 4
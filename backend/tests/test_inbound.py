@@ -0,0 +1,145 @@
+import hmac
+import time
+import asyncio
+import hashlib
+import pytest
+from core.config import settings
+from services import inbound_services
+from services.inbound_services import InboundService, InboundTooLarge
+
+BOUNDARY = "form-boundary"
+SIGNING_KEY = "test-signing-key"
+
+MIME = (
+    b"From: sender@example.com\r\n"
+    b"To: box@example.com\r\n"
+    b"Subject: Report\r\n"
+    b"Content-Type: multipart/mixed; boundary=\"mime-boundary\"\r\n"
+    b"\r\n"
+    b"--mime-boundary\r\n"
+    b"Content-Type: text/plain\r\n"
+    b"\r\n"
+    b"See attached.\r\n"
+    b"--mime-boundary\r\n"
+    b"Content-Type: application/octet-stream\r\n"
+    b"Content-Disposition: attachment; filename=\"report.bin\"\r\n"
+    b"\r\n"
+    + b"x" * 1000 + b"\r\n"
+    b"--mime-boundary--\r\n"
+)
+
+
+class FakeSink:
+    def __init__(self, filename, content_type):
+        self.filename = filename
+        self.data = bytearray()
+        self.closed = False
+        self.aborted = False
+
+    async def write(self, data):
+        self.data += data
+
+    async def abort(self):
+        self.aborted = True
+
+    async def close(self):
+        self.closed = True
+        return {"file_id": self.filename, "filename": self.filename, "size": len(self.data)}
+
+
+def signature_fields(timestamp=None, key=SIGNING_KEY):
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    token = "a" * 50
+    signature = hmac.new(key.encode(), f"{timestamp}{token}".encode(), hashlib.sha256).hexdigest()
+    return {"timestamp": timestamp, "token": token, "signature": signature}
+
+
+def form(fields, mime=MIME, mime_first=True) -> bytes:
+    def part(name, value):
+        return (
+            f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"{name}\"\r\n\r\n".encode()
+            + value + b"\r\n"
+        )
+
+    parts = [part(name, value.encode()) for name, value in fields.items()]
+    body_mime = part("body-mime", mime)
+    parts = [body_mime] + parts if mime_first else parts + [body_mime]
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def chunks(data: bytes, size: int = 100):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+@pytest.fixture
+def inbound(monkeypatch):
+    """ Fake GridFS sinks and storage; returns the sinks opened. """
+    sinks = []
+
+    async def sink_factory(filename, content_type):
+        sink = FakeSink(filename, content_type)
+        sinks.append(sink)
+        return sink
+
+    async def store(parser, recipient):
+        return parser
+
+    async def discard_attachments(attachments):
+        for attachment in attachments:
+            attachment["discarded"] = True
+
+    monkeypatch.setattr(inbound_services, "_gridfs_sink", sink_factory)
+    monkeypatch.setattr(InboundService, "_store", staticmethod(store))
+    monkeypatch.setattr(InboundService, "_discard_attachments", staticmethod(discard_attachments))
+    monkeypatch.setattr(settings, "MAILGUN_WEBHOOK_SIGNING_KEY", SIGNING_KEY)
+    return sinks
+
+
+def ingest(body: bytes):
+    return asyncio.run(InboundService.ingest_mailgun(f"multipart/form-data; boundary={BOUNDARY}", chunks(body)))
+
+
+@pytest.mark.parametrize("mime_first", [True, False])
+def test_signed_post_is_parsed(inbound, mime_first):
+    parser = ingest(form({**signature_fields(), "recipient": "box@example.com"}, mime_first=mime_first))
+
+    assert parser.body.strip() == "See attached."
+    assert len(inbound) == 1 and inbound[0].closed
+    assert bytes(inbound[0].data).strip() == b"x" * 1000
+
+
+def test_bad_signature_writes_nothing(inbound):
+    with pytest.raises(PermissionError):
+        ingest(form(signature_fields(key="wrong-key")))
+    assert inbound == []
+
+
+def test_stale_signature_is_rejected(inbound):
+    with pytest.raises(PermissionError):
+        ingest(form(signature_fields(timestamp=time.time() - 3600)))
+    assert inbound == []
+
+
+def test_oversized_post_is_rejected(inbound, monkeypatch):
+    monkeypatch.setattr(settings, "INBOUND_MAX_MESSAGE_BYTES", 500)
+
+    with pytest.raises(InboundTooLarge):
+        ingest(form(signature_fields(), mime_first=False))
+    assert all(sink.aborted for sink in inbound if not sink.closed)
+
+
+def test_open_attachment_is_aborted_on_error(inbound):
+    body = form(signature_fields(), mime_first=False)
+    # Cut the request off in the middle of the attachment.
+    truncated = body[:body.index(b"x" * 500) + 200]
+
+    async def broken():
+        async for chunk in chunks(truncated):
+            yield chunk
+        raise ConnectionError("client went away")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(InboundService.ingest_mailgun(f"multipart/form-data; boundary={BOUNDARY}", broken()))
+    assert len(inbound) == 1
+    assert inbound[0].aborted and not inbound[0].closed
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from depends import redis_client
+from services.mail_push import RESYNC, MailPushHub
+
+
+class DroppingPubSub:
+    """ Delivers the given events, then loses the connection. """
+
+    def __init__(self, events):
+        self.events = events
+
+    async def subscribe(self, channel):
+        pass
+
+    async def listen(self):
+        for event in self.events:
+            yield {"type": "message", "data": json.dumps(event)}
+        raise RedisConnectionError("Connection lost")
+
+    async def aclose(self):
+        pass
+
+
+def event(number):
+    return {"user_id": "u1", "message": {"id": str(number), "to_email": "box@example.com"}}
+
+
+@pytest.fixture
+def pubsubs(monkeypatch):
+    """ First connection delivers two events then drops; reconnects deliver nothing. """
+    connections = [DroppingPubSub([event(1), event(2)])]
+
+    class Redis:
+        def pubsub(self):
+            return connections.pop(0) if connections else DroppingPubSub([])
+
+    monkeypatch.setattr(redis_client, "get_redis", lambda: Redis())
+
+
+def test_dropped_subscription_resyncs_clients_with_pending_events(pubsubs):
+    hub = MailPushHub(queue_size=10, heartbeat=3600)
+
+    async def main():
+        async with hub.subscribe("u1") as queue:
+            while hub.dropped == 0:
+                await asyncio.sleep(0)
+            items = [queue.get_nowait() for _ in range(queue.qsize())]
+        await hub.close()
+        return items
+
+    # The two events that arrived before the drop are replaced by one resync.
+    assert asyncio.run(main()) == [RESYNC]
+    assert hub.dropped == 2
@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from services.mime_stream import StreamingMimeParser
+
+MAX_LINE = 1024
+
+
+class MemorySink:
+    def __init__(self, filename, content_type):
+        self.filename = filename
+        self.data = bytearray()
+
+    async def write(self, data):
+        self.data += data
+
+    async def abort(self):
+        pass
+
+    async def close(self):
+        return {"filename": self.filename, "data": bytes(self.data)}
+
+
+async def memory_sink(filename, content_type):
+    return MemorySink(filename, content_type)
+
+
+def parser() -> StreamingMimeParser:
+    return StreamingMimeParser(
+        memory_sink, max_body_bytes=1 << 20, max_header_bytes=8 * MAX_LINE,
+        max_line_bytes=MAX_LINE, max_inline_raw_bytes=0
+    )
+
+
+def message(preamble: bytes = b"", epilogue: bytes = b"") -> bytes:
+    return (
+        b"From: sender@example.com\r\n"
+        b"Content-Type: multipart/mixed; boundary=\"b\"\r\n"
+        b"\r\n"
+        + preamble +
+        b"--b\r\n"
+        b"Content-Type: text/plain\r\n"
+        b"\r\n"
+        b"Hello\r\n"
+        b"--b--\r\n"
+        + epilogue
+    )
+
+
+def feed(mime_parser: StreamingMimeParser, data: bytes, size: int):
+    async def main():
+        peak = 0
+        for i in range(0, len(data), size):
+            await mime_parser.feed(data[i:i + size])
+            peak = max(peak, len(mime_parser._buffer))
+        await mime_parser.close()
+        return peak
+
+    return asyncio.run(main())
+
+
+@pytest.mark.parametrize("size", [1, 7, 4096])
+def test_parses_regardless_of_chunking(size):
+    mime_parser = parser()
+
+    feed(mime_parser, message(), size)
+
+    assert mime_parser.body.strip() == "Hello"
+
+
+@pytest.mark.parametrize("where", ["preamble", "epilogue"])
+def test_long_line_outside_a_body_is_bounded(where):
+    mime_parser = parser()
+    junk = b"x" * (50 * MAX_LINE) + b"\r\n"
+
+    peak = feed(mime_parser, message(**{where: junk}), 512)
+
+    assert peak <= MAX_LINE + 512
+    assert mime_parser.body.strip() == "Hello"
+
+
+def test_long_header_line_is_rejected():
+    mime_parser = parser()
+
+    with pytest.raises(ValueError):
+        feed(mime_parser, b"Subject: " + b"x" * (50 * MAX_LINE), 512)
@@ -0,0 +1,128 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from models.outbox_model import OutboxMessage
+from services import email_services, outbox_services
+from services.email_services import EmailService
+from services.idempotency import ClaimResult
+from services.outbox_services import OutboxService
+
+
+class FakeIdempotency:
+    def __init__(self):
+        self.states = {}
+
+    async def claim_many(self, keys):
+        result = {}
+        for key in keys:
+            if key in self.states:
+                result[key] = ClaimResult.DONE if self.states[key] == "done" else ClaimResult.IN_PROGRESS
+            else:
+                self.states[key] = "inflight"
+                result[key] = ClaimResult.CLAIMED
+        return result
+
+    async def mark_done_many(self, keys):
+        for key in keys:
+            self.states[key] = "done"
+
+    async def release_many(self, keys):
+        for key in keys:
+            self.states.pop(key, None)
+
+
+class FakeOutbox:
+    def __init__(self):
+        self.writes = []
+
+    async def bulk_write(self, updates, ordered=True):
+        self.writes.extend(updates)
+
+
+@pytest.fixture
+def outbox(monkeypatch):
+    """ Captured outbox writes and Mailgun posts, in-memory idempotency keys. """
+    collection, idempotency, posts = FakeOutbox(), FakeIdempotency(), []
+
+    async def post_message(data):
+        posts.append(data)
+        return {"id": f"<{len(posts)}@mg.example.com>"}
+
+    async def no_suppression(addresses):
+        return list(addresses), []
+
+    monkeypatch.setattr(OutboxService, "_collection", staticmethod(lambda: collection))
+    monkeypatch.setattr(outbox_services, "send_idempotency", idempotency)
+    monkeypatch.setattr(EmailService, "_post_message", staticmethod(post_message))
+    monkeypatch.setattr(email_services.suppression_filter, "filter", no_suppression)
+    monkeypatch.setattr(email_services.recipient_validator, "check_mx", False)
+    monkeypatch.setattr(OutboxMessage, "get_pymongo_collection", classmethod(lambda cls: None))
+    return collection, idempotency, posts
+
+
+def queued_rows(count):
+    return [
+        {"_id": ObjectId(), "batch_id": "b1", "to_email": f"user{i}@example.com", "subject": "Hello",
+         "variables": {}, "context": {}, "attempts": 1}
+        for i in range(count)
+    ]
+
+
+def statuses(writes):
+    result = {}
+    for write in writes:
+        document = write._doc["$set"]
+        ids = write._filter["_id"]
+        for row_id in ids["$in"] if isinstance(ids, dict) else [ids]:
+            result[row_id] = document.get("status")
+    return result
+
+
+def test_dispatch_sends_and_marks_keys_done(outbox, monkeypatch):
+    collection, idempotency, posts = outbox
+    rows = queued_rows(3)
+
+    async def claim(limit):
+        return rows
+
+    monkeypatch.setattr(OutboxService, "claim", staticmethod(claim))
+    counts = asyncio.run(OutboxService.dispatch())
+
+    assert counts["sent"] == 3
+    assert len(posts) == 1
+    assert all(idempotency.states[f"outbox:{row['_id']}"] == "done" for row in rows)
+    assert set(statuses(collection.writes).values()) == {"sent"}
+
+
+def test_reclaimed_rows_already_sent_are_not_sent_again(outbox, monkeypatch):
+    """ A worker died after the send but before the status write: the lease expired and the rows came back. """
+    collection, idempotency, posts = outbox
+    rows = queued_rows(3)
+    idempotency.states[f"outbox:{rows[0]['_id']}"] = "done"
+    idempotency.states[f"outbox:{rows[1]['_id']}"] = "done"
+
+    async def claim(limit):
+        return rows
+
+    monkeypatch.setattr(OutboxService, "claim", staticmethod(claim))
+    counts = asyncio.run(OutboxService.dispatch())
+
+    assert counts["sent"] == 3
+    assert [post["to"] for post in posts] == [["user2@example.com"]]
+    assert set(statuses(collection.writes).values()) == {"sent"}
+
+
+def test_direct_batch_send_is_recorded_as_history(outbox):
+    from schemas.email_schema import BatchRecipient
+
+    collection, _, _ = outbox
+    recipients = [BatchRecipient(email=f"user{i}@example.com", variables={"n": i}) for i in range(3)]
+
+    report = asyncio.run(EmailService.send_batch_message(recipients, "Hello", history_batch_id="h1"))
+
+    assert report.batch_id == "h1"
+    assert len(collection.writes) == 3
+    for write in collection.writes:
+        assert write._filter["batch_id"] == "h1"
+        assert write._doc["$set"]["status"] == "sent"
+        assert write._doc["$setOnInsert"]["variables"] == {"n": int(write._filter["to_email"][4])}
@@ -0,0 +1,79 @@
+import json
+import asyncio
+import pytest
+from beanie import PydanticObjectId
+from core.principal_cache import PrincipalCache
+from models.user_model import User
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.values[key] = value
+
+    async def delete(self, key):
+        self.values.pop(key, None)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    from depends import redis_client
+
+    fake = FakeRedis()
+    monkeypatch.setattr(redis_client, "get_redis", lambda: fake)
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def uninitialized_beanie(monkeypatch):
+    """ Let User be built without init_beanie, which needs a server. """
+    monkeypatch.setattr(User, "get_pymongo_collection", classmethod(lambda cls: None))
+
+
+def make_user() -> User:
+    return User(
+        id=PydanticObjectId(), username="alice", email="alice@example.com",
+        password="$2b$12$secret-hash", hashed_password="$2b$12$other-hash"
+    )
+
+
+def test_redis_entry_has_no_password_fields(redis):
+    cache = PrincipalCache(max_size=10, ttl=60, redis_enabled=True)
+    user = make_user()
+
+    asyncio.run(cache.set("alice", user))
+
+    stored = json.loads(redis.values["principal:alice"])
+    assert "password" not in stored and "hashed_password" not in stored
+    assert stored["username"] == "alice"
+
+
+def test_redis_hit_rebuilds_the_user_without_secrets(redis):
+    writer = PrincipalCache(max_size=10, ttl=60, redis_enabled=True)
+    user = make_user()
+    asyncio.run(writer.set("alice", user))
+
+    cached = asyncio.run(PrincipalCache(max_size=10, ttl=60, redis_enabled=True).get("alice"))
+
+    assert cached.id == user.id and cached.email == user.email
+    assert cached.password == "" and cached.hashed_password == ""
+
+
+def test_local_hits_return_copies():
+    cache = PrincipalCache(max_size=10, ttl=60)
+    user = make_user()
+    asyncio.run(cache.set("alice", user))
+
+    first = asyncio.run(cache.get("alice"))
+    first.disabled = True
+    second = asyncio.run(cache.get("alice"))
+
+    assert first is not second
+    assert second.disabled is False
+    assert second.password == ""
+    assert user.password == "$2b$12$secret-hash"
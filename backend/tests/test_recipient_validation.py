@@ -0,0 +1,110 @@
+import asyncio
+from types import SimpleNamespace
+import dns.resolver
+import pytest
+from services.recipient_validation import DomainCache, RecipientValidator
+
+
+class StubResolver:
+    """ Offline stand-in for dns.asyncresolver.Resolver: records per (domain, rdtype). """
+
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    async def resolve(self, qname, rdtype):
+        self.queries.append((qname, rdtype))
+        await asyncio.sleep(0)
+        domain = self.records.get(qname)
+        if domain is None:
+            raise dns.resolver.NXDOMAIN()
+        if isinstance(domain, Exception):
+            raise domain
+        if rdtype not in domain:
+            raise dns.resolver.NoAnswer()
+        return [SimpleNamespace(exchange=exchange) for exchange in domain[rdtype]]
+
+
+RECORDS = {
+    "example.com": {"MX": ["mx1.example.com.", "mx2.example.com."]},
+    "a-only.example": {"A": ["192.0.2.1"]},
+    "no-mail.example": {"TXT": ["v=spf1 -all"]},
+    "null-mx.example": {"MX": ["."]},
+    "slow.example": dns.resolver.LifetimeTimeout(),
+}
+
+
+@pytest.fixture
+def resolver():
+    return StubResolver(RECORDS)
+
+
+def validator(resolver) -> RecipientValidator:
+    cache = DomainCache(max_size=100, ttl=3600, negative_ttl=60)
+    return RecipientValidator(resolver=resolver, cache=cache, timeout=1.0)
+
+
+def reasons(report):
+    return {recipient.email: recipient.reason for recipient in report.invalid}
+
+
+def test_valid_addresses_are_normalized_and_deduplicated(resolver):
+    report = asyncio.run(validator(resolver).validate(["Alice@Example.COM", "Alice@example.com", "bob@example.com"]))
+
+    assert report.valid == ["Alice@example.com", "bob@example.com"]
+    assert report.invalid == []
+    assert resolver.queries == [("example.com", "MX")]
+
+
+def test_invalid_syntax_is_rejected_without_a_lookup(resolver):
+    report = asyncio.run(validator(resolver).validate(["not-an-address", "a@@example.com"]))
+
+    assert report.valid == []
+    assert set(reasons(report)) == {"not-an-address", "a@@example.com"}
+    assert resolver.queries == []
+
+
+def test_nxdomain_is_rejected(resolver):
+    report = asyncio.run(validator(resolver).validate(["user@missing.example"]))
+
+    assert reasons(report) == {"user@missing.example": "Domain does not exist"}
+
+
+def test_domain_without_mx_or_address_is_rejected(resolver):
+    report = asyncio.run(validator(resolver).validate(["user@no-mail.example"]))
+
+    assert reasons(report) == {"user@no-mail.example": "Domain has no mail server"}
+    assert resolver.queries == [("no-mail.example", "MX"), ("no-mail.example", "A"), ("no-mail.example", "AAAA")]
+
+
+def test_domain_without_mx_falls_back_to_address_record(resolver):
+    report = asyncio.run(validator(resolver).validate(["user@a-only.example"]))
+
+    assert report.valid == ["user@a-only.example"]
+
+
+def test_null_mx_is_rejected(resolver):
+    report = asyncio.run(validator(resolver).validate(["user@null-mx.example"]))
+
+    assert reasons(report) == {"user@null-mx.example": "Domain does not accept mail"}
+
+
+def test_transient_failure_keeps_the_recipient_and_is_not_cached(resolver):
+    checker = validator(resolver)
+
+    report = asyncio.run(checker.validate(["user@slow.example"]))
+
+    assert report.valid == ["user@slow.example"]
+    assert checker.cache.get("slow.example") == (False, None)
+
+
+def test_each_domain_is_resolved_once(resolver):
+    checker = validator(resolver)
+    addresses = [f"user{i}@example.com" for i in range(50)] + [f"user{i}@missing.example" for i in range(50)]
+
+    report = asyncio.run(checker.validate(addresses))
+    asyncio.run(checker.validate(addresses))
+
+    assert len(report.valid) == 50 and len(report.invalid) == 50
+    assert sorted(resolver.queries) == [("example.com", "MX"), ("missing.example", "MX")]
+    assert checker.lookups == 2
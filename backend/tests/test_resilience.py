@@ -0,0 +1,75 @@
+import asyncio
+import httpx
+import pytest
+from services.resilience import CircuitBreaker, RetryPolicy, call_with_resilience
+
+
+def flaky(error: Exception, failures: int):
+    calls = []
+
+    async def func():
+        calls.append(1)
+        if len(calls) <= failures:
+            raise error
+        return "ok"
+
+    return func, calls
+
+
+def policy() -> RetryPolicy:
+    return RetryPolicy(max_attempts=3, base_delay=0, max_delay=0, max_retry_after=0)
+
+
+def breaker() -> CircuitBreaker:
+    return CircuitBreaker("test", failure_threshold=10, recovery_timeout=30)
+
+
+def test_connect_error_is_retried():
+    func, calls = flaky(httpx.ConnectError("refused"), failures=2)
+
+    assert asyncio.run(call_with_resilience(func, breaker(), policy())) == "ok"
+    assert len(calls) == 3
+
+
+def test_read_timeout_is_not_retried_for_non_idempotent_call():
+    func, calls = flaky(httpx.ReadTimeout("slow"), failures=1)
+
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(call_with_resilience(func, breaker(), policy()))
+    assert len(calls) == 1
+
+
+def test_read_timeout_is_retried_for_idempotent_call():
+    func, calls = flaky(httpx.ReadTimeout("slow"), failures=1)
+
+    assert asyncio.run(call_with_resilience(func, breaker(), policy(), idempotent=True)) == "ok"
+    assert len(calls) == 2
+
+
+def test_client_error_fails_immediately():
+    request = httpx.Request("POST", "https://api.mailgun.net/v3/messages")
+    error = httpx.HTTPStatusError("bad", request=request, response=httpx.Response(400, request=request))
+    func, calls = flaky(error, failures=1)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(call_with_resilience(func, breaker(), policy()))
+    assert len(calls) == 1
+
+
+def test_cancelled_probe_frees_the_half_open_breaker():
+    circuit = CircuitBreaker("test", failure_threshold=1, recovery_timeout=0)
+    circuit.record_failure()
+
+    async def hang():
+        await asyncio.sleep(3600)
+
+    async def main():
+        probe = asyncio.create_task(call_with_resilience(hang, circuit, policy()))
+        await asyncio.sleep(0)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        return await call_with_resilience(flaky(httpx.ConnectError("refused"), failures=0)[0], circuit, policy())
+
+    assert asyncio.run(main()) == "ok"
+    assert circuit.state == CircuitBreaker.CLOSED
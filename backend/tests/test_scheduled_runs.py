@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from models.scheduled_job_model import ScheduledEmailJob
+from services import email_services
+from services.email_services import EmailService
+from tasks import email_tasks
+
+
+class FakeJobs:
+    """ One job; find_one_and_update honours the job_id/next_run filter and the lease. """
+
+    def __init__(self, job):
+        self.job = job
+        self.queries = []
+
+    async def find_one_and_update(self, query, update, sort=None, return_document=None):
+        self.queries.append(query)
+        if "job_id" in query and query["job_id"] != self.job["job_id"]:
+            return None
+        if "next_run" in query and self.job["next_run"] > query["next_run"]["$lte"]:
+            return None
+        if self.job["locked_until"] is not None and self.job["locked_until"] > datetime.utcnow():
+            return None
+        self.job.update(claimed_run=self.job["next_run"], locked_until=update[0]["$set"]["locked_until"])
+        return dict(self.job)
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    collection = FakeJobs({
+        "job_id": "weekly", "next_run": datetime.utcnow() + timedelta(days=3),
+        "claimed_run": None, "locked_until": None, "end_time": None,
+    })
+    monkeypatch.setattr(email_services, "database", {ScheduledEmailJob.Settings.name: collection})
+    return collection
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    runs = []
+    monkeypatch.setattr(email_tasks.send_scheduled_job, "delay", lambda *args: runs.append(args))
+    return runs
+
+
+def test_manual_run_claims_the_jobs_current_run(jobs, queued):
+    asyncio.run(email_tasks.send_scheduled_emails.run("weekly"))
+
+    # The run id is the claimed next_run, so completing it advances the job.
+    assert queued == [("weekly", jobs.job["next_run"].isoformat())]
+    assert jobs.job["claimed_run"] == jobs.job["next_run"]
+
+
+def test_manual_run_is_skipped_while_a_run_is_in_flight(jobs, queued):
+    asyncio.run(email_tasks.send_scheduled_emails.run("weekly"))
+    asyncio.run(email_tasks.send_scheduled_emails.run("weekly"))
+
+    assert len(queued) == 1
+
+
+def test_beat_tick_does_not_claim_jobs_that_are_not_due(jobs, queued):
+    assert asyncio.run(EmailService.claim_due_jobs(datetime.utcnow())) == []
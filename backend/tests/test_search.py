@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from models.archive_model import ArchivedMessage
+from models.email_model import EmailMessage, EmailStatus
+from services import search_services
+from services.search_services import SearchService
+
+
+class FakeCursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def sort(self, keys):
+        self.rows = sorted(self.rows, key=lambda row: (row["score"], row["created_at"], row["_id"]), reverse=True)
+        return self
+
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return self.rows
+
+
+class FakeTextIndex:
+    """ Every stored row matches; rows carry their own text score. """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def find(self, match, projection=None):
+        return FakeCursor([row for row in self.rows if row["user_id"] == match["user_id"]])
+
+
+def hit(score, days_ago, subject="Invoice"):
+    return {
+        "_id": ObjectId(), "message_id": "<m@example.com>", "from_email": "sender@example.com",
+        "to_email": "box@example.com", "subject": subject, "status": EmailStatus.RECIEVED.value,
+        "created_at": datetime(2024, 6, 1) - timedelta(days=days_ago), "read": False, "user_id": "u1",
+        "search_text": "invoice attached", "score": score,
+    }
+
+
+@pytest.fixture
+def indexed(monkeypatch):
+    hot = [hit(2.0, 1), hit(0.5, 2)]
+    archived = [hit(1.5, 400), hit(1.0, 500)]
+    monkeypatch.setattr(search_services, "database", {
+        EmailMessage.Settings.name: FakeTextIndex(hot),
+        ArchivedMessage.Settings.name: FakeTextIndex(archived),
+    })
+    return hot, archived
+
+
+def test_search_merges_archived_messages_by_score(indexed):
+    hot, archived = indexed
+
+    first = asyncio.run(SearchService.search("u1", "invoice", limit=2))
+    second = asyncio.run(SearchService.search("u1", "invoice", cursor=first.next_cursor, limit=2))
+
+    assert [item.id for item in first.items] == [hot[0]["_id"], archived[0]["_id"]]
+    assert [item.id for item in second.items] == [archived[1]["_id"], hot[1]["_id"]]
+    assert second.next_cursor is None
+    assert first.items[0].subject_highlight == "<mark>Invoice</mark>"
+
+
+def test_message_in_both_collections_is_listed_once(indexed):
+    hot, archived = indexed
+    # Archived while the search ran: locator written, hot copy not yet deleted.
+    archived.append(dict(hot[0]))
+
+    page = asyncio.run(SearchService.search("u1", "invoice", limit=10))
+
+    assert len(page.items) == 4
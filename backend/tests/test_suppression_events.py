@@ -0,0 +1,143 @@
+import hmac
+import json
+import time
+import asyncio
+import hashlib
+import pytest
+from services import suppression_services
+from services.suppression_services import EVENTS_KEY, PROCESSING_KEY, SuppressionService
+
+SIGNING_KEY = "test-signing-key"
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args) for name, args in self.calls]
+
+
+class FakeRedis:
+    """ Lists and SET NX, enough for the event webhook and flush. """
+
+    def __init__(self):
+        self.lists = {}
+        self.values = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.values:
+            return None
+        self.values[key] = value
+        return True
+
+    async def incr(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+
+    async def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+
+    async def lpush(self, key, *values):
+        for value in values:
+            self.lists.setdefault(key, []).insert(0, value)
+
+    async def lmove(self, source, destination, where_from, where_to):
+        items = self.lists.get(source)
+        if not items:
+            return None
+        value = items.pop(0 if where_from == "LEFT" else -1)
+        self.lists.setdefault(destination, []).insert(0 if where_to == "LEFT" else len(self.lists[destination]), value)
+        return value
+
+    async def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        if value in items:
+            items.remove(value)
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    fake = FakeRedis()
+    monkeypatch.setattr(suppression_services, "get_redis", lambda: fake)
+    monkeypatch.setattr(suppression_services.settings, "MAILGUN_WEBHOOK_SIGNING_KEY", SIGNING_KEY)
+    return fake
+
+
+def payload(timestamp=None, token="t" * 50, recipient="bounced@example.com"):
+    timestamp = str(int(time.time()) if timestamp is None else int(timestamp))
+    signature = hmac.new(SIGNING_KEY.encode(), f"{timestamp}{token}".encode(), hashlib.sha256).hexdigest()
+    return {
+        "signature": {"timestamp": timestamp, "token": token, "signature": signature},
+        "event-data": {"event": "failed", "severity": "permanent", "recipient": recipient},
+    }
+
+
+def test_signed_event_is_queued(redis):
+    assert asyncio.run(SuppressionService.record_event(payload())) is True
+    assert json.loads(redis.lists[EVENTS_KEY][0])["address"] == "bounced@example.com"
+
+
+def test_replayed_signature_is_rejected(redis):
+    first = payload()
+    asyncio.run(SuppressionService.record_event(first))
+    replay = {**first, "event-data": {**first["event-data"], "recipient": "victim@example.com"}}
+
+    with pytest.raises(PermissionError):
+        asyncio.run(SuppressionService.record_event(replay))
+    assert len(redis.lists[EVENTS_KEY]) == 1
+
+
+def test_stale_signature_is_rejected(redis):
+    with pytest.raises(PermissionError):
+        asyncio.run(SuppressionService.record_event(payload(timestamp=time.time() - 3600)))
+    assert EVENTS_KEY not in redis.lists
+
+
+def test_failed_flush_keeps_events(redis, monkeypatch):
+    for i in range(3):
+        asyncio.run(SuppressionService.record_event(payload(token=f"{i}" * 50, recipient=f"user{i}@example.com")))
+    queued = list(redis.lists[EVENTS_KEY])
+
+    async def failing(events):
+        raise ConnectionError("mongo is down")
+
+    monkeypatch.setattr(SuppressionService, "_write_events", staticmethod(failing))
+    with pytest.raises(ConnectionError):
+        asyncio.run(SuppressionService.flush_events(batch_size=2))
+    assert redis.lists[EVENTS_KEY] == queued
+    assert redis.lists[PROCESSING_KEY] == []
+
+    written = []
+
+    async def write(events):
+        written.extend(events)
+
+    monkeypatch.setattr(SuppressionService, "_write_events", staticmethod(write))
+    assert asyncio.run(SuppressionService.flush_events(batch_size=2)) == 3
+    assert [event["address"] for event in written] == [f"user{i}@example.com" for i in range(3)]
+    assert redis.lists[EVENTS_KEY] == [] and redis.lists[PROCESSING_KEY] == []
+
+
+def test_events_left_by_a_dead_flush_are_requeued(redis, monkeypatch):
+    redis.lists[PROCESSING_KEY] = [json.dumps({"address": "left@example.com", "reason": "bounce"})]
+    written = []
+
+    async def write(events):
+        written.extend(events)
+
+    monkeypatch.setattr(SuppressionService, "_write_events", staticmethod(write))
+    assert asyncio.run(SuppressionService.flush_events()) == 1
+    assert written[0]["address"] == "left@example.com"
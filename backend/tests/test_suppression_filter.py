@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+from services import suppression_services
+from services.suppression_services import SuppressionFilter
+
+
+class FakeCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for document in self.documents:
+            yield document
+
+
+class FakeSuppressions:
+    def __init__(self):
+        self.documents = []
+        self.finds = 0
+
+    def add(self, address, created_at):
+        self.documents.append({"address": address, "created_at": created_at})
+
+    def find(self, query, projection=None):
+        self.finds += 1
+        since = query.get("created_at", {}).get("$gte")
+        return FakeCursor([doc for doc in self.documents if since is None or doc["created_at"] >= since])
+
+    async def distinct(self, field, query):
+        wanted = set(query["address"]["$in"])
+        return [doc["address"] for doc in self.documents if doc["address"] in wanted]
+
+
+class DownRedis:
+    async def get(self, key):
+        raise RedisConnectionError("Connection refused")
+
+
+@pytest.fixture
+def suppressions(monkeypatch):
+    collection = FakeSuppressions()
+    monkeypatch.setattr(SuppressionFilter, "_collection", lambda self: collection)
+    monkeypatch.setattr(suppression_services, "get_redis", lambda: DownRedis())
+    monkeypatch.setattr(suppression_services.settings, "SUPPRESSION_SYNC_SECONDS", 0)
+    return collection
+
+
+def test_loads_from_mongo_without_redis(suppressions):
+    suppressions.add("bounced@example.com", datetime.utcnow())
+
+    allowed, suppressed = asyncio.run(SuppressionFilter().filter(["ok@example.com", "Bounced@example.com"]))
+
+    assert allowed == ["ok@example.com"]
+    assert suppressed == ["Bounced@example.com"]
+
+
+def test_keeps_pulling_new_entries_while_redis_is_down(suppressions):
+    suppression_filter = SuppressionFilter()
+    asyncio.run(suppression_filter.filter(["new@example.com"]))
+
+    suppressions.add("new@example.com", datetime.utcnow() + timedelta(seconds=1))
+    allowed, suppressed = asyncio.run(suppression_filter.filter(["new@example.com"]))
+
+    assert suppressed == ["new@example.com"]
+    assert suppressions.finds == 2
@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+from bson import ObjectId
+from models.template_model import EmailTemplate
+from schemas.template_schema import TemplateUpsert
+from services import template_services
+from services.template_services import TemplateService
+
+
+class FakeTemplates:
+    """ Just enough of find_one_and_update ($set, $inc, upsert) for upsert_template. """
+
+    def __init__(self):
+        self.documents = {}
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=None):
+        await asyncio.sleep(0)
+        document = self.documents.get(query["name"])
+        if document is None:
+            if not upsert:
+                return None
+            document = self.documents[query["name"]] = {"_id": ObjectId(), "name": query["name"]}
+        document.update(update["$set"])
+        for field, amount in update["$inc"].items():
+            document[field] = document.get(field, 0) + amount
+        return dict(document)
+
+
+@pytest.fixture
+def templates(monkeypatch):
+    fake = FakeTemplates()
+    monkeypatch.setattr(template_services, "database", {EmailTemplate.Settings.name: fake})
+    monkeypatch.setattr(EmailTemplate, "get_pymongo_collection", classmethod(lambda cls: None))
+    return fake
+
+
+def test_first_upsert_creates_version_one(templates):
+    template = asyncio.run(TemplateService.upsert_template("welcome", TemplateUpsert(subject="Hi {{ name }}")))
+
+    assert template.name == "welcome"
+    assert template.version == 1
+    assert template.subject == "Hi {{ name }}"
+
+
+def test_concurrent_updates_get_distinct_versions(templates):
+    async def main():
+        await TemplateService.upsert_template("welcome", TemplateUpsert(subject="v1"))
+        return await asyncio.gather(*(
+            TemplateService.upsert_template("welcome", TemplateUpsert(subject=f"v{i}")) for i in range(2, 7)
+        ))
+
+    updated = asyncio.run(main())
+
+    assert sorted(template.version for template in updated) == [2, 3, 4, 5, 6]
+    assert templates.documents["welcome"]["version"] == 6
@@ -0,0 +1,45 @@
+import io
+import asyncio
+import pytest
+from models.user_model import User
+from services import user_services
+from services.user_services import UserService
+
+
+class FakeUsers:
+    def __init__(self):
+        self.documents = []
+
+    async def distinct(self, field, query):
+        return [document[field] for document in self.documents if document[field] in query[field]["$in"]]
+
+    async def insert_many(self, documents, ordered=True):
+        self.documents.extend(documents)
+        return type("InsertManyResult", (), {"inserted_ids": list(range(len(documents)))})()
+
+
+@pytest.fixture
+def users(monkeypatch):
+    collection = FakeUsers()
+
+    async def fake_hashes(passwords):
+        return [f"$2b$12$hash-of-{len(password)}" for password in passwords]
+
+    monkeypatch.setattr(user_services, "database", {User.Settings.name: collection})
+    monkeypatch.setattr(user_services, "get_password_hashes", fake_hashes)
+    monkeypatch.setattr(User, "get_pymongo_collection", classmethod(lambda cls: None))
+    return collection
+
+
+def test_import_never_stores_plaintext_passwords(users):
+    upload = io.BytesIO(
+        b"username,email,hashed_password\n"
+        b"alice,alice@example.com,plaintext-secret\n"
+    )
+
+    report = asyncio.run(UserService.import_users(upload, "csv"))
+
+    assert report.inserted == 1
+    stored = users.documents[0]
+    assert stored["password"] == stored["hashed_password"] == "$2b$12$hash-of-16"
+    assert "plaintext-secret" not in stored.values()